@@ -0,0 +1,364 @@
+"""
+Versões assíncronas das listagens, exportações, edições e ajustes, usadas
+no deploy ASGI (``sispeed/asgi.py`` troca o urlconf por
+``sispeed.urls_async``).
+
+A leitura usa o ORM assíncrono (``aget``, ``aaggregate``, ``async for``): a
+requisição não prende uma thread enquanto espera o banco ou um cliente
+lento. Transações ainda não funcionam em modo assíncrono no Django, então a
+validação e a gravação de um POST rodam em uma thread via
+``sync_to_async``, com a mesma transação e novas tentativas de
+``write_transaction``.
+
+Nada pode consultar o banco durante a renderização (o Django levanta
+``SynchronousOnlyOperation``): usuário, tenant e páginas já chegam
+carregados ao template.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404
+from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+
+from . import bulk, exports, images, listcache, tasks
+from .conditional import conditional_list
+from .database import run_with_retry
+from .forms import (
+    CompanySettingsForm,
+    ContactForm,
+    ProductForm,
+    SectorForm,
+    UserPreferenceForm,
+)
+from .models import Company, Contact, Product, Sector, UserCompany, UserPreference
+from .pagination import KeysetPaginator, sort_links
+from .tenancy import aget_tenant
+from .views import (
+    CONTACT_LIST_FIELDS,
+    PRODUCT_LIST_FIELDS,
+    PRODUCT_SORT_COLUMNS,
+    PROPOSAL_SORT_COLUMNS,
+    SECTOR_LIST_FIELDS,
+    USER_LIST_FIELDS,
+    _filter_contacts,
+    _filter_products,
+    _filter_proposals,
+)
+
+
+def login_required(view):
+    """
+    ``login_required`` para views assíncronas (o do Django 5.0 só aceita
+    views síncronas). Também deixa ``request.user`` e ``request.tenant``
+    carregados.
+    """
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path(), settings.LOGIN_URL)
+        request.user = user
+        request.tenant = await aget_tenant(user)
+        return await view(request, *args, **kwargs)
+
+    return wrapper
+
+
+def require_permission(field_name, redirect_name="dashboard"):
+    """Equivalente a ``views._require_permission`` na forma de decorator."""
+
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not request.tenant.has_permission(field_name):
+                messages.error(request, "Você não tem permissão para acessar esta área.")
+                return redirect(redirect_name)
+            return await view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+async def aget_object_or_404(model, **kwargs):
+    try:
+        return await model.objects.aget(**kwargs)
+    except model.DoesNotExist:
+        raise Http404(f"{model._meta.object_name} não encontrado.")
+
+
+def _save_valid(*forms, after_save=None):
+    """
+    Valida e grava ``forms`` em uma transação (com novas tentativas). Roda
+    em uma thread; devolve False se algum formulário for inválido.
+    """
+
+    def attempt():
+        if not all([form.is_valid() for form in forms]):
+            return False
+        saved = [form.save() for form in forms]
+        if after_save:
+            after_save(*saved)
+        return True
+
+    return run_with_retry(attempt)
+
+
+async def _edit(request, model, pk, form_class, *, template, context_name, message, success_url):
+    instance = await aget_object_or_404(model, pk=pk, company=request.tenant.company)
+    form = form_class(request.POST or None, instance=instance)
+    if request.method == "POST" and await sync_to_async(_save_valid)(form):
+        messages.success(request, message)
+        return redirect(success_url)
+    return render(request, template, {"form": form, "mode": "edit", context_name: instance})
+
+
+# -------- CONTATOS --------
+
+@login_required
+@require_permission("can_manage_contacts")
+@conditional_list("contacts", "can_manage_contacts")
+async def contacts_list(request):
+    contacts, query = _filter_contacts(request, request.tenant.company)
+    paginator = KeysetPaginator(contacts.only(*CONTACT_LIST_FIELDS), ("display_name", "id"))
+
+    async def render_table():
+        page = await paginator.apaginate(request)
+        context = {"contacts": page, "page": page, "query": query}
+        return render_to_string("contacts/table.html", context, request)
+
+    return render(
+        request,
+        "contacts/list.html",
+        {
+            "table": await listcache.acached_table(request, "contacts", render_table),
+            "query": query,
+            "page_size": paginator.get_page_size(request.GET),
+            "bulk_actions": bulk.choices(Contact),
+        },
+    )
+
+
+@login_required
+@require_permission("can_manage_contacts")
+@conditional_list("contacts", "can_manage_contacts")
+async def contacts_export(request):
+    contacts, _query = _filter_contacts(request, request.tenant.company)
+    return exports.csv_response(
+        "contatos.csv",
+        exports.contact_header(),
+        exports.acontact_rows(contacts.order_by("display_name", "id")),
+    )
+
+
+@login_required
+@require_permission("can_manage_contacts")
+async def contacts_edit(request, pk):
+    return await _edit(
+        request,
+        Contact,
+        pk,
+        ContactForm,
+        template="contacts/form.html",
+        context_name="contact",
+        message="Contato atualizado com sucesso.",
+        success_url="contacts_list",
+    )
+
+
+# -------- USUÁRIOS --------
+
+@login_required
+@require_permission("can_manage_users")
+@conditional_list("users", "can_manage_users")
+async def users_list(request):
+    user_links = (
+        UserCompany.objects.select_related("user")
+        .filter(company=request.tenant.company)
+        .only(*USER_LIST_FIELDS)
+    )
+
+    async def render_table():
+        page = await KeysetPaginator(user_links, ("user__username", "id")).apaginate(request)
+        context = {"user_links": page, "page": page}
+        return render_to_string("users/table.html", context, request)
+
+    table = await listcache.acached_table(request, "users", render_table, vary_user=True)
+    return render(request, "users/list.html", {"table": table})
+
+
+# -------- PRODUTOS --------
+
+@login_required
+@require_permission("can_manage_products")
+@conditional_list("products", "can_manage_products")
+async def products_list(request):
+    products, form = _filter_products(request, request.tenant.company)
+    ordering = form.ordering()
+    paginator = KeysetPaginator(products.only(*PRODUCT_LIST_FIELDS), ordering)
+
+    async def render_table():
+        page = await paginator.apaginate(request)
+        context = {
+            "products": page,
+            "page": page,
+            "totals": await products.atotals(),
+            "columns": sort_links(request.GET, PRODUCT_SORT_COLUMNS, ordering[0]),
+        }
+        return render_to_string("products/table.html", context, request)
+
+    return render(
+        request,
+        "products/list.html",
+        {
+            "table": await listcache.acached_table(request, "products", render_table),
+            "form": form,
+            "page_size": paginator.get_page_size(request.GET),
+            "bulk_actions": bulk.choices(Product),
+        },
+    )
+
+
+@login_required
+@require_permission("can_manage_products")
+@conditional_list("products", "can_manage_products")
+async def products_export(request):
+    products, form = _filter_products(request, request.tenant.company)
+    products = products.order_by(*form.ordering())
+    return exports.csv_response(
+        "produtos.csv", exports.product_header(), exports.aproduct_rows(products)
+    )
+
+
+@login_required
+@require_permission("can_manage_products")
+async def products_edit(request, pk):
+    return await _edit(
+        request,
+        Product,
+        pk,
+        ProductForm,
+        template="products/form.html",
+        context_name="product",
+        message="Produto atualizado com sucesso.",
+        success_url="products_list",
+    )
+
+
+# -------- SETORES --------
+
+@login_required
+@require_permission("can_manage_sectors")
+@conditional_list("sectors", "can_manage_sectors")
+async def sectors_list(request):
+    sectors = Sector.objects.filter(company=request.tenant.company).only(*SECTOR_LIST_FIELDS)
+
+    async def render_table():
+        page = await KeysetPaginator(sectors, ("name", "id")).apaginate(request)
+        return render_to_string("sectors/table.html", {"sectors": page, "page": page}, request)
+
+    table = await listcache.acached_table(request, "sectors", render_table)
+    return render(
+        request,
+        "sectors/list.html",
+        {"table": table, "bulk_actions": bulk.choices(Sector)},
+    )
+
+
+@login_required
+@require_permission("can_manage_sectors")
+@conditional_list("sectors", "can_manage_sectors")
+async def sectors_export(request):
+    sectors = Sector.objects.filter(company=request.tenant.company).order_by("name", "id")
+    return exports.csv_response(
+        "setores.csv", exports.sector_header(), exports.asector_rows(sectors)
+    )
+
+
+@login_required
+@require_permission("can_manage_sectors")
+async def sectors_edit(request, pk):
+    return await _edit(
+        request,
+        Sector,
+        pk,
+        SectorForm,
+        template="sectors/form.html",
+        context_name="sector",
+        message="Setor atualizado com sucesso.",
+        success_url="sectors_list",
+    )
+
+
+# -------- PROPOSTAS --------
+
+@login_required
+@require_permission("can_manage_proposals")
+@conditional_list("proposals", "can_manage_proposals")
+async def proposals_list(request):
+    rows, form = _filter_proposals(request, request.tenant.company)
+    ordering = form.ordering()
+    paginator = KeysetPaginator(rows, ordering)
+
+    async def render_table():
+        page = await paginator.apaginate(request)
+        context = {
+            "proposals": page,
+            "page": page,
+            "columns": sort_links(request.GET, PROPOSAL_SORT_COLUMNS, ordering[0]),
+        }
+        return render_to_string("proposals/table.html", context, request)
+
+    return render(
+        request,
+        "proposals/list.html",
+        {
+            "table": await listcache.acached_table(request, "proposals", render_table),
+            "form": form,
+            "page_size": paginator.get_page_size(request.GET),
+        },
+    )
+
+
+# -------- AJUSTES --------
+
+@login_required
+async def settings_view(request):
+    if request.tenant.company is None:
+        messages.error(request, "Você não tem permissão para acessar esta área.")
+        return redirect("dashboard")
+    # Mesma recarga da versão síncrona: o tenant em cache pode estar velho.
+    company = await Company.objects.aget(pk=request.tenant.company.pk)
+    prefs, _ = await UserPreference.objects.aget_or_create(
+        user=request.user,
+        defaults={"theme": "dark"},
+    )
+
+    if request.method == "POST":
+        company_form = CompanySettingsForm(request.POST, request.FILES, instance=company)
+        pref_form = UserPreferenceForm(request.POST, instance=prefs)
+
+        def after_save(company, prefs):
+            if "logo" in company_form.changed_data:
+                tasks.enqueue(images.generate_logo_variants, company.pk)
+
+        if await sync_to_async(_save_valid)(company_form, pref_form, after_save=after_save):
+            messages.success(request, "Ajustes salvos com sucesso.")
+            return redirect("settings")
+    else:
+        company_form = CompanySettingsForm(instance=company)
+        pref_form = UserPreferenceForm(instance=prefs)
+
+    return render(
+        request,
+        "settings/index.html",
+        {
+            "company_form": company_form,
+            "pref_form": pref_form,
+        },
+    )
@@ -0,0 +1,90 @@
+"""
+Utilitários dos comandos de benchmark: estatísticas de latência, relatório
+em texto e comparação entre duas execuções salvas em JSON.
+"""
+import json
+import math
+import platform
+from datetime import datetime
+
+
+def percentile(sorted_values, pct: float) -> float:
+    """Percentil pelo método do rank mais próximo (lista já ordenada)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(latencies_ms, wall_seconds: float, statuses=None) -> dict:
+    values = sorted(latencies_ms)
+    count = len(values)
+    return {
+        "requests": count,
+        "throughput_rps": round(count / wall_seconds, 2) if wall_seconds else 0.0,
+        "mean_ms": round(sum(values) / count, 3) if count else 0.0,
+        "p50_ms": round(percentile(values, 50), 3),
+        "p95_ms": round(percentile(values, 95), 3),
+        "p99_ms": round(percentile(values, 99), 3),
+        "max_ms": round(values[-1], 3) if values else 0.0,
+        "statuses": dict(sorted((statuses or {}).items(), key=lambda item: str(item[0]))),
+    }
+
+
+def build_result(results: dict, **meta) -> dict:
+    return {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            **meta,
+        },
+        "routes": results,
+    }
+
+
+def save(path, data):
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, indent=2, ensure_ascii=False)
+
+
+def load(path) -> dict:
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def format_table(results: dict) -> list[str]:
+    lines = [
+        f"{'rota':<22} {'req':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}  status"
+    ]
+    for name, stats in results.items():
+        statuses = ",".join(f"{code}x{n}" for code, n in stats["statuses"].items())
+        lines.append(
+            f"{name:<22} {stats['requests']:>5} {stats['throughput_rps']:>9.1f} "
+            f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f}  {statuses}"
+        )
+    return lines
+
+
+def _delta(old: float, new: float) -> str:
+    if not old:
+        return "   n/a"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def format_comparison(baseline: dict, current: dict) -> list[str]:
+    """Compara duas execuções (variação negativa em latência é melhora)."""
+    lines = [
+        f"{'rota':<22} {'req/s':>16} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}"
+    ]
+    old_routes = baseline["routes"]
+    for name, new in current["routes"].items():
+        old = old_routes.get(name)
+        if old is None:
+            lines.append(f"{name:<22} (sem referência)")
+            continue
+        cells = []
+        for key in ("throughput_rps", "p50_ms", "p95_ms", "p99_ms"):
+            cells.append(f"{new[key]:>9.2f} {_delta(old[key], new[key])}")
+        lines.append(f"{name:<22} " + " ".join(cells))
+    return lines
@@ -0,0 +1,207 @@
+"""
+Ações em massa nas listagens de contatos, produtos e setores (ativar,
+inativar, excluir e marcar/desmarcar os tipos de contato).
+
+Cada lote de até ``BULK_CHUNK_SIZE`` linhas vira um ``UPDATE``/``DELETE``
+da empresa, na sua própria transação (como os lotes da importação), em vez
+de uma requisição por linha. Dentro do lote os sinais de gravação e exclusão
+ficam desligados (``bulk_mode``): o que eles fariam linha a linha é feito
+uma vez por lote —
+
+- contadores do painel: uma agregação do lote (``stats.contribution_of``)
+  antes de excluir, ou a contagem das linhas que mudam antes do ``UPDATE``;
+- ``updated_at`` das linhas, no próprio ``UPDATE`` (``update()`` não
+  aplica o ``auto_now``); exclusões tocam o ``Company.updated_at``;
+- índice de busca dos contatos excluídos e versão do cache das listagens.
+
+A exclusão passa pelo ``QuerySet.delete()`` do Django, então as relações
+(``on_delete``) continuam valendo. Linhas protegidas (``PROTECT``, ex.:
+contatos e produtos usados em propostas) ficam de fora e são contadas em
+``BulkResult.skipped``.
+"""
+import contextvars
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import PROTECT, Count, Exists, OuterRef, Q
+from django.utils import timezone
+
+from . import conditional, listcache, search, stats
+from .database import run_with_retry
+from .models import Contact, Product, Sector
+
+_bulk_mode = contextvars.ContextVar("sispeed_bulk_mode", default=False)
+
+
+@contextmanager
+def bulk_mode():
+    """Desliga os sinais marcados com ``unless_bulk`` no bloco."""
+    token = _bulk_mode.set(True)
+    try:
+        yield
+    finally:
+        _bulk_mode.reset(token)
+
+
+def unless_bulk(receiver):
+    """Decorator de receptor de sinal: não roda dentro de ``bulk_mode``."""
+
+    @wraps(receiver)
+    def wrapper(*args, **kwargs):
+        if not _bulk_mode.get():
+            return receiver(*args, **kwargs)
+
+    return wrapper
+
+
+@dataclass(frozen=True)
+class BulkAction:
+    label: str
+    # Campos gravados pelo UPDATE; vazio = excluir.
+    values: dict = field(default_factory=dict)
+
+    @property
+    def is_delete(self) -> bool:
+        return not self.values
+
+
+STATUS_ACTIONS = {
+    "activate": BulkAction("Ativar", {"is_active": True}),
+    "deactivate": BulkAction("Inativar", {"is_active": False}),
+    "delete": BulkAction("Excluir"),
+}
+
+CONTACT_TYPES = {
+    "is_client": "Cliente",
+    "is_supplier": "Fornecedor",
+    "is_partner": "Parceiro",
+    "is_employee": "Funcionário",
+    "is_other": "Outros",
+    "is_seller": "Vendedor",
+}
+
+ACTIONS = {
+    Contact: {
+        **STATUS_ACTIONS,
+        **{
+            f"set_{flag}": BulkAction(f"Marcar como {label}", {flag: True})
+            for flag, label in CONTACT_TYPES.items()
+        },
+        **{
+            f"unset_{flag}": BulkAction(f"Desmarcar {label}", {flag: False})
+            for flag, label in CONTACT_TYPES.items()
+        },
+    },
+    Product: STATUS_ACTIONS,
+    Sector: STATUS_ACTIONS,
+}
+
+
+def choices(model) -> list:
+    """``(nome, rótulo)`` das ações do modelo, para o select da listagem."""
+    return [(name, action.label) for name, action in ACTIONS[model].items()]
+
+
+def id_chunks(queryset, ids=None, size=None):
+    """
+    Ids a processar em lotes: os ``ids`` escolhidos que estão em
+    ``queryset`` ou, sem ``ids``, todas as linhas de ``queryset`` (paginado
+    pela chave, então serve enquanto as linhas mudam ou somem).
+    """
+    size = size or settings.BULK_CHUNK_SIZE
+    if ids is not None:
+        ids = sorted(set(ids))
+        for start in range(0, len(ids), size):
+            chunk = list(
+                queryset.filter(pk__in=ids[start : start + size]).order_by().values_list("pk", flat=True)
+            )
+            if chunk:
+                yield chunk
+        return
+    last = 0
+    while True:
+        chunk = list(
+            queryset.filter(pk__gt=last).order_by("pk").values_list("pk", flat=True)[:size]
+        )
+        if not chunk:
+            return
+        yield chunk
+        last = chunk[-1]
+
+
+@dataclass
+class BulkResult:
+    done: int = 0
+    # Linhas que não puderam ser excluídas (referenciadas com PROTECT).
+    skipped: int = 0
+
+
+def _protected_by(model):
+    """Relações que impedem excluir linhas de ``model`` (``on_delete=PROTECT``)."""
+    return [r for r in model._meta.related_objects if r.on_delete is PROTECT]
+
+
+def _deletable(model, rows):
+    """``rows`` sem as linhas referenciadas por uma relação protegida."""
+    for relation in _protected_by(model):
+        references = relation.related_model._base_manager.filter(
+            **{relation.field.name: OuterRef("pk")}
+        )
+        rows = rows.exclude(Exists(references))
+    return rows
+
+
+def _update_chunk(company_id, model, values, chunk) -> int:
+    rows = model.objects.filter(company_id=company_id, pk__in=chunk)
+    counters = stats.FIELD_COUNTERS.get(model, {})
+    # Linhas que mudam de fato em cada campo (todos booleanos).
+    changing = rows.aggregate(
+        **{name: Count("id", filter=Q(**{name: not value})) for name, value in values.items()}
+    )
+    updated = rows.update(**values, updated_at=timezone.now())
+    stats.apply(
+        company_id,
+        {
+            counters[name]: count if values[name] else -count
+            for name, count in changing.items()
+            if name in counters
+        },
+    )
+    listcache.bump(company_id, model)
+    return updated
+
+
+def _delete_chunk(company_id, model, chunk) -> int:
+    rows = model.objects.filter(company_id=company_id, pk__in=chunk)
+    if _protected_by(model):
+        chunk = list(_deletable(model, rows).order_by().values_list("pk", flat=True))
+        if not chunk:
+            return 0
+        rows = model.objects.filter(pk__in=chunk)
+    contribution = stats.contribution_of(rows)
+    # Com receptores de sinal ligados o Django carrega as linhas antes do
+    # DELETE; ``only("pk")`` evita trazer as colunas que ninguém lê.
+    deleted = rows.only("pk").delete()[1].get(model._meta.label, 0)
+    if model is Contact:
+        search.unindex_contacts(chunk)
+    stats.apply(company_id, stats.negate(contribution))
+    listcache.bump(company_id, model)
+    conditional.touch_company(company_id)
+    return deleted
+
+
+def run(company_id, model, action_name, chunks) -> BulkResult:
+    """Aplica a ação ``action_name`` aos lotes de ids."""
+    action = ACTIONS[model][action_name]
+    result = BulkResult()
+    with bulk_mode():
+        for chunk in chunks:
+            if action.is_delete:
+                done = run_with_retry(_delete_chunk, company_id, model, chunk)
+                result.skipped += len(chunk) - done
+            else:
+                done = run_with_retry(_update_chunk, company_id, model, action.values, chunk)
+            result.done += done
+    return result
@@ -0,0 +1,166 @@
+"""
+Consulta de CEP offline, para preencher endereço nos formulários de contato
+e de ajustes (``static/js/cep.js``).
+
+A base vem de um arquivo nacional de CEPs carregado por ``manage.py
+load_ceps`` na tabela ``CepAddress``; nenhuma API externa é chamada. Cada
+worker guarda os CEPs já consultados em um LRU (``CEP_CACHE_SIZE``), então
+uma consulta repetida não vai ao banco. CEPs não encontrados não entram no
+LRU: aparecem assim que a base for carregada.
+
+A base muda raramente; depois de recarregá-la, reinicie os workers para
+descartar o LRU.
+"""
+import csv
+import gzip
+import io
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import CepAddress
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Nomes de coluna aceitos no arquivo (sem acento, minúsculas) -> campo.
+COLUMN_ALIASES = {
+    "cep": "cep",
+    "logradouro": "address",
+    "endereco": "address",
+    "address": "address",
+    "bairro": "district",
+    "district": "district",
+    "cidade": "city",
+    "localidade": "city",
+    "municipio": "city",
+    "city": "city",
+    "uf": "uf",
+    "estado": "uf",
+    "state": "uf",
+}
+REQUIRED_COLUMNS = ("cep", "city", "uf")
+BATCH_SIZE = 5000
+
+UPSERT_SQL = (
+    f"INSERT INTO {CepAddress._meta.db_table} (cep, address, district, city, uf) "
+    "VALUES (%s, %s, %s, %s, %s) "
+    "ON CONFLICT (cep) DO UPDATE SET address = excluded.address, "
+    "district = excluded.district, city = excluded.city, uf = excluded.uf"
+)
+
+
+class InvalidCepFile(Exception):
+    """O arquivo não tem as colunas necessárias."""
+
+
+class _NotFound(Exception):
+    pass
+
+
+def normalize(value) -> int | None:
+    """"01001-000" -> 1001000; None se não tiver 8 dígitos."""
+    digits = _NON_DIGIT_RE.sub("", value or "")
+    return int(digits) if len(digits) == 8 else None
+
+
+def format_cep(number: int) -> str:
+    text = f"{number:08d}"
+    return f"{text[:5]}-{text[5:]}"
+
+
+@lru_cache(maxsize=settings.CEP_CACHE_SIZE)
+def _cached(number):
+    # Exceções não entram no lru_cache: um CEP ausente é consultado de novo.
+    row = (
+        CepAddress.objects.filter(pk=number)
+        .values("address", "district", "city", "uf")
+        .first()
+    )
+    if row is None:
+        raise _NotFound
+    return {"cep": format_cep(number), **row}
+
+
+def lookup(value) -> dict | None:
+    """Endereço do CEP (com ou sem máscara) ou None. Não altere o dict."""
+    number = normalize(value)
+    if number is None:
+        return None
+    try:
+        return _cached(number)
+    except _NotFound:
+        return None
+
+
+@dataclass
+class LoadResult:
+    loaded: int = 0
+    skipped: int = 0
+
+
+def _strip_accents(text):
+    return (
+        text.strip()
+        .lower()
+        .translate(str.maketrans("áàâãéêíóôõúç", "aaaaeeiooouc"))
+    )
+
+
+def open_text(path, encoding):
+    """Abre o arquivo de CEPs, compactado com gzip ou não."""
+    if str(path).endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path), encoding=encoding, newline="")
+    return open(path, encoding=encoding, newline="")
+
+
+def load_file(text, batch_size=BATCH_SIZE, replace=False) -> LoadResult:
+    """
+    Carrega CEPs de um CSV (``;`` ou ``,``, com cabeçalho) em lotes. CEPs já
+    existentes são atualizados; com ``replace`` a tabela é esvaziada antes.
+    """
+    sample = text.read(4096)
+    text.seek(0)
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    reader = csv.reader(text, delimiter=delimiter)
+    header = [COLUMN_ALIASES.get(_strip_accents(name)) for name in next(reader, [])]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        raise InvalidCepFile(f"Coluna obrigatória ausente: {', '.join(missing)}.")
+
+    result = LoadResult()
+    batch = []
+
+    def flush():
+        # executemany direto: o bulk_create do Django quebra o lote em
+        # comandos de ~200 linhas (limite de 999 parâmetros do SQLite).
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(UPSERT_SQL, batch)
+        result.loaded += len(batch)
+        batch.clear()
+
+    if replace:
+        CepAddress.objects.all().delete()
+    for values in reader:
+        row = {field: value.strip() for field, value in zip(header, values) if field}
+        number = normalize(row.get("cep"))
+        if number is None or not row.get("city") or len(row.get("uf", "")) != 2:
+            result.skipped += 1
+            continue
+        batch.append(
+            (
+                number,
+                row.get("address", "")[:255],
+                row.get("district", "")[:100],
+                row["city"][:100],
+                row["uf"].upper(),
+            )
+        )
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    _cached.cache_clear()
+    return result
@@ -0,0 +1,151 @@
+"""
+GET condicional (``ETag``/``Last-Modified``) nas listagens e exportações.
+
+Antes de rodar a view, uma consulta barata tira a "impressão digital" dos
+dados da empresa: o maior ``updated_at`` do modelo (uma busca no índice
+``(company, updated_at)``), a quantidade de linhas (de ``CompanyStats``; um
+COUNT percorreria o índice inteiro) e o ``Company.updated_at``, que também
+é tocado a cada exclusão (``touch_company``). Junto com as versões de
+``core.listcache``, o ``tenant.fingerprint`` (barra lateral) e a
+querystring, isso vira o ETag. Se o navegador mandar o mesmo ETag (ou um
+``If-Modified-Since`` que ainda vale), a resposta é um 304 sem a consulta
+principal nem o template.
+
+A listagem de usuários só tem ETag: alterações em ``User`` não têm data.
+Páginas com mensagens pendentes (``messages``) não entram: a mensagem
+precisa aparecer uma vez e não pode ficar na cópia do navegador.
+"""
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.contrib import messages
+from django.db.models import OuterRef, Subquery
+from django.http import HttpResponseNotModified
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+
+from . import listcache
+from .models import Company, Contact, Product, Proposal, Sector
+
+# Listagem -> (modelo com ``updated_at``, contador em ``CompanyStats``).
+FINGERPRINT_SOURCES = {
+    "contacts": (Contact, "contacts_total"),
+    "products": (Product, "products_total"),
+    "sectors": (Sector, "sectors_total"),
+    "users": (None, "users_total"),
+    "proposals": (Proposal, "proposals_total"),
+}
+
+
+def touch_company(company_id):
+    """Marca uma exclusão: o maior ``updated_at`` das linhas não a mostra."""
+    Company.objects.filter(pk=company_id).update(updated_at=timezone.now())
+
+
+def _state_query(company_id, name):
+    """(quantidade, ``Company.updated_at``[, maior ``updated_at`` das linhas])."""
+    model, counter = FINGERPRINT_SOURCES[name]
+    queryset = Company.objects.filter(pk=company_id)
+    fields = [f"stats__{counter}", "updated_at"]
+    if model is not None:
+        last = model.objects.filter(company=OuterRef("pk")).order_by("-updated_at")
+        queryset = queryset.annotate(rows_updated=Subquery(last.values("updated_at")[:1]))
+        fields.append("rows_updated")
+    return queryset.values_list(*fields)
+
+
+def _validators(request, name, state, version):
+    raw = "|".join(
+        str(part)
+        for part in (
+            name,
+            *state,
+            version,
+            request.tenant.fingerprint,
+            request.user.pk,
+            # As listagens têm formulários (ações em massa): um 304 não pode
+            # manter na tela um token CSRF de outro cookie.
+            request.META.get("CSRF_COOKIE", ""),
+            sorted(request.GET.lists()),
+        )
+    )
+    etag = f'"{hashlib.md5(raw.encode()).hexdigest()}"'
+    last_modified = None
+    if FINGERPRINT_SOURCES[name][0] is not None:
+        last_modified = int(max(filter(None, state[1:])).timestamp())
+    return etag, last_modified
+
+
+def _applies(request, permission) -> bool:
+    return (
+        request.method in ("GET", "HEAD")
+        and request.tenant.has_permission(permission)
+        and not len(messages.get_messages(request))
+    )
+
+
+def _not_modified(request, etag, last_modified):
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if isinstance(response, HttpResponseNotModified):
+        _set_headers(response, etag, last_modified)
+        return response
+    return None
+
+
+def _set_headers(response, etag, last_modified):
+    response["ETag"] = etag
+    if last_modified is not None:
+        response["Last-Modified"] = http_date(last_modified)
+    # O navegador guarda, mas confirma a cada uso; proxies não guardam.
+    patch_cache_control(response, private=True, no_cache=True)
+
+
+def _finish(response, etag, last_modified):
+    if response.status_code == 200:
+        _set_headers(response, etag, last_modified)
+    return response
+
+
+def conditional_list(name, permission):
+    """
+    Decorator das views de listagem e exportação ``name`` (chave de
+    ``FINGERPRINT_SOURCES``). Vem depois do ``login_required``; sem a
+    ``permission`` a view roda normalmente (e recusa o acesso).
+    """
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not _applies(request, permission):
+                    return await view(request, *args, **kwargs)
+                company_id = request.tenant.company.pk
+                state = await _state_query(company_id, name).aget()
+                version = await listcache.aversions(company_id, name)
+                etag, last_modified = _validators(request, name, state, version)
+                response = _not_modified(request, etag, last_modified)
+                if response is None:
+                    response = _finish(await view(request, *args, **kwargs), etag, last_modified)
+                return response
+
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _applies(request, permission):
+                return view(request, *args, **kwargs)
+            company_id = request.tenant.company.pk
+            state = _state_query(company_id, name).get()
+            version = listcache.versions(company_id, name)
+            etag, last_modified = _validators(request, name, state, version)
+            response = _not_modified(request, etag, last_modified)
+            if response is None:
+                response = _finish(view(request, *args, **kwargs), etag, last_modified)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,94 @@
+"""
+Perfil de produção do SQLite.
+
+Com vários workers do gunicorn gravando no mesmo arquivo, o modo padrão
+(journal "delete" e transações ``BEGIN`` adiadas) dá "database is locked":
+leitores bloqueiam escritores e duas transações que leram antes de gravar
+não conseguem promover o lock, então o SQLite desiste na hora, sem esperar
+o ``busy_timeout``.
+
+- WAL (leitores não bloqueiam o escritor) é persistente no arquivo e é
+  ligado uma vez, no ``migrate`` (``SQLITE_JOURNAL_MODE``).
+- ``SQLITE_PRAGMAS`` é aplicado a cada conexão nova (sinal
+  ``connection_created``): ``synchronous=NORMAL``, ``busy_timeout`` etc.
+- O backend ``core.sqlite`` abre as transações com ``BEGIN IMMEDIATE``: o
+  lock de escrita é pego no início e a espera respeita o ``busy_timeout``.
+- ``write_transaction`` põe o POST de uma view em uma transação e, se o
+  lock não vier dentro do timeout, repete a view inteira algumas vezes com
+  backoff exponencial (a transação anterior já sofreu rollback).
+"""
+import functools
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+logger = logging.getLogger("sispeed.db")
+
+LOCKED_MESSAGES = ("database is locked", "database table is locked")
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+def apply_pragmas(db_connection, pragmas=None):
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    with db_connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+
+
+def set_journal_mode(db_connection) -> str:
+    """Grava ``SQLITE_JOURNAL_MODE`` no arquivo; devolve o modo em vigor."""
+    with db_connection.cursor() as cursor:
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        return cursor.fetchone()[0]
+
+
+def is_locked_error(exc) -> bool:
+    return isinstance(exc, OperationalError) and str(exc).startswith(LOCKED_MESSAGES)
+
+
+def backoff_delay(attempt) -> float:
+    """Espera antes da tentativa ``attempt`` (1, 2, ...), com jitter."""
+    base = settings.SQLITE_RETRY_BACKOFF * (2 ** (attempt - 1))
+    return base * random.uniform(0.5, 1.5)
+
+
+def run_with_retry(func, *args, **kwargs):
+    """
+    ``func`` dentro de ``transaction.atomic()``, repetida em caso de lock.
+    Dentro de outra transação não repete: o rollback seria só parcial.
+    """
+    retries = settings.SQLITE_WRITE_RETRIES
+    attempt = 0
+    while True:
+        nested = connection.in_atomic_block
+        try:
+            with transaction.atomic():
+                return func(*args, **kwargs)
+        except OperationalError as exc:
+            attempt += 1
+            if nested or not is_locked_error(exc) or attempt > retries:
+                raise
+            delay = backoff_delay(attempt)
+            logger.warning(
+                "Banco bloqueado em %s; tentativa %s de %s em %.0f ms",
+                getattr(func, "__qualname__", func),
+                attempt,
+                retries,
+                delay * 1000,
+            )
+            time.sleep(delay)
+
+
+def write_transaction(view):
+    """Decorator de view: POST/PUT/DELETE via ``run_with_retry``."""
+
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method in SAFE_METHODS:
+            return view(request, *args, **kwargs)
+        return run_with_retry(view, request, *args, **kwargs)
+
+    return wrapper
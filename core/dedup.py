@@ -0,0 +1,371 @@
+"""
+Busca de contatos duplicados e junção dos pares escolhidos.
+
+Comparar cada contato com todos os outros é O(n²). A busca separa os
+contatos em "blocos" por chaves baratas — documento (só dígitos), telefone
+no formato E.164, e-mail e uma chave fonética do nome — e só compara pares
+que caíram em algum bloco em comum, então o número de pares cresce
+aproximadamente com o número de contatos. Blocos maiores que
+``DEDUP_MAX_BLOCK_SIZE`` (ex.: um nome muito comum) são ignorados: não
+separam nada e dominariam o tempo da busca.
+
+Cada par recebe uma nota entre 0 e 1: a semelhança dos nomes
+(``difflib``) mais o peso das chaves exatas em comum, menos um desconto por
+telefone ou e-mail que não batem. Pares com nota a
+partir de ``DEDUP_MIN_SCORE`` viram ``DuplicateCandidate``; documentos
+diferentes descartam o par. A busca roda em segundo plano (``schedule``),
+uma por empresa de cada vez, e também por ``manage.py find_duplicates``.
+
+Pares marcados como "não é duplicado" continuam gravados e não voltam nas
+próximas buscas.
+"""
+import re
+import time
+import unicodedata
+from collections import defaultdict
+from dataclasses import dataclass
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from . import tasks
+from .database import run_with_retry
+from .models import Contact, DuplicateCandidate, Proposal
+
+# Peso da semelhança dos nomes e de cada chave exata em comum na nota do
+# par. Telefone ou e-mail presentes nos dois e diferentes descontam
+# ``CONFLICT_PENALTY`` (homônimos não viram duplicados só pelo nome).
+NAME_WEIGHT = 0.8
+EVIDENCE_WEIGHTS = {"documento": 0.4, "telefone": 0.2, "e-mail": 0.2}
+CONFLICT_PENALTY = 0.1
+
+# Palavras que não distinguem nomes ("Silva & Cia Ltda").
+NAME_STOPWORDS = {
+    "a", "e", "o", "da", "das", "de", "do", "dos", "cia", "ltda", "me", "epp",
+    "eireli", "sa", "s/a", "mei", "comercio", "industria", "servicos",
+}
+
+# Regras da chave fonética, aplicadas em ordem sobre o nome sem acentos.
+PHONETIC_RULES = [
+    (re.compile(pattern), replacement)
+    for pattern, replacement in (
+        (r"[^a-z]", ""),
+        (r"ph", "f"),
+        (r"th", "t"),
+        (r"(ch|sh)", "x"),
+        (r"lh", "li"),
+        (r"nh", "ni"),
+        (r"(sc|c)(?=[ei])", "s"),
+        (r"qu|c|k|q", "k"),
+        (r"gu(?=[ei])", "g"),
+        (r"ss|z", "s"),
+        (r"y", "i"),
+        (r"w", "v"),
+        (r"h", ""),
+        (r"(?<=.)[aeiou]", ""),
+        (r"(.)\1+", r"\1"),
+    )
+]
+
+MERGE_FIELDS = (
+    "document",
+    "legal_name",
+    "phone",
+    "email",
+    "cep",
+    "address",
+    "number",
+    "district",
+    "city",
+    "uf",
+    "commission",
+)
+MERGE_FLAGS = (
+    "is_active",
+    "is_client",
+    "is_supplier",
+    "is_partner",
+    "is_employee",
+    "is_other",
+    "is_seller",
+)
+
+_NON_DIGIT_RE = re.compile(r"\D")
+_WORD_RE = re.compile(r"[a-z0-9/]+")
+
+
+def simplify(text) -> str:
+    """Minúsculas, sem acentos e sem as palavras de ``NAME_STOPWORDS``."""
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode()
+    return " ".join(w for w in _WORD_RE.findall(text.lower()) if w not in NAME_STOPWORDS)
+
+
+@lru_cache(maxsize=65536)
+def phonetic(word) -> str:
+    for pattern, replacement in PHONETIC_RULES:
+        word = pattern.sub(replacement, word)
+    return word
+
+
+def name_key(simplified) -> str | None:
+    """Primeira e última palavra do nome, em chave fonética e sem ordem."""
+    words = [phonetic(w) for w in simplified.split() if not w.isdigit()]
+    words = [w for w in words if w]
+    if not words:
+        return None
+    return " ".join(sorted({words[0], words[-1]}))
+
+
+def phone_e164(value) -> str | None:
+    """Telefone brasileiro no formato E.164 ("+5511987654321"); None se faltar o DDD."""
+    digits = _NON_DIGIT_RE.sub("", value or "").lstrip("0")
+    if len(digits) in (10, 11):
+        digits = f"55{digits}"
+    if len(digits) not in (12, 13) or not digits.startswith("55"):
+        return None
+    if len(digits) == 12 and digits[4] in "6789":
+        # Celular antigo, sem o nono dígito.
+        digits = f"{digits[:4]}9{digits[4:]}"
+    return f"+{digits}"
+
+
+@dataclass
+class _Entry:
+    pk: int
+    names: tuple
+    document: str | None
+    phone: str | None
+    email: str | None
+
+
+@dataclass
+class DedupResult:
+    contacts: int = 0
+    pairs: int = 0
+    candidates: int = 0
+    seconds: float = 0.0
+
+
+def _entries(company_id):
+    rows = (
+        Contact.objects.filter(company_id=company_id)
+        .order_by()
+        .values_list("pk", "display_name", "legal_name", "normalized_document", "phone", "email")
+        .iterator(chunk_size=5000)
+    )
+    for pk, display_name, legal_name, document, phone, email in rows:
+        names = tuple(dict.fromkeys(filter(None, (simplify(display_name), simplify(legal_name)))))
+        yield _Entry(
+            pk=pk,
+            names=names,
+            document=document,
+            phone=phone_e164(phone),
+            email=(email or "").strip().lower() or None,
+        )
+
+
+def _blocking_keys(entry):
+    if entry.document:
+        yield f"d:{entry.document}"
+    if entry.phone:
+        yield f"t:{entry.phone}"
+    if entry.email:
+        yield f"e:{entry.email}"
+    for name in entry.names:
+        key = name_key(name)
+        if key:
+            yield f"n:{key}"
+
+
+def candidate_pairs(entries, max_block_size=None) -> set:
+    """Pares de índices de ``entries`` que dividem ao menos um bloco."""
+    max_block_size = max_block_size or settings.DEDUP_MAX_BLOCK_SIZE
+    blocks = defaultdict(list)
+    for index, entry in enumerate(entries):
+        for key in set(_blocking_keys(entry)):
+            blocks[key].append(index)
+    pairs = set()
+    for members in blocks.values():
+        if 1 < len(members) <= max_block_size:
+            for i, first in enumerate(members):
+                for second in members[i + 1 :]:
+                    pairs.add((first, second))
+    return pairs
+
+
+def _name_similarity(a, b, minimum) -> float:
+    best = 0.0
+    for first in a.names:
+        for second in b.names:
+            matcher = SequenceMatcher(None, first, second, autojunk=False)
+            # real_quick_ratio/quick_ratio são limites superiores baratos.
+            if matcher.real_quick_ratio() <= max(best, minimum):
+                continue
+            if matcher.quick_ratio() <= max(best, minimum):
+                continue
+            best = max(best, matcher.ratio())
+    return best
+
+
+def score(a, b, min_score=None):
+    """
+    ``(nota, motivos)`` do par. Abaixo de ``min_score`` a nota pode sair
+    menor que a real: os nomes só são comparados quando ainda dá para chegar
+    lá. Documentos diferentes dão nota 0.
+    """
+    min_score = settings.DEDUP_MIN_SCORE if min_score is None else min_score
+    if a.document and b.document and a.document != b.document:
+        return 0.0, []
+    reasons = []
+    evidence = 0.0
+    for reason, first, second in (
+        ("documento", a.document, b.document),
+        ("telefone", a.phone, b.phone),
+        ("e-mail", a.email, b.email),
+    ):
+        if first and second:
+            if first == second:
+                reasons.append(reason)
+                evidence += EVIDENCE_WEIGHTS[reason]
+            else:
+                evidence -= CONFLICT_PENALTY
+    # Semelhança mínima para o par ainda alcançar a nota mínima.
+    needed = (min_score - evidence) / NAME_WEIGHT
+    similarity = _name_similarity(a, b, needed - 1e-9)
+    if similarity >= 0.85:
+        reasons.append("nome")
+    return max(0.0, min(1.0, NAME_WEIGHT * similarity + evidence)), reasons
+
+
+def _replace_candidates(company_id, found):
+    DuplicateCandidate.objects.filter(company_id=company_id, dismissed=False).delete()
+    # Pares já descartados continuam lá e são ignorados pela restrição única.
+    DuplicateCandidate.objects.bulk_create(found, batch_size=1000, ignore_conflicts=True)
+
+
+def find_duplicates(company_id) -> DedupResult:
+    """Refaz os candidatos a duplicado da empresa."""
+    started = time.perf_counter()
+    min_score = settings.DEDUP_MIN_SCORE
+    entries = list(_entries(company_id))
+    pairs = candidate_pairs(entries)
+    found = []
+    for i, j in pairs:
+        a, b = entries[i], entries[j]
+        value, reasons = score(a, b, min_score)
+        if value >= min_score:
+            if a.pk > b.pk:
+                a, b = b, a
+            found.append(
+                DuplicateCandidate(
+                    company_id=company_id,
+                    contact_a_id=a.pk,
+                    contact_b_id=b.pk,
+                    score=round(value, 4),
+                    reasons=", ".join(reasons),
+                )
+            )
+    run_with_retry(_replace_candidates, company_id, found)
+    return DedupResult(
+        contacts=len(entries),
+        pairs=len(pairs),
+        candidates=len(found),
+        seconds=round(time.perf_counter() - started, 2),
+    )
+
+
+# -------- Execução em segundo plano --------
+
+def _lock_key(company_id) -> str:
+    return f"dedup:running:{company_id}"
+
+
+def _status_key(company_id) -> str:
+    return f"dedup:status:{company_id}"
+
+
+def status(company_id) -> dict:
+    """``running`` e o resultado da última busca da empresa (se houver)."""
+    result = cache.get(_status_key(company_id)) or {}
+    return {**result, "running": cache.get(_lock_key(company_id)) is not None}
+
+
+def run(company_id):
+    try:
+        result = find_duplicates(company_id)
+        cache.set(
+            _status_key(company_id),
+            {"finished_at": timezone.now(), "result": result},
+            None,
+        )
+    finally:
+        cache.delete(_lock_key(company_id))
+
+
+def schedule(company_id) -> bool:
+    """Enfileira a busca; False se já houver uma em andamento na empresa."""
+    if not cache.add(_lock_key(company_id), True, settings.DEDUP_LOCK_TIMEOUT):
+        return False
+    tasks.enqueue(run, company_id)
+    return True
+
+
+# -------- Junção --------
+
+def merge_contacts(keep, other):
+    """
+    Completa ``keep`` com os dados que só ``other`` tem, passa as propostas
+    de ``other`` para ``keep`` e apaga ``other``. Chamar dentro de uma
+    transação.
+    """
+    for name in MERGE_FIELDS:
+        if getattr(keep, name) in (None, "") and getattr(other, name) not in (None, ""):
+            setattr(keep, name, getattr(other, name))
+    for name in MERGE_FLAGS:
+        setattr(keep, name, getattr(keep, name) or getattr(other, name))
+    notes = [n for n in (keep.notes, other.notes) if n]
+    keep.notes = "\n\n".join(dict.fromkeys(notes)) or None
+    keep.save()
+    Proposal.objects.filter(contact=other).update(contact=keep, updated_at=timezone.now())
+    Proposal.objects.filter(seller=other).update(seller=keep, updated_at=timezone.now())
+    other.delete()
+
+
+def merge_pairs(company_id, choices) -> int:
+    """
+    Junta os pares escolhidos na revisão, todos na mesma transação.
+    ``choices`` é uma lista de ``(candidato, id do contato que fica)``.
+    Retorna quantos contatos foram absorvidos.
+    """
+    # Contato absorvido -> contato que ficou com os dados dele.
+    merged_into = {}
+
+    def resolve(pk):
+        while pk in merged_into:
+            pk = merged_into[pk]
+        return pk
+
+    merged = 0
+    with transaction.atomic():
+        for candidate, keep_id in choices:
+            pair = {candidate.contact_a_id, candidate.contact_b_id}
+            if keep_id not in pair:
+                continue
+            (other_id,) = pair - {keep_id}
+            keep_id, other_id = resolve(keep_id), resolve(other_id)
+            if keep_id == other_id:
+                continue
+            contacts = Contact.objects.in_bulk([keep_id, other_id])
+            if len(contacts) < 2:
+                continue
+            keep, other = contacts[keep_id], contacts[other_id]
+            if keep.company_id != company_id or other.company_id != company_id:
+                continue
+            merge_contacts(keep, other)
+            merged_into[other_id] = keep_id
+            merged += 1
+    return merged
@@ -0,0 +1,78 @@
+"""
+CPF e CNPJ: normalização (só dígitos), dígitos verificadores e formatação.
+
+``Contact.normalized_document`` e ``Company.normalized_cnpj`` guardam o
+documento só com dígitos, preenchidos no ``save()``. É por eles (e pelo
+índice ``(company, normalized_document)``) que as buscas de duplicados
+andam: o campo digitado pode vir com ou sem máscara.
+"""
+import re
+
+from django.core.exceptions import ValidationError
+
+_NON_DIGIT_RE = re.compile(r"\D")
+
+CPF_LENGTH = 11
+CNPJ_LENGTH = 14
+
+_CPF_WEIGHTS = (range(10, 1, -1), range(11, 1, -1))
+_CNPJ_WEIGHTS = (
+    (5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+    (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2),
+)
+
+
+def digits(value) -> str:
+    return _NON_DIGIT_RE.sub("", value or "")
+
+
+def normalize(value) -> str | None:
+    """"123.456.789-09" -> "12345678909"; None se não houver dígitos."""
+    return digits(value) or None
+
+
+def _check_digit(numbers, weights) -> int:
+    total = sum(d * w for d, w in zip(numbers, weights))
+    rest = total % 11
+    return 0 if rest < 2 else 11 - rest
+
+
+def complete(base) -> str:
+    """Acrescenta os dois dígitos verificadores a 9 (CPF) ou 12 (CNPJ) dígitos."""
+    numbers = [int(d) for d in base]
+    weights = _CPF_WEIGHTS if len(numbers) == CPF_LENGTH - 2 else _CNPJ_WEIGHTS
+    for weight in weights:
+        numbers.append(_check_digit(numbers, weight))
+    return "".join(map(str, numbers))
+
+
+def is_valid(value) -> bool:
+    """CPF ou CNPJ (com ou sem máscara) com os dígitos verificadores certos."""
+    number = digits(value)
+    if len(number) not in (CPF_LENGTH, CNPJ_LENGTH) or len(set(number)) == 1:
+        return False
+    return complete(number[:-2]) == number
+
+
+def is_valid_cnpj(value) -> bool:
+    return len(digits(value)) == CNPJ_LENGTH and is_valid(value)
+
+
+def format_document(value) -> str:
+    """Máscara de CPF ou CNPJ; outros valores voltam como vieram."""
+    d = digits(value)
+    if len(d) == CPF_LENGTH:
+        return f"{d[:3]}.{d[3:6]}.{d[6:9]}-{d[9:]}"
+    if len(d) == CNPJ_LENGTH:
+        return f"{d[:2]}.{d[2:5]}.{d[5:8]}/{d[8:12]}-{d[12:]}"
+    return value
+
+
+def validate_document(value):
+    if value and not is_valid(value):
+        raise ValidationError("CPF/CNPJ inválido.", code="invalid_document")
+
+
+def validate_cnpj(value):
+    if value and not is_valid_cnpj(value):
+        raise ValidationError("CNPJ inválido.", code="invalid_cnpj")
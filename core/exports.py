@@ -0,0 +1,181 @@
+"""
+Exportação das listagens em CSV.
+
+As linhas saem de ``values_list(...).iterator(chunk_size=...)`` direto para
+um ``StreamingHttpResponse``: o download começa na hora e a memória do
+worker não cresce com o tamanho da empresa. O formato (";" e vírgula
+decimal, com BOM) abre direto no Excel e é aceito pela importação de
+contatos.
+
+No deploy ASGI as views usam as versões ``a*_rows`` (``aiterator``): o
+Django 5.0 consome um iterador síncrono com ``sync_to_async(list)``, ou seja,
+montaria o arquivo inteiro na memória antes de enviar o primeiro byte.
+"""
+import csv
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+
+from .forms import ContactForm
+from .models import Contact, Product, Sector
+
+CHUNK_SIZE = 2000
+DELIMITER = ";"
+BUFFER_SIZE = 64 * 1024
+
+CONTACT_EXPORT_FIELDS = tuple(ContactForm.Meta.fields)
+PRODUCT_EXPORT_FIELDS = ("name", "unit", "cost_price", "price", "is_active")
+PRODUCT_ROW_FIELDS = ("name", "unit", "cost_price", "price", "profit", "margin", "is_active")
+SECTOR_EXPORT_FIELDS = ("name", "is_active")
+
+PRODUCT_UNITS = dict(Product.UNIT_CHOICES)
+
+# Primeiros caracteres que fazem o Excel tratar a célula como fórmula.
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class _Echo:
+    """Pseudo-arquivo: ``csv.writer`` devolve a linha em vez de guardá-la."""
+
+    def write(self, value):
+        return value
+
+
+def escape_text(value: str) -> str:
+    """
+    Texto que o Excel leria como fórmula (``=HYPERLINK(...)``, ``@SUM(...)``)
+    ganha um ``'`` na frente e aparece como texto.
+    """
+    if value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def unescape_text(value: str) -> str:
+    """Desfaz ``escape_text`` (importação de um arquivo exportado)."""
+    if value.startswith("'") and value[1:].startswith(FORMULA_PREFIXES):
+        return value[1:]
+    return value
+
+
+def format_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "sim" if value else "não"
+    if isinstance(value, Decimal):
+        return f"{value:.2f}".replace(".", ",")
+    if isinstance(value, str):
+        return escape_text(value)
+    return value
+
+
+def labels(model, fields):
+    return [str(model._meta.get_field(name).verbose_name) for name in fields]
+
+
+class _Buffer:
+    """Junta as linhas em blocos de ~``BUFFER_SIZE`` caracteres (não uma escrita por linha)."""
+
+    def __init__(self):
+        self.writer = csv.writer(_Echo(), delimiter=DELIMITER)
+        self.lines, self.size = [], 0
+
+    def header(self, header):
+        return "\ufeff" + self.writer.writerow(header)
+
+    def add(self, row):
+        """Devolve um bloco quando o buffer enche; senão, ``None``."""
+        line = self.writer.writerow([format_value(value) for value in row])
+        self.lines.append(line)
+        self.size += len(line)
+        if self.size >= BUFFER_SIZE:
+            return self.flush()
+        return None
+
+    def flush(self):
+        chunk = "".join(self.lines)
+        self.lines, self.size = [], 0
+        return chunk
+
+
+def stream_rows(header, rows):
+    buffer = _Buffer()
+    yield buffer.header(header)
+    for row in rows:
+        chunk = buffer.add(row)
+        if chunk:
+            yield chunk
+    if buffer.lines:
+        yield buffer.flush()
+
+
+async def astream_rows(header, rows):
+    """``stream_rows`` para um iterador assíncrono de linhas."""
+    buffer = _Buffer()
+    yield buffer.header(header)
+    async for row in rows:
+        chunk = buffer.add(row)
+        if chunk:
+            yield chunk
+    if buffer.lines:
+        yield buffer.flush()
+
+
+def csv_response(filename, header, rows):
+    """``rows`` pode ser síncrono ou assíncrono (views de ``core.async_views``)."""
+    if hasattr(rows, "__aiter__"):
+        content = astream_rows(header, rows)
+    else:
+        content = stream_rows(header, rows)
+    response = StreamingHttpResponse(content, content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def contact_header():
+    return labels(Contact, CONTACT_EXPORT_FIELDS)
+
+
+def contact_rows(queryset):
+    return queryset.values_list(*CONTACT_EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def _aiterator(queryset, fields):
+    # named=True: no Django 5.0 o aiterator() do values_list() comum executa
+    # a consulta no próprio event loop (SynchronousOnlyOperation). A namedtuple
+    # continua sendo uma tupla para o csv.writer.
+    return queryset.values_list(*fields, named=True).aiterator(chunk_size=CHUNK_SIZE)
+
+
+def acontact_rows(queryset):
+    return _aiterator(queryset, CONTACT_EXPORT_FIELDS)
+
+
+def product_header():
+    header = labels(Product, PRODUCT_EXPORT_FIELDS)
+    return header[:4] + ["Lucro (R$)", "Lucro (%)"] + header[4:]
+
+
+def product_rows(queryset):
+    """``queryset`` precisa vir de ``Product.objects.with_profit()``."""
+    rows = queryset.values_list(*PRODUCT_ROW_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+    for name, unit, *values in rows:
+        yield (name, PRODUCT_UNITS.get(unit, unit), *values)
+
+
+async def aproduct_rows(queryset):
+    async for name, unit, *values in _aiterator(queryset, PRODUCT_ROW_FIELDS):
+        yield (name, PRODUCT_UNITS.get(unit, unit), *values)
+
+
+def sector_header():
+    return labels(Sector, SECTOR_EXPORT_FIELDS)
+
+
+def sector_rows(queryset):
+    return queryset.values_list(*SECTOR_EXPORT_FIELDS).iterator(chunk_size=CHUNK_SIZE)
+
+
+def asector_rows(queryset):
+    return _aiterator(queryset, SECTOR_EXPORT_FIELDS)
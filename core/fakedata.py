@@ -0,0 +1,169 @@
+"""
+Gerador de dados sintéticos (empresas, contatos, produtos, setores,
+usuários e propostas) para testes de carga e benchmarks.
+
+Todos os geradores recebem um ``random.Random`` para que a mesma semente
+produza sempre os mesmos dados.
+"""
+from decimal import Decimal
+
+from . import documents
+
+FIRST_NAMES = (
+    "Ana", "Antônio", "Beatriz", "Bruno", "Camila", "Carlos", "Cláudia",
+    "Daniel", "Débora", "Eduardo", "Fernanda", "Francisco", "Gabriel",
+    "Helena", "Igor", "Isabela", "João", "José", "Juliana", "Larissa",
+    "Lucas", "Luíza", "Marcelo", "Maria", "Mateus", "Natália", "Otávio",
+    "Patrícia", "Paulo", "Rafael", "Renata", "Rodrigo", "Sônia", "Thiago",
+    "Vanessa", "Vinícius",
+)
+LAST_NAMES = (
+    "Silva", "Santos", "Oliveira", "Souza", "Rodrigues", "Ferreira",
+    "Alves", "Pereira", "Lima", "Gomes", "Costa", "Ribeiro", "Martins",
+    "Carvalho", "Almeida", "Lopes", "Soares", "Fernandes", "Vieira",
+    "Barbosa", "Rocha", "Dias", "Nascimento", "Andrade", "Moreira", "Araújo",
+)
+COMPANY_WORDS = (
+    "Vidros", "Esquadrias", "Comunicação Visual", "Serralheria", "Gráfica",
+    "Construções", "Materiais", "Acabamentos", "Reformas", "Decorações",
+    "Instalações", "Engenharia", "Distribuidora", "Comércio",
+)
+COMPANY_SUFFIXES = ("Ltda", "ME", "EIRELI", "S.A.", "EPP")
+STREETS = (
+    "Rua das Flores", "Avenida Brasil", "Rua São João", "Avenida Paulista",
+    "Rua XV de Novembro", "Rua Sete de Setembro", "Avenida Getúlio Vargas",
+    "Rua Dom Pedro II", "Rua Tiradentes", "Avenida Beira Mar",
+)
+DISTRICTS = (
+    "Centro", "Jardim América", "Boa Vista", "Vila Nova", "Santa Cruz",
+    "São José", "Industrial", "Aeroporto", "Bela Vista", "Liberdade",
+)
+# (cidade, UF, DDD, faixa inicial de CEP)
+CITIES = (
+    ("São Paulo", "SP", "11", 1000),
+    ("Campinas", "SP", "19", 13000),
+    ("Rio de Janeiro", "RJ", "21", 20000),
+    ("Belo Horizonte", "MG", "31", 30000),
+    ("Salvador", "BA", "71", 40000),
+    ("Recife", "PE", "81", 50000),
+    ("Fortaleza", "CE", "85", 60000),
+    ("Goiânia", "GO", "62", 74000),
+    ("Curitiba", "PR", "41", 80000),
+    ("Porto Alegre", "RS", "51", 90000),
+)
+PRODUCTS = (
+    "Vidro temperado 8mm", "Vidro laminado 6mm", "Espelho 4mm",
+    "Box de banheiro", "Porta de correr", "Janela maxim-ar",
+    "Adesivo vinil", "Lona impressa", "Placa ACM", "Fachada em ACM",
+    "Guarda-corpo", "Tampo de mesa", "Divisória", "Película jateada",
+    "Letreiro luminoso", "Totem", "Banner", "Cobertura policarbonato",
+)
+SECTORS = (
+    "Comercial", "Financeiro", "Produção", "Instalação", "Compras",
+    "Administrativo", "Expedição", "Projetos", "Atendimento", "Marketing",
+)
+
+
+def cpf(rng) -> str:
+    base = "".join(str(rng.randint(0, 9)) for _ in range(9))
+    return documents.format_document(documents.complete(base))
+
+
+def cnpj(rng) -> str:
+    base = "".join(str(rng.randint(0, 9)) for _ in range(8)) + "0001"
+    return documents.format_document(documents.complete(base))
+
+
+def person_name(rng) -> str:
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def company_name(rng) -> str:
+    return f"{rng.choice(LAST_NAMES)} {rng.choice(COMPANY_WORDS)}"
+
+
+def slug(text: str) -> str:
+    table = str.maketrans("áàâãéêíóôõúüç", "aaaaeeiooouuc")
+    return "".join(ch for ch in text.lower().translate(table) if ch.isalnum())
+
+
+def address(rng) -> dict:
+    city, uf, ddd, cep_base = rng.choice(CITIES)
+    cep = f"{(cep_base + rng.randint(0, 999)) * 1000 + rng.randint(0, 999):08d}"
+    return {
+        "cep": f"{cep[:5]}-{cep[5:]}",
+        "address": rng.choice(STREETS),
+        "number": str(rng.randint(1, 3000)),
+        "district": rng.choice(DISTRICTS),
+        "city": city,
+        "uf": uf,
+        "ddd": ddd,
+    }
+
+
+def phone(rng, ddd: str) -> str:
+    return f"({ddd}) 9{rng.randint(1000, 9999)}-{rng.randint(0, 9999):04d}"
+
+
+def contact_fields(rng) -> dict:
+    place = address(rng)
+    ddd = place.pop("ddd")
+    is_company = rng.random() < 0.4
+    if is_company:
+        display = company_name(rng)
+        legal = f"{display} {rng.choice(COMPANY_SUFFIXES)}"
+        document = cnpj(rng)
+    else:
+        display = person_name(rng)
+        legal = None
+        document = cpf(rng)
+    is_seller = rng.random() < 0.05
+    if rng.random() >= 0.9:
+        document = None
+    return {
+        "display_name": display,
+        "legal_name": legal,
+        "document": document,
+        # Os contatos sintéticos entram por bulk_create, que não chama save().
+        "normalized_document": documents.normalize(document),
+        "phone": phone(rng, ddd),
+        "email": f"{slug(display)[:30]}{rng.randint(1, 999)}@example.com",
+        "is_active": rng.random() < 0.9,
+        "is_client": rng.random() < 0.7,
+        "is_supplier": rng.random() < 0.15,
+        "is_partner": rng.random() < 0.05,
+        "is_employee": rng.random() < 0.05,
+        "is_other": rng.random() < 0.02,
+        "is_seller": is_seller,
+        "commission": Decimal(rng.choice(("2.50", "3.00", "5.00"))) if is_seller else None,
+        **place,
+    }
+
+
+def product_fields(rng) -> dict:
+    cost = Decimal(rng.randint(500, 50000)) / 100
+    markup = Decimal(rng.randint(110, 250)) / 100
+    return {
+        "name": f"{rng.choice(PRODUCTS)} {rng.randint(1, 999)}",
+        "unit": rng.choice(("M2", "UN")),
+        "cost_price": cost if rng.random() < 0.85 else None,
+        "price": (cost * markup).quantize(Decimal("0.01")),
+        "is_active": rng.random() < 0.9,
+    }
+
+
+def proposal_item_fields(rng, unit: str) -> dict:
+    """Quantidade, medidas (só m²) e desconto de um item de proposta."""
+    fields = {
+        "quantity": Decimal(rng.randint(1, 20)),
+        "discount_percent": Decimal(rng.choice((0, 0, 0, 5, 10))),
+    }
+    if unit == "M2":
+        fields["width"] = Decimal(rng.randint(300, 3000)) / 1000
+        fields["height"] = Decimal(rng.randint(300, 2500)) / 1000
+    return fields
+
+
+def sector_name(rng, index: int) -> str:
+    base = SECTORS[index % len(SECTORS)]
+    return base if index < len(SECTORS) else f"{base} {index // len(SECTORS) + 1}"
@@ -1,10 +1,18 @@
+from decimal import Decimal
+
 from django import forms
 from django.contrib.auth.models import User
+from django.core.files.uploadedfile import UploadedFile
+from django.db.models import Q
 
+from . import documents, repricing
+from .images import validate_logo
 from .models import (
     Company,
     Contact,
     Product,
+    Proposal,
+    ProposalItem,
     Sector,
     UserCompany,
     UserPermission,
@@ -12,6 +20,17 @@ from .models import (
 )
 
 
+def _clean_cnpj(value, company=None):
+    documents.validate_cnpj(value)
+    if value:
+        others = Company.objects.filter(normalized_cnpj=documents.digits(value))
+        if company is not None:
+            others = others.exclude(pk=company.pk)
+        if others.exists():
+            raise forms.ValidationError("Já existe uma empresa com este CNPJ.")
+    return documents.format_document(value) or None
+
+
 class CompanySignUpForm(forms.Form):
     company_name = forms.CharField(label="Nome da empresa", max_length=255)
     company_email = forms.EmailField(label="E-mail da empresa")
@@ -39,6 +58,9 @@ class CompanySignUpForm(forms.Form):
             raise forms.ValidationError("Este nome de usuário já está em uso.")
         return username
 
+    def clean_cnpj(self):
+        return _clean_cnpj(self.cleaned_data["cnpj"])
+
     def clean_admin_email(self):
         email = self.cleaned_data["admin_email"]
         if User.objects.filter(email=email).exists():
@@ -88,6 +110,25 @@ class ContactForm(forms.ModelForm):
             "notes": forms.Textarea(attrs={"rows": 3}),
         }
 
+    def clean_document(self):
+        document = self.cleaned_data.get("document")
+        documents.validate_document(document)
+        return documents.format_document(document) or None
+
+
+class ContactImportForm(forms.Form):
+    ENCODING_CHOICES = [
+        ("utf-8-sig", "UTF-8"),
+        ("latin-1", "ISO-8859-1 (Excel antigo)"),
+    ]
+
+    file = forms.FileField(label="Arquivo CSV")
+    encoding = forms.ChoiceField(
+        label="Codificação",
+        choices=ENCODING_CHOICES,
+        initial="utf-8-sig",
+    )
+
 
 class ProductForm(forms.ModelForm):
     class Meta:
@@ -102,6 +143,108 @@ class ProductForm(forms.ModelForm):
         }
 
 
+class ProductFilterForm(forms.Form):
+    """Filtros e ordenação da listagem de produtos (querystring)."""
+
+    SORT_FIELDS = ("name", "unit", "cost_price", "price", "profit", "margin", "is_active")
+    STATUS_CHOICES = [
+        ("", "Todos"),
+        ("ativo", "Ativos"),
+        ("inativo", "Inativos"),
+    ]
+
+    unit = forms.ChoiceField(
+        label="Unidade",
+        choices=[("", "Todas")] + Product.UNIT_CHOICES,
+        required=False,
+    )
+    status = forms.ChoiceField(label="Status", choices=STATUS_CHOICES, required=False)
+    margin_min = forms.DecimalField(label="Margem mínima (%)", required=False)
+    margin_max = forms.DecimalField(label="Margem máxima (%)", required=False)
+    sort = forms.ChoiceField(
+        choices=[(name, name) for field in SORT_FIELDS for name in (field, f"-{field}")],
+        required=False,
+        widget=forms.HiddenInput,
+    )
+
+    def filter(self, queryset):
+        """Aplica os filtros válidos a um queryset anotado com ``with_profit()``."""
+        data = self._valid_data()
+        if data.get("unit"):
+            queryset = queryset.filter(unit=data["unit"])
+        if data.get("status"):
+            queryset = queryset.filter(is_active=data["status"] == "ativo")
+        if data.get("margin_min") is not None:
+            queryset = queryset.filter(margin__gte=data["margin_min"])
+        if data.get("margin_max") is not None:
+            queryset = queryset.filter(margin__lte=data["margin_max"])
+        return queryset
+
+    def ordering(self):
+        return (self._valid_data().get("sort") or "name", "id")
+
+    def _valid_data(self):
+        # Campos inválidos são ignorados; os demais filtros continuam valendo.
+        self.is_valid()
+        return getattr(self, "cleaned_data", {})
+
+
+class RepricingForm(ProductFilterForm):
+    """Filtros de ``ProductFilterForm`` (mais o nome) e o reajuste a aplicar."""
+
+    TARGET_CHOICES = [
+        ("price", "Valor de venda"),
+        ("cost_price", "Valor de custo"),
+        ("both", "Venda e custo"),
+    ]
+    MODE_CHOICES = [
+        ("percent", "Percentual (%)"),
+        ("amount", "Valor fixo (R$)"),
+    ]
+    STEP_CHOICES = [
+        ("0.01", "R$ 0,01"),
+        ("0.05", "R$ 0,05"),
+        ("0.10", "R$ 0,10"),
+        ("0.50", "R$ 0,50"),
+        ("1.00", "R$ 1,00"),
+    ]
+
+    sort = None
+    name = forms.CharField(label="Nome contém", max_length=255, required=False)
+    target = forms.ChoiceField(label="Reajustar", choices=TARGET_CHOICES)
+    mode = forms.ChoiceField(label="Tipo", choices=MODE_CHOICES)
+    value = forms.DecimalField(
+        label="Reajuste",
+        max_digits=12,
+        decimal_places=4,
+        help_text="Use valores negativos para reduzir.",
+    )
+    step = forms.ChoiceField(label="Arredondar para", choices=STEP_CHOICES, initial="0.01")
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get("mode") == "percent" and cleaned_data.get("value") is not None:
+            if cleaned_data["value"] <= -100:
+                self.add_error("value", "A redução percentual precisa ser menor que 100%.")
+        return cleaned_data
+
+    def filter(self, queryset):
+        queryset = super().filter(queryset)
+        name = self._valid_data().get("name")
+        if name:
+            queryset = queryset.filter(name__icontains=name)
+        return queryset
+
+    def adjustment(self):
+        data = self.cleaned_data
+        return repricing.Adjustment(
+            target=data["target"],
+            mode=data["mode"],
+            value=data["value"],
+            step=Decimal(data["step"]),
+        )
+
+
 class SectorForm(forms.ModelForm):
     class Meta:
         model = Sector
@@ -112,6 +255,166 @@ class SectorForm(forms.ModelForm):
         }
 
 
+# -------- PROPOSTAS --------
+
+class ProposalFilterForm(forms.Form):
+    """Filtro e ordenação da listagem de propostas (querystring)."""
+
+    SORT_FIELDS = ("number", "issued_on", "total", "status")
+
+    status = forms.ChoiceField(
+        label="Status",
+        choices=[("", "Todos")] + Proposal.STATUS_CHOICES,
+        required=False,
+    )
+    sort = forms.ChoiceField(
+        choices=[(name, name) for field in SORT_FIELDS for name in (field, f"-{field}")],
+        required=False,
+        widget=forms.HiddenInput,
+    )
+
+    def filter(self, queryset):
+        status = self._valid_data().get("status")
+        return queryset.filter(status=status) if status else queryset
+
+    def ordering(self):
+        return (self._valid_data().get("sort") or "-number", "id")
+
+    def _valid_data(self):
+        self.is_valid()
+        return getattr(self, "cleaned_data", {})
+
+
+class ProposalForm(forms.ModelForm):
+    class Meta:
+        model = Proposal
+        fields = [
+            "contact",
+            "seller",
+            "status",
+            "issued_on",
+            "valid_until",
+            "discount_percent",
+            "commission_percent",
+            "notes",
+        ]
+        widgets = {
+            # Escolhido pela busca de clientes (static/js/proposal.js).
+            "contact": forms.HiddenInput,
+            "issued_on": forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"),
+            "valid_until": forms.DateInput(attrs={"type": "date"}, format="%Y-%m-%d"),
+            "notes": forms.Textarea(attrs={"rows": 3}),
+        }
+        help_texts = {
+            "commission_percent": "Em branco, usa a comissão do vendedor.",
+        }
+
+    def __init__(self, *args, company, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["contact"].queryset = Contact.objects.filter(company=company).order_by()
+        self.fields["contact"].error_messages["invalid_choice"] = "Escolha um cliente da lista."
+        sellers = Q(is_seller=True, is_active=True)
+        if self.instance.seller_id:
+            sellers |= Q(pk=self.instance.seller_id)
+        self.fields["seller"].queryset = (
+            Contact.objects.filter(sellers, company=company)
+            .order_by("display_name")
+            .only("id", "display_name", "commission")
+        )
+
+    def contact_label(self):
+        """Nome do cliente escolhido, para o campo de busca."""
+        contact = getattr(self, "cleaned_data", {}).get("contact")
+        if contact is None and self.instance.contact_id:
+            contact = self.instance.contact
+        return contact.display_name if contact else ""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        seller = cleaned_data.get("seller")
+        if seller and cleaned_data.get("commission_percent") is None:
+            cleaned_data["commission_percent"] = seller.commission
+        return cleaned_data
+
+
+class ProposalItemForm(forms.ModelForm):
+    # Escolhido pela busca de produtos; os produtos do formset inteiro são
+    # carregados de uma vez em ``BaseProposalItemFormSet.clean``.
+    product_id = forms.IntegerField(widget=forms.HiddenInput)
+
+    class Meta:
+        model = ProposalItem
+        fields = ["quantity", "width", "height", "unit_price", "discount_percent"]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["unit_price"].required = False
+        self.fields["unit_price"].help_text = "Em branco, usa o valor de venda do produto."
+        if self.instance.product_id:
+            self.fields["product_id"].initial = self.instance.product_id
+
+
+class BaseProposalItemFormSet(forms.BaseInlineFormSet):
+    def __init__(self, *args, company, **kwargs):
+        self.company = company
+        super().__init__(*args, **kwargs)
+
+    def kept_forms(self):
+        return [
+            form
+            for form in self.forms
+            if getattr(form, "cleaned_data", None) and form not in self.deleted_forms
+        ]
+
+    def clean(self):
+        super().clean()
+        kept = self.kept_forms()
+        if not kept:
+            raise forms.ValidationError("Inclua ao menos um item.")
+        ids = {form.cleaned_data.get("product_id") for form in kept}
+        products = (
+            Product.objects.filter(company=self.company)
+            .order_by()
+            .only("id", "name", "unit", "price")
+            .in_bulk([pk for pk in ids if pk])
+        )
+        for form in kept:
+            product = products.get(form.cleaned_data.get("product_id"))
+            if product is None:
+                form.add_error(None, "Escolha um produto da lista.")
+                continue
+            item = form.instance
+            if item.product_id != product.pk:
+                # Nome e unidade ficam como estavam quando o produto entrou.
+                item.product = product
+                item.description = product.name
+                item.unit = product.unit
+            if item.unit_price is None:
+                item.unit_price = product.price
+            if item.unit == "M2":
+                if item.width is None or item.height is None:
+                    form.add_error("width", "Informe largura e altura para itens em m².")
+            else:
+                item.width = item.height = None
+
+    def items(self):
+        """Itens que ficam, na ordem da tela (instâncias ainda não gravadas)."""
+        return [form.instance for form in self.kept_forms()]
+
+    def deleted_ids(self):
+        return [form.instance.pk for form in self.deleted_forms if form.instance.pk]
+
+
+ProposalItemFormSet = forms.inlineformset_factory(
+    Proposal,
+    ProposalItem,
+    form=ProposalItemForm,
+    formset=BaseProposalItemFormSet,
+    extra=3,
+    can_delete=True,
+)
+
+
 # -------- AJUSTES --------
 
 class CompanySettingsForm(forms.ModelForm):
@@ -149,6 +452,15 @@ class CompanySettingsForm(forms.ModelForm):
             "whatsapp_default_message": forms.Textarea(attrs={"rows": 3}),
         }
 
+    def clean_cnpj(self):
+        return _clean_cnpj(self.cleaned_data.get("cnpj"), self.instance)
+
+    def clean_logo(self):
+        logo = self.cleaned_data.get("logo")
+        if isinstance(logo, UploadedFile):
+            validate_logo(logo)
+        return logo
+
 
 class UserPreferenceForm(forms.ModelForm):
     class Meta:
@@ -189,6 +501,11 @@ class UserCreateForm(forms.Form):
         required=False,
         initial=False,
     )
+    can_manage_proposals = forms.BooleanField(
+        label="Pode gerenciar propostas",
+        required=False,
+        initial=False,
+    )
 
     password = forms.CharField(
         label="Senha",
@@ -255,6 +572,10 @@ class UserUpdateForm(forms.Form):
         label="Pode gerenciar setores",
         required=False,
     )
+    can_manage_proposals = forms.BooleanField(
+        label="Pode gerenciar propostas",
+        required=False,
+    )
 
     password = forms.CharField(
         label="Nova senha (opcional)",
@@ -0,0 +1,166 @@
+"""
+Logo da empresa: validação do upload e geração das variantes.
+
+O upload é decodificado por completo com o Pillow antes de ser aceito, com
+limite de tamanho do arquivo e de pixels (proteção contra "decompression
+bombs": um PNG pequeno que vira gigabytes na memória). As variantes em WebP
+e PNG, limitadas a cada caixa de ``LOGO_VARIANTS``, são geradas em segundo
+plano (``core.tasks``) e registradas em ``Company.logo_variants``.
+"""
+import io
+import logging
+import posixpath
+import warnings
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Q
+from PIL import Image, UnidentifiedImageError
+
+from . import tenancy
+from .models import Company
+
+logger = logging.getLogger("sispeed.tasks")
+
+ALLOWED_FORMATS = {"PNG", "JPEG", "WEBP", "GIF"}
+
+# Nome -> caixa máxima (largura, altura) em pixels, já com folga para telas
+# de alta densidade.
+LOGO_VARIANTS = {
+    "sidebar": (96, 96),
+    "header": (480, 160),
+    "print": (1200, 400),
+}
+
+VARIANT_FORMATS = (
+    ("webp", "WEBP", {"quality": 85, "method": 4}),
+    ("png", "PNG", {"optimize": True}),
+)
+
+
+def _open(fp):
+    """Abre e decodifica a imagem, tratando o aviso de bomba como erro."""
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", Image.DecompressionBombWarning)
+        image = Image.open(fp)
+        width, height = image.size
+        if width * height > settings.LOGO_MAX_PIXELS:
+            raise Image.DecompressionBombError(f"{width}x{height}")
+        image.load()
+    return image
+
+
+def validate_logo(upload):
+    if upload.size > settings.LOGO_MAX_UPLOAD_SIZE:
+        limit = settings.LOGO_MAX_UPLOAD_SIZE // (1024 * 1024)
+        raise ValidationError(f"A imagem deve ter no máximo {limit} MB.")
+    position = upload.tell()
+    try:
+        image = _open(upload)
+    except (Image.DecompressionBombWarning, Image.DecompressionBombError):
+        raise ValidationError("A imagem tem dimensões grandes demais.")
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        raise ValidationError("Envie uma imagem PNG, JPEG, WebP ou GIF válida.")
+    finally:
+        upload.seek(position)
+    if image.format not in ALLOWED_FORMATS:
+        raise ValidationError("Envie uma imagem PNG, JPEG, WebP ou GIF válida.")
+    return image.size
+
+
+def _prepare(image):
+    image = image.copy()
+    if image.mode not in ("RGB", "RGBA"):
+        has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+    return image
+
+
+def render_variants(image, base_path):
+    """Grava as variantes de ``image`` no storage. Devolve a lista de metadados."""
+    image = _prepare(image)
+    variants = []
+    for name, (max_width, max_height) in LOGO_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((max_width, max_height), Image.Resampling.LANCZOS)
+        for extension, fmt, options in VARIANT_FORMATS:
+            buffer = io.BytesIO()
+            resized.save(buffer, fmt, **options)
+            path = default_storage.save(
+                f"{base_path}-{name}.{extension}", ContentFile(buffer.getvalue())
+            )
+            variants.append(
+                {
+                    "name": name,
+                    "format": extension,
+                    "path": path,
+                    "width": resized.width,
+                    "height": resized.height,
+                    "max_width": max_width,
+                    "max_height": max_height,
+                    "bytes": buffer.tell(),
+                }
+            )
+    return variants
+
+
+def delete_variants(logo_variants):
+    for variant in (logo_variants or {}).get("variants", []):
+        default_storage.delete(variant["path"])
+
+
+def generate_logo_variants(company_id):
+    """
+    Gera as variantes do logo atual da empresa. Se o logo mudar enquanto a
+    tarefa roda, o resultado é descartado (a próxima tarefa cuida dele).
+    """
+    company = Company.objects.only("logo", "logo_variants").filter(pk=company_id).first()
+    if company is None:
+        return
+    previous = company.logo_variants
+    source = company.logo.name if company.logo else ""
+
+    variants = {}
+    if source:
+        stem = posixpath.splitext(posixpath.basename(source))[0]
+        base_path = posixpath.join(posixpath.dirname(source), "variants", stem)
+        with company.logo.open("rb") as fp:
+            image = _open(fp)
+        variants = {"source": source, "variants": render_variants(image, base_path)}
+
+    current = Company.objects.filter(pk=company_id)
+    if source:
+        current = current.filter(logo=source)
+    else:
+        current = current.filter(Q(logo="") | Q(logo__isnull=True))
+    updated = current.update(logo_variants=variants)
+    if not updated:
+        delete_variants(variants)
+        return
+    if previous != variants:
+        delete_variants(previous)
+    # O update() não dispara sinais: o tenant em cache guarda a empresa.
+    tenancy.invalidate_company(company_id)
+    logger.info("Variantes do logo da empresa %s geradas (%s)", company_id, source or "-")
+
+
+def pick_variant(logo_variants, width, height=None, fmt="png"):
+    """
+    Menor variante em ``fmt`` cuja caixa cobre ``width`` x ``height``; se
+    nenhuma cobrir, a maior disponível. None se não há variantes.
+    """
+    height = height or width
+    candidates = [
+        variant
+        for variant in (logo_variants or {}).get("variants", [])
+        if variant["format"] == fmt
+    ]
+    if not candidates:
+        return None
+    candidates.sort(key=lambda variant: variant["max_width"] * variant["max_height"])
+    for variant in candidates:
+        if variant["max_width"] >= width and variant["max_height"] >= height:
+            return variant
+    return candidates[-1]
@@ -0,0 +1,245 @@
+"""
+Importação de contatos por CSV.
+
+O arquivo é lido como stream (linha a linha), cada linha é validada com as
+mesmas regras do ``ContactForm`` e as linhas válidas são gravadas com
+``bulk_create`` em lotes, cada lote na sua própria transação. As linhas
+rejeitadas vão para um CSV de erros com o número da linha, o motivo e os
+valores originais, pronto para corrigir e importar de novo.
+
+Um CPF/CNPJ que já existe na empresa (ou que se repete no arquivo) é
+rejeitado; a verificação é uma consulta ``IN`` por lote, não uma por linha.
+"""
+import csv
+import io
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connection, transaction
+
+from . import documents, exports, listcache, search, stats
+from .forms import ContactForm
+from .models import Contact
+
+BATCH_SIZE = 2000
+
+TRUE_VALUES = {"1", "s", "sim", "true", "t", "x", "yes", "y", "on", "verdadeiro"}
+
+REPORT_PREFIX = "contatos"
+
+DUPLICATE_MESSAGE = "CPF/CNPJ já cadastrado."
+
+
+class InvalidFileError(Exception):
+    """O arquivo não pode ser importado (ex.: falta uma coluna obrigatória)."""
+
+
+@dataclass
+class ImportResult:
+    created: int = 0
+    rejected: int = 0
+    errors_preview: list = field(default_factory=list)
+
+    @property
+    def total(self) -> int:
+        return self.created + self.rejected
+
+
+class ContactRowValidator:
+    """
+    Valida linhas com as regras do ``ContactForm`` sem criar um form por
+    linha: os campos do form são limpos um a um, incluindo os métodos
+    ``clean_<campo>`` e o ``clean()`` do form, como em ``Form.full_clean``.
+    """
+
+    def __init__(self, columns):
+        self.form = ContactForm()
+        self.fields = self.form.fields
+        # Colunas ausentes no arquivo usam o padrão do modelo, não "vazio".
+        self.defaults = {
+            name: Contact._meta.get_field(name).get_default()
+            for name in self.fields
+            if name not in columns
+        }
+
+    def _prepare(self, name, field, value):
+        value = (value or "").strip()
+        if isinstance(field, forms.BooleanField):
+            return value.lower() in TRUE_VALUES
+        if isinstance(field, forms.DecimalField) and "," in value:
+            return value.replace(".", "").replace(",", ".")
+        return value
+
+    def clean(self, row: dict):
+        cleaned = dict(self.defaults)
+        errors = {}
+        self.form.cleaned_data = cleaned
+        for name, field in self.fields.items():
+            if name in self.defaults:
+                continue
+            try:
+                cleaned[name] = field.clean(self._prepare(name, field, row.get(name)))
+                hook = getattr(self.form, f"clean_{name}", None)
+                if hook is not None:
+                    cleaned[name] = hook()
+            except ValidationError as exc:
+                errors[name] = exc.messages
+                cleaned.pop(name, None)
+        if not errors:
+            try:
+                self.form.clean()
+            except ValidationError as exc:
+                errors["__all__"] = exc.messages
+        return cleaned, errors
+
+
+def header_aliases() -> dict:
+    """Aceita no cabeçalho o nome do campo ou o rótulo ("CPF/CNPJ", "Cidade"...)."""
+    aliases = {}
+    for name in ContactForm.Meta.fields:
+        model_field = Contact._meta.get_field(name)
+        aliases[name.lower()] = name
+        aliases[str(model_field.verbose_name).strip().lower()] = name
+    return aliases
+
+
+def _detect_delimiter(header_line: str) -> str:
+    return ";" if header_line.count(";") > header_line.count(",") else ","
+
+
+def existing_documents(company_id, normalized) -> set:
+    """Quais dos documentos (só dígitos) já estão nos contatos da empresa."""
+    normalized = sorted(normalized)
+    # Respeita o limite de parâmetros do banco (999 em SQLite antigos).
+    step = (connection.features.max_query_params or len(normalized) + 1) - 1
+    found = set()
+    for start in range(0, len(normalized), step):
+        found.update(
+            Contact.objects.filter(
+                company_id=company_id,
+                normalized_document__in=normalized[start : start + step],
+            )
+            .order_by()
+            .values_list("normalized_document", flat=True)
+        )
+    return found
+
+
+def format_errors(errors: dict) -> str:
+    parts = []
+    for name, messages in errors.items():
+        label = "linha" if name == "__all__" else name
+        parts.append(f"{label}: {' '.join(messages)}")
+    return "; ".join(parts)
+
+
+def report_path(company_id, token) -> Path:
+    return Path(settings.IMPORT_REPORTS_DIR) / f"{REPORT_PREFIX}-{company_id}-{token}.csv"
+
+
+def new_report(company_id):
+    """Abre um novo relatório de erros. Retorna ``(token, caminho)``."""
+    token = uuid.uuid4().hex
+    path = report_path(company_id, token)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return token, path
+
+
+def import_contacts(company, binary_file, *, encoding="utf-8-sig", errors_file=None,
+                    batch_size=BATCH_SIZE, preview_limit=20) -> ImportResult:
+    """
+    Importa os contatos de ``binary_file`` (arquivo aberto em modo binário)
+    para ``company``. Se ``errors_file`` (texto) for informado, recebe o CSV
+    das linhas rejeitadas.
+    """
+    result = ImportResult()
+    text = io.TextIOWrapper(binary_file, encoding=encoding, newline="")
+    header_line = text.readline()
+    if not header_line.strip():
+        return result
+
+    delimiter = _detect_delimiter(header_line)
+    raw_header = next(csv.reader([header_line], delimiter=delimiter))
+    aliases = header_aliases()
+    columns = [aliases.get(col.strip().lower()) for col in raw_header]
+    missing = [
+        str(Contact._meta.get_field(name).verbose_name)
+        for name, form_field in ContactForm.base_fields.items()
+        if form_field.required and name not in columns
+    ]
+    if missing:
+        text.detach()
+        raise InvalidFileError(f"Coluna obrigatória ausente: {', '.join(missing)}.")
+
+    validator = ContactRowValidator({col for col in columns if col})
+    error_writer = None
+    if errors_file is not None:
+        error_writer = csv.writer(errors_file, delimiter=delimiter)
+        error_writer.writerow(["linha", "erros", *raw_header])
+
+    batch = []  # (número da linha, valores originais, contato)
+
+    def reject(line_no, values, message):
+        result.rejected += 1
+        if len(result.errors_preview) < preview_limit:
+            result.errors_preview.append((line_no, message))
+        if error_writer is not None:
+            error_writer.writerow([line_no, message, *map(exports.escape_text, values)])
+
+    def flush():
+        if not batch:
+            return
+        # Uma consulta por lote, no índice (company, normalized_document); os
+        # lotes anteriores já estão gravados e entram nela também.
+        seen = existing_documents(
+            company.pk, {c.normalized_document for _, _, c in batch} - {None}
+        )
+        contacts = []
+        for line_no, values, contact in batch:
+            document = contact.normalized_document
+            if document is not None and document in seen:
+                reject(line_no, values, f"document: {DUPLICATE_MESSAGE}")
+                continue
+            seen.add(document)
+            contacts.append(contact)
+        batch.clear()
+        if not contacts:
+            return
+        with transaction.atomic():
+            created = Contact.objects.bulk_create(contacts)
+            search.index_contacts(created, new=True)
+            # bulk_create não dispara sinais: soma os contadores do lote.
+            stats.apply(company.pk, stats.total_contribution(created))
+            listcache.bump(company.pk, Contact)
+        result.created += len(created)
+
+    # A linha 1 é o cabeçalho. Um campo entre aspas pode ocupar várias linhas
+    # do arquivo: o número informado é a linha onde o registro começa.
+    reader = csv.reader(text, delimiter=delimiter)
+    consumed = 0
+    for values in reader:
+        line_no, consumed = consumed + 2, reader.line_num
+        if not any(value.strip() for value in values):
+            continue
+        row = {col: exports.unescape_text(value) for col, value in zip(columns, values) if col}
+        cleaned, errors = validator.clean(row)
+        if errors:
+            reject(line_no, values, format_errors(errors))
+            continue
+
+        contact = Contact(
+            company_id=company.pk,
+            normalized_document=documents.normalize(cleaned.get("document")),
+            **cleaned,
+        )
+        batch.append((line_no, values, contact))
+        if len(batch) >= batch_size:
+            flush()
+    flush()
+
+    text.detach()
+    return result
@@ -0,0 +1,168 @@
+"""
+Medição de tempo por requisição: consultas SQL, renderização de templates e
+tempo total da view.
+
+Os números vão no cabeçalho ``Server-Timing`` (visível no DevTools do
+navegador) e, quando passam dos limites configurados em ``settings``,
+uma linha JSON é gravada no log de lentidão (``logging`` ``sispeed.slow``).
+"""
+import json
+import logging
+import os
+import traceback
+from contextvars import ContextVar
+from logging.handlers import RotatingFileHandler
+from time import perf_counter
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+from django.template.backends.django import Template as DjangoTemplate
+
+slow_logger = logging.getLogger("sispeed.slow")
+
+_current = ContextVar("request_timing", default=None)
+
+_THIS_FILE = os.path.abspath(__file__)
+_PROJECT_DIR = str(settings.BASE_DIR)
+
+
+class RequestTiming:
+    __slots__ = (
+        "url_name", "start", "queries", "sql_ms", "template_ms", "slow_queries", "marks"
+    )
+
+    def __init__(self):
+        self.url_name = None
+        self.start = perf_counter()
+        self.queries = []
+        self.sql_ms = 0.0
+        self.template_ms = 0.0
+        self.slow_queries = []
+        self.marks = []
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (perf_counter() - self.start) * 1000
+
+
+def current_timing() -> RequestTiming | None:
+    return _current.get()
+
+
+def _query_origin() -> str:
+    """Primeiro trecho do projeto (fora de bibliotecas) que disparou a consulta."""
+    for frame in reversed(traceback.extract_stack()):
+        filename = os.path.abspath(frame.filename)
+        if filename == _THIS_FILE or not filename.startswith(_PROJECT_DIR):
+            continue
+        if "site-packages" in filename:
+            continue
+        return f"{os.path.relpath(filename, _PROJECT_DIR)}:{frame.lineno} in {frame.name}"
+    return ""
+
+
+def mark(name: str, desc: str):
+    """Acrescenta ``name;desc="..."`` ao Server-Timing da requisição atual."""
+    timing = _current.get()
+    if timing is not None:
+        timing.marks.append(f'{name};desc="{desc}"')
+
+
+def query_timer(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = (perf_counter() - start) * 1000
+        timing.sql_ms += duration
+        timing.queries.append((sql, duration))
+        if duration >= settings.SLOW_QUERY_MS:
+            timing.slow_queries.append(
+                {"sql": sql, "ms": round(duration, 2), "origin": _query_origin()}
+            )
+
+
+class TimedTemplate(DjangoTemplate):
+    def render(self, context=None, request=None):
+        timing = _current.get()
+        if timing is None:
+            return super().render(context, request)
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            timing.template_ms += (perf_counter() - start) * 1000
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Backend de templates padrão que soma o tempo de renderização na requisição."""
+
+    def from_string(self, template_code):
+        template = super().from_string(template_code)
+        return TimedTemplate(template.template, self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+def start_request() -> tuple[RequestTiming, object]:
+    timing = RequestTiming()
+    return timing, _current.set(timing)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def server_timing_header(timing: RequestTiming, total_ms: float) -> str:
+    return ", ".join(
+        [
+            f'db;dur={timing.sql_ms:.1f};desc="{len(timing.queries)} queries"',
+            f"tpl;dur={timing.template_ms:.1f}",
+            f"view;dur={total_ms:.1f}",
+            *timing.marks,
+        ]
+    )
+
+
+def log_if_slow(request, response, timing: RequestTiming, total_ms: float):
+    slow_request = total_ms >= settings.SLOW_REQUEST_MS
+    if not slow_request and not timing.slow_queries:
+        return
+
+    record = {
+        "url_name": timing.url_name,
+        "method": request.method,
+        "path": request.path,
+        "status": response.status_code,
+        "view_ms": round(total_ms, 2),
+        "sql_ms": round(timing.sql_ms, 2),
+        "template_ms": round(timing.template_ms, 2),
+        "queries": len(timing.queries),
+        "slow_queries": timing.slow_queries,
+    }
+    if slow_request:
+        heaviest = sorted(timing.queries, key=lambda item: item[1], reverse=True)
+        record["top_queries"] = [
+            {"sql": sql, "ms": round(ms, 2)} for sql, ms in heaviest[:10]
+        ]
+    slow_logger.warning(record)
+
+
+class JsonLinesFormatter(logging.Formatter):
+    def format(self, record):
+        payload = record.msg if isinstance(record.msg, dict) else {"message": record.getMessage()}
+        payload = {"ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"), **payload}
+        return json.dumps(payload, ensure_ascii=False, default=str)
+
+
+class JsonLinesFileHandler(RotatingFileHandler):
+    """``RotatingFileHandler`` que cria a pasta do log se ela não existir."""
+
+    def __init__(self, filename, *args, **kwargs):
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        super().__init__(filename, *args, **kwargs)
@@ -0,0 +1,201 @@
+"""
+Cache das tabelas das listagens (contatos, produtos, setores, usuários e
+propostas).
+
+Cada empresa tem uma versão por modelo no cache compartilhado ("default"),
+trocada pelos sinais de ``post_save``/``post_delete``. A chave de uma tabela
+junta as versões dos modelos que ela exibe e a querystring, então qualquer
+alteração invalida todas as páginas da empresa de uma vez (O(1)) e nada
+velho é servido: a versão antiga simplesmente deixa de ser lida.
+
+A versão é um valor aleatório novo a cada troca, não um contador: o
+``incr`` do FileBasedCache não é atômico entre processos, e dois workers
+incrementando ao mesmo tempo gravariam o mesmo número. Dentro de uma
+transação ela é trocada na hora e de novo depois do commit, para descartar
+o que outra requisição tenha guardado lendo os dados antigos nesse meio
+tempo.
+
+O HTML fica na memória de cada worker, em um LRU com no máximo
+``LIST_CACHE_MAX_ENTRIES`` tabelas e contadores de acertos, faltas e
+descartes (``tables.stats()``). Cada resposta informa ``lista;desc=hit`` ou
+``miss`` no Server-Timing.
+
+Caminhos que não disparam sinais (``bulk_create``, ``update()``) precisam
+chamar ``bump``.
+"""
+import secrets
+import threading
+from collections import OrderedDict
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from . import instrumentation
+from .models import Contact, Product, Proposal, Sector, UserCompany
+
+User = get_user_model()
+
+# Listagem -> modelos exibidos na tabela.
+LIST_MODELS = {
+    "contacts": (Contact,),
+    "products": (Product,),
+    "sectors": (Sector,),
+    "users": (UserCompany, User),
+    "proposals": (Proposal, Contact),
+}
+ALL_MODELS = (Contact, Product, Sector, UserCompany, User, Proposal)
+
+
+class LRUCache:
+    """Dicionário com limite de entradas que descarta a menos usada."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return self._data[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+tables = LRUCache(settings.LIST_CACHE_MAX_ENTRIES)
+
+
+def _version_key(company_id, model) -> str:
+    return f"listver:{company_id}:{model._meta.label_lower}"
+
+
+def _new_versions(keys) -> dict:
+    return {key: secrets.token_hex(8) for key in keys}
+
+
+def bump(company_id, *models):
+    """Invalida as tabelas da empresa que exibem ``models``."""
+    keys = [_version_key(company_id, model) for model in models or ALL_MODELS]
+
+    def change():
+        cache.set_many(_new_versions(keys), None)
+
+    if transaction.get_connection().in_atomic_block:
+        change()
+    transaction.on_commit(change)
+
+
+def bump_users(user_ids):
+    """Usuários aparecem na listagem de cada empresa a que estão ligados."""
+    company_ids = (
+        UserCompany.objects.filter(user_id__in=user_ids)
+        .order_by()
+        .values_list("company_id", flat=True)
+        .distinct()
+    )
+    for company_id in company_ids:
+        bump(company_id, User)
+
+
+def _join(found, keys) -> str:
+    return "-".join(found[key] for key in keys)
+
+
+def versions(company_id, name) -> str:
+    """Versões atuais dos modelos exibidos na listagem ``name``."""
+    keys = [_version_key(company_id, model) for model in LIST_MODELS[name]]
+    found = cache.get_many(keys)
+    missing = _new_versions(key for key in keys if key not in found)
+    if missing:
+        cache.set_many(missing, None)
+        found.update(missing)
+    return _join(found, keys)
+
+
+async def aversions(company_id, name) -> str:
+    keys = [_version_key(company_id, model) for model in LIST_MODELS[name]]
+    found = await cache.aget_many(keys)
+    missing = _new_versions(key for key in keys if key not in found)
+    if missing:
+        await cache.aset_many(missing, None)
+        found.update(missing)
+    return _join(found, keys)
+
+
+def _table_key(request, name, version, vary_user) -> str:
+    parts = [
+        name,
+        str(request.tenant.company.pk),
+        version,
+        urlencode(sorted(request.GET.lists()), doseq=True),
+    ]
+    if vary_user:
+        parts.append(str(request.user.pk))
+    return ":".join(parts)
+
+
+def table_key(request, name, vary_user=False) -> str:
+    version = versions(request.tenant.company.pk, name)
+    return _table_key(request, name, version, vary_user)
+
+
+async def atable_key(request, name, vary_user=False) -> str:
+    version = await aversions(request.tenant.company.pk, name)
+    return _table_key(request, name, version, vary_user)
+
+
+def _lookup(key):
+    html = tables.get(key)
+    instrumentation.mark("lista", "miss" if html is None else "hit")
+    return html
+
+
+def cached_table(request, name, render, vary_user=False):
+    """HTML da tabela ``name``; ``render()`` só roda quando não está no cache."""
+    key = table_key(request, name, vary_user)
+    html = _lookup(key)
+    if html is None:
+        html = render()
+        tables.set(key, html)
+    return html
+
+
+async def acached_table(request, name, render, vary_user=False):
+    """``cached_table`` para views assíncronas (``render`` é uma corrotina)."""
+    key = await atable_key(request, name, vary_user)
+    html = _lookup(key)
+    if html is None:
+        html = await render()
+        tables.set(key, html)
+    return html
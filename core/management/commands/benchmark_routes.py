@@ -0,0 +1,210 @@
+import time
+import urllib.error
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.urls import URLPattern, get_resolver, reverse
+
+from core import benchmarks, listcache
+from core.models import Contact, Product, Proposal, Sector, UserCompany
+
+# Rotas que recebem <pk>: de qual modelo (filtrado pela empresa) tirar o id.
+PK_SOURCES = {
+    "contacts": Contact,
+    "products": Product,
+    "proposals": Proposal,
+    "sectors": Sector,
+    "users": UserCompany,
+}
+ANONYMOUS_ROUTES = {"login", "company_signup"}
+SKIPPED_ROUTES = {"logout"}
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede latência (p50/p95/p99) e vazão de cada rota do sispeed/urls.py, "
+        "pelo test client ou contra um servidor local (--base-url)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--username", help="Usuário logado (padrão: primeiro dono).")
+        parser.add_argument("--requests", type=int, default=50, help="Requisições por rota.")
+        parser.add_argument("--warmup", type=int, default=3)
+        parser.add_argument("--routes", nargs="*", help="Limita às rotas com esses nomes.")
+        parser.add_argument(
+            "--base-url",
+            help="Ex.: http://127.0.0.1:8000 (gunicorn local usando o mesmo banco).",
+        )
+        parser.add_argument("--concurrency", type=int, default=1, help="Só com --base-url.")
+        parser.add_argument(
+            "--session-engine",
+            help="Outro SESSION_ENGINE (ex.: django.contrib.sessions.backends.db) para comparar.",
+        )
+        parser.add_argument("--output", help="Salva o resultado em JSON.")
+        parser.add_argument("--compare", help="JSON de uma execução anterior para comparar.")
+
+    def handle(self, *args, **options):
+        if options["session_engine"]:
+            if options["base_url"]:
+                raise CommandError("--session-engine só vale pelo test client.")
+            override_settings(SESSION_ENGINE=options["session_engine"]).enable()
+        link = self._get_link(options["username"])
+        routes = self._discover_routes(link, options["routes"])
+        if not routes:
+            raise CommandError("Nenhuma rota para medir.")
+
+        if options["base_url"]:
+            runner = HttpRunner(options["base_url"], link.user, options["concurrency"])
+        else:
+            runner = ClientRunner(link.user)
+
+        results = {}
+        for name, path in routes:
+            anonymous = name in ANONYMOUS_ROUTES
+            for _ in range(options["warmup"]):
+                runner.get(path, anonymous)
+            latencies, statuses, wall = runner.run(path, anonymous, options["requests"])
+            results[name] = benchmarks.summarize(latencies, wall, statuses)
+
+        for line in benchmarks.format_table(results):
+            self.stdout.write(line)
+        if not options["base_url"]:
+            # Só pelo test client o cache das listagens é deste processo.
+            list_cache = listcache.tables.stats()
+            self.stdout.write(
+                "cache das listagens: {hits} acertos, {misses} faltas, "
+                "{evictions} descartes".format(**list_cache)
+            )
+
+        data = benchmarks.build_result(
+            results,
+            mode="http" if options["base_url"] else "client",
+            base_url=options["base_url"],
+            concurrency=options["concurrency"],
+            session_engine=settings.SESSION_ENGINE,
+            list_cache=None if options["base_url"] else listcache.tables.stats(),
+            company_id=link.company_id,
+            contacts=Contact.objects.filter(company_id=link.company_id).count(),
+        )
+        if options["output"]:
+            benchmarks.save(options["output"], data)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
+        if options["compare"]:
+            self.stdout.write("")
+            for line in benchmarks.format_comparison(benchmarks.load(options["compare"]), data):
+                self.stdout.write(line)
+
+    def _get_link(self, username):
+        links = UserCompany.objects.select_related("user")
+        if username:
+            link = links.filter(user__username=username).first()
+        else:
+            link = links.filter(is_owner=True).order_by("company_id").first()
+        if link is None:
+            raise CommandError(
+                "Usuário não encontrado. Gere dados com 'manage.py seed_tenants'."
+            )
+        return link
+
+    def _discover_routes(self, link, only):
+        routes = []
+        for pattern in get_resolver().url_patterns:
+            if not isinstance(pattern, URLPattern) or not pattern.name:
+                continue
+            name = pattern.name
+            if name in SKIPPED_ROUTES or (only and name not in only):
+                continue
+            kwargs = {}
+            converters = pattern.pattern.converters
+            if converters:
+                model = PK_SOURCES.get(name.split("_")[0])
+                if set(converters) != {"pk"} or model is None:
+                    self.stderr.write(f"Ignorando '{name}': parâmetros desconhecidos.")
+                    continue
+                pk = (
+                    model.objects.filter(company_id=link.company_id)
+                    .values_list("pk", flat=True)
+                    .first()
+                )
+                if pk is None:
+                    self.stderr.write(f"Ignorando '{name}': nenhum registro.")
+                    continue
+                kwargs["pk"] = pk
+            routes.append((name, reverse(name, kwargs=kwargs)))
+        return routes
+
+
+def _host():
+    hosts = [h for h in settings.ALLOWED_HOSTS if h not in ("*", "")]
+    return hosts[0].lstrip(".") if hosts else "localhost"
+
+
+class ClientRunner:
+    def __init__(self, user):
+        self.anonymous = Client(HTTP_HOST=_host())
+        self.client = Client(HTTP_HOST=_host())
+        self.client.force_login(user)
+
+    def get(self, path, anonymous):
+        client = self.anonymous if anonymous else self.client
+        response = client.get(path)
+        if response.streaming:
+            # Exportações: a consulta e o CSV só rodam ao consumir o corpo.
+            for _chunk in response.streaming_content:
+                pass
+        response.close()
+        return response.status_code
+
+    def run(self, path, anonymous, count):
+        latencies, statuses = [], Counter()
+        wall_start = time.perf_counter()
+        for _ in range(count):
+            start = time.perf_counter()
+            statuses[self.get(path, anonymous)] += 1
+            latencies.append((time.perf_counter() - start) * 1000)
+        return latencies, statuses, time.perf_counter() - wall_start
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class HttpRunner:
+    def __init__(self, base_url, user, concurrency, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(_NoRedirect)
+        client = Client()
+        client.force_login(user)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+    def get(self, path, anonymous):
+        request = urllib.request.Request(self.base_url + path)
+        if not anonymous:
+            request.add_header("Cookie", self.cookie)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as exc:
+            return exc.code
+        except (urllib.error.URLError, TimeoutError):
+            return "timeout"
+
+    def _timed(self, path, anonymous):
+        start = time.perf_counter()
+        status = self.get(path, anonymous)
+        return (time.perf_counter() - start) * 1000, status
+
+    def run(self, path, anonymous, count):
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            samples = list(pool.map(lambda _: self._timed(path, anonymous), range(count)))
+        wall = time.perf_counter() - wall_start
+        return [ms for ms, _ in samples], Counter(status for _, status in samples), wall
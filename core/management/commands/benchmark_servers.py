@@ -0,0 +1,130 @@
+import socket
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.urls import reverse
+
+from core import benchmarks
+from core.models import UserCompany
+
+from .benchmark_routes import HttpRunner
+
+DEFAULT_ROUTES = ("contacts_list", "products_list", "sectors_list", "settings")
+
+
+class SlowClients:
+    """
+    Conexões que mandam o cabeçalho da requisição aos poucos (uma linha a
+    cada ``interval`` segundos), como celulares em rede ruim, e reconectam se
+    o servidor derrubar a conexão. Um worker síncrono fica preso a cada uma
+    delas; um servidor ASGI não.
+    """
+
+    def __init__(self, base_url, path, count, interval):
+        parts = urlsplit(base_url)
+        self.address = (parts.hostname, parts.port or 80)
+        self.path = path
+        self.count = count
+        self.interval = interval
+        self.stop = threading.Event()
+        self.threads = []
+
+    def _client(self):
+        head = f"GET {self.path} HTTP/1.1\r\nHost: {self.address[0]}\r\n".encode()
+        while not self.stop.is_set():
+            try:
+                with socket.create_connection(self.address, timeout=30) as sock:
+                    sock.sendall(head)
+                    while not self.stop.wait(self.interval):
+                        sock.sendall(b"X-Slow: 1\r\n")
+                    sock.sendall(b"Connection: close\r\n\r\n")
+                    sock.recv(1)
+            except OSError:
+                self.stop.wait(0.1)
+
+    def __enter__(self):
+        for _ in range(self.count):
+            thread = threading.Thread(target=self._client, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+        # Dá tempo de todas as conexões ocuparem o servidor.
+        time.sleep(min(self.interval, 1.0))
+        return self
+
+    def __exit__(self, *exc):
+        self.stop.set()
+        for thread in self.threads:
+            thread.join(timeout=5)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara servidores já no ar (ex.: gunicorn com sispeed.wsgi e uvicorn "
+        "com sispeed.asgi) sob carga concorrente, opcionalmente com clientes "
+        "lentos ocupando conexões."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "servers",
+            nargs="+",
+            metavar="NOME=URL",
+            help="Ex.: wsgi=http://127.0.0.1:8001 asgi=http://127.0.0.1:8002",
+        )
+        parser.add_argument("--username", help="Usuário logado (padrão: primeiro dono).")
+        parser.add_argument("--routes", nargs="*", default=list(DEFAULT_ROUTES))
+        parser.add_argument("--requests", type=int, default=200, help="Requisições por rota.")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument(
+            "--timeout", type=float, default=10.0, help="Segundos até desistir de uma requisição."
+        )
+        parser.add_argument("--slow-clients", type=int, default=0)
+        parser.add_argument(
+            "--slow-interval",
+            type=float,
+            default=2.0,
+            help="Segundos entre cada linha enviada por um cliente lento.",
+        )
+        parser.add_argument("--output", help="Salva o resultado em JSON.")
+
+    def handle(self, *args, **options):
+        servers = []
+        for item in options["servers"]:
+            name, sep, url = item.partition("=")
+            if not sep or not url.startswith("http"):
+                raise CommandError(f"Servidor inválido: {item!r} (use NOME=URL).")
+            servers.append((name, url))
+
+        links = UserCompany.objects.select_related("user")
+        if options["username"]:
+            link = links.filter(user__username=options["username"]).first()
+        else:
+            link = links.filter(is_owner=True).order_by("company_id").first()
+        if link is None:
+            raise CommandError("Usuário não encontrado. Gere dados com 'manage.py seed_tenants'.")
+        routes = [(name, reverse(name)) for name in options["routes"]]
+
+        results = {}
+        for server, url in servers:
+            runner = HttpRunner(url, link.user, options["concurrency"], options["timeout"])
+            for name, path in routes:
+                runner.get(path, False)
+            with SlowClients(url, routes[0][1], options["slow_clients"], options["slow_interval"]):
+                for name, path in routes:
+                    latencies, statuses, wall = runner.run(path, False, options["requests"])
+                    results[f"{server}:{name}"] = benchmarks.summarize(latencies, wall, statuses)
+
+        for line in benchmarks.format_table(results):
+            self.stdout.write(line)
+
+        if options["output"]:
+            data = benchmarks.build_result(
+                results,
+                servers=dict(servers),
+                concurrency=options["concurrency"],
+                slow_clients=options["slow_clients"],
+            )
+            benchmarks.save(options["output"], data)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
@@ -0,0 +1,185 @@
+import multiprocessing
+import sqlite3
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections
+from django.test import Client
+from django.urls import reverse
+
+from core import benchmarks
+from core.database import is_locked_error
+from core.models import Contact, UserCompany
+
+from .benchmark_routes import _host
+
+MARKER = "bench-write-"
+
+# "padrao" reproduz o SQLite do Django sem ajustes: journal "delete",
+# transações adiadas (BEGIN) e nenhuma nova tentativa.
+PROFILES = ("padrao", "producao")
+
+
+def _configure(profile):
+    """Roda no processo filho, antes da primeira conexão."""
+    if profile == "padrao":
+        settings.SQLITE_PRAGMAS = {}
+        settings.SQLITE_WRITE_RETRIES = 0
+        wrapper = type(connection)
+        if hasattr(wrapper, "begin_sql"):
+            wrapper.begin_sql = "BEGIN"
+
+
+def _worker(profile, cookie, contact_id, writes, barrier, results):
+    """Alterna inclusão e edição (que lê o contato antes de gravar)."""
+    connections.close_all()
+    _configure(profile)
+    client = Client(HTTP_HOST=_host())
+    client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+    urls = (reverse("contacts_create"), reverse("contacts_edit", args=[contact_id]))
+    samples = []
+    name = f"{MARKER}{multiprocessing.current_process().pid}-"
+    barrier.wait()
+    for i in range(writes):
+        start = time.perf_counter()
+        try:
+            response = client.post(urls[i % 2], {"display_name": f"{name}{i}", "is_active": "on"})
+            outcome = str(response.status_code)
+        except OperationalError as exc:
+            outcome = "locked" if is_locked_error(exc) else "erro"
+        samples.append(((time.perf_counter() - start) * 1000, outcome))
+    connections.close_all()
+    results.put(samples)
+
+
+def _reader(profile, cookie, barrier, stop, results):
+    """Baixa a exportação de contatos sem parar: uma leitura longa."""
+    connections.close_all()
+    _configure(profile)
+    client = Client(HTTP_HOST=_host())
+    client.cookies[settings.SESSION_COOKIE_NAME] = cookie
+    url = reverse("contacts_export")
+    count = 0
+    barrier.wait()
+    while not stop.is_set():
+        try:
+            b"".join(client.get(url).streaming_content)
+            count += 1
+        except OperationalError:
+            pass
+    connections.close_all()
+    results.put(count)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede vazão de escrita e taxa de 'database is locked' com vários "
+        "processos incluindo e editando contatos ao mesmo tempo, com o SQLite "
+        "padrão e com o perfil de produção (core.database)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4, help="Processos simultâneos.")
+        parser.add_argument("--writes", type=int, default=100, help="Gravações por processo.")
+        parser.add_argument(
+            "--readers",
+            type=int,
+            default=2,
+            help="Processos exportando os contatos (leituras longas) durante a medição.",
+        )
+        parser.add_argument("--profiles", nargs="*", choices=PROFILES, default=list(PROFILES))
+        parser.add_argument("--output", help="Salva o resultado em JSON.")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite" or not str(connection.settings_dict["NAME"]):
+            raise CommandError("O benchmark precisa de um banco SQLite em arquivo.")
+        link = (
+            UserCompany.objects.select_related("user")
+            .filter(is_owner=True)
+            .order_by("company_id")
+            .first()
+        )
+        if link is None:
+            raise CommandError("Nenhum dono cadastrado. Gere dados com 'manage.py seed_tenants'.")
+        client = Client(HTTP_HOST=_host())
+        client.force_login(link.user)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].value
+
+        results = {}
+        try:
+            for profile in options["profiles"]:
+                results[profile] = self._run(
+                    profile, link, cookie, options["workers"], options["writes"], options["readers"]
+                )
+        finally:
+            connections.close_all()
+            Contact.objects.filter(
+                company_id=link.company_id, display_name__startswith=MARKER
+            ).delete()
+
+        for line in benchmarks.format_table(results):
+            self.stdout.write(line)
+        for profile, stats in results.items():
+            locked = stats["statuses"].get("locked", 0)
+            rate = locked / stats["requests"] * 100 if stats["requests"] else 0
+            self.stdout.write(
+                f"{profile}: {locked} 'database is locked' ({rate:.1f}%), "
+                f"{stats['exports']} exportações concluídas"
+            )
+
+        if options["output"]:
+            data = benchmarks.build_result(
+                results,
+                workers=options["workers"],
+                writes=options["writes"],
+                readers=options["readers"],
+            )
+            benchmarks.save(options["output"], data)
+            self.stdout.write(self.style.SUCCESS(f"Resultado salvo em {options['output']}"))
+
+    def _run(self, profile, link, cookie, workers, writes, readers):
+        contact_ids = [
+            Contact.objects.create(company_id=link.company_id, display_name=f"{MARKER}{i}").pk
+            for i in range(workers)
+        ]
+        connections.close_all()
+        if profile == "padrao":
+            # WAL fica gravado no arquivo; volta ao journal padrão para a
+            # medição (a próxima conexão do perfil de produção reativa).
+            raw = sqlite3.connect(str(connection.settings_dict["NAME"]))
+            raw.execute("PRAGMA journal_mode = delete")
+            raw.close()
+
+        context = multiprocessing.get_context("fork")
+        barrier = context.Barrier(workers + readers + 1)
+        stop = context.Event()
+        queue, read_queue = context.Queue(), context.Queue()
+        processes = [
+            context.Process(
+                target=_worker, args=(profile, cookie, contact_id, writes, barrier, queue)
+            )
+            for contact_id in contact_ids
+        ]
+        processes += [
+            context.Process(target=_reader, args=(profile, cookie, barrier, stop, read_queue))
+            for _ in range(readers)
+        ]
+        for process in processes:
+            process.start()
+        barrier.wait()
+        wall_start = time.perf_counter()
+        samples = [sample for _ in contact_ids for sample in queue.get()]
+        wall = time.perf_counter() - wall_start
+        stop.set()
+        exports = sum(read_queue.get() for _ in range(readers))
+        for process in processes:
+            process.join()
+
+        statuses = Counter(outcome for _, outcome in samples)
+        succeeded = [ms for ms, outcome in samples if outcome == "302"]
+        summary = benchmarks.summarize(succeeded, wall, statuses)
+        summary["requests"] = len(samples)
+        summary["exports"] = exports
+        return summary
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from core.dedup import find_duplicates
+from core.models import Company
+
+
+class Command(BaseCommand):
+    help = "Procura contatos duplicados e refaz a lista de pares para revisão."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            action="append",
+            dest="companies",
+            help="ID da empresa (pode repetir). Padrão: todas.",
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.order_by("pk")
+        if options["companies"]:
+            companies = companies.filter(pk__in=options["companies"])
+        for company_id in companies.values_list("pk", flat=True):
+            result = find_duplicates(company_id)
+            self.stdout.write(
+                f"Empresa {company_id}: {result.contacts} contato(s), "
+                f"{result.pairs} par(es) comparado(s), "
+                f"{result.candidates} possível(is) duplicado(s) em {result.seconds}s."
+            )
+        self.stdout.write(self.style.SUCCESS("Busca de duplicados concluída."))
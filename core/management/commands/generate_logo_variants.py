@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from core.images import generate_logo_variants
+from core.models import Company
+
+
+class Command(BaseCommand):
+    help = "Gera (de novo) as variantes dos logos das empresas, sem passar pela fila."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            action="append",
+            dest="companies",
+            help="ID da empresa (pode repetir). Padrão: todas com logo.",
+        )
+
+    def handle(self, *args, **options):
+        companies = Company.objects.exclude(logo="").exclude(logo__isnull=True)
+        if options["companies"]:
+            companies = companies.filter(pk__in=options["companies"])
+        total = 0
+        for company_id in companies.values_list("pk", flat=True):
+            generate_logo_variants(company_id)
+            total += 1
+        self.stdout.write(self.style.SUCCESS(f"{total} logo(s) processado(s)."))
@@ -0,0 +1,53 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import BATCH_SIZE, InvalidFileError, import_contacts
+from core.models import Company
+
+
+class Command(BaseCommand):
+    help = "Importa contatos de um arquivo CSV para uma empresa."
+
+    def add_arguments(self, parser):
+        parser.add_argument("company_id", type=int)
+        parser.add_argument("csv_path")
+        parser.add_argument("--errors", help="Caminho do CSV com as linhas rejeitadas.")
+        parser.add_argument("--encoding", default="utf-8-sig")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            company = Company.objects.get(pk=options["company_id"])
+        except Company.DoesNotExist:
+            raise CommandError("Empresa não encontrada.")
+
+        errors_file = None
+        if options["errors"]:
+            errors_file = open(options["errors"], "w", encoding="utf-8-sig", newline="")
+
+        start = time.perf_counter()
+        try:
+            with open(options["csv_path"], "rb") as fp:
+                result = import_contacts(
+                    company,
+                    fp,
+                    encoding=options["encoding"],
+                    errors_file=errors_file,
+                    batch_size=options["batch_size"],
+                )
+        except InvalidFileError as exc:
+            raise CommandError(str(exc))
+        finally:
+            if errors_file is not None:
+                errors_file.close()
+        elapsed = time.perf_counter() - start
+
+        for line, message in result.errors_preview:
+            self.stderr.write(f"linha {line}: {message}")
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result.created} importado(s), {result.rejected} rejeitado(s) "
+                f"em {elapsed:.1f}s."
+            )
+        )
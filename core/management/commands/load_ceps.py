@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ceps
+from core.models import CepAddress
+
+
+class Command(BaseCommand):
+    help = (
+        "Carrega um arquivo nacional de CEPs (CSV com cabeçalho, opcionalmente "
+        ".gz) na base usada para preencher endereços."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--encoding", default="utf-8-sig")
+        parser.add_argument("--batch-size", type=int, default=ceps.BATCH_SIZE)
+        parser.add_argument(
+            "--replace", action="store_true", help="Apaga a base atual antes de carregar."
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        try:
+            with ceps.open_text(options["path"], options["encoding"]) as text:
+                result = ceps.load_file(
+                    text, batch_size=options["batch_size"], replace=options["replace"]
+                )
+        except (OSError, ceps.InvalidCepFile) as exc:
+            raise CommandError(str(exc))
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{result.loaded} CEP(s) carregado(s), {result.skipped} ignorado(s) "
+                f"em {elapsed:.1f}s. Total na base: {CepAddress.objects.count()}. "
+                "Reinicie os workers para descartar o cache de CEPs."
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core.throttling import ThrottleStore
+
+
+class Command(BaseCommand):
+    help = (
+        "Mostra os contadores do limite de tentativas de login e as chaves "
+        "bloqueadas; opcionalmente desbloqueia chaves ou apaga as esquecidas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--unlock",
+            action="append",
+            default=[],
+            metavar="CHAVE",
+            help='Ex.: "ip:203.0.113.7" ou "user:maria" (pode repetir).',
+        )
+        parser.add_argument("--purge", action="store_true", help="Apaga chaves esquecidas.")
+
+    def handle(self, *args, **options):
+        store = ThrottleStore()
+        for key in options["unlock"]:
+            store.reset(key)
+            self.stdout.write(self.style.SUCCESS(f"{key} desbloqueada."))
+        if options["purge"]:
+            store.purge()
+
+        counters = store.counters()
+        if not counters:
+            self.stdout.write("Nenhuma tentativa registrada.")
+        for name, value in counters.items():
+            self.stdout.write(f"{name:<20} {value:>10}")
+        locked = store.locked()
+        if locked:
+            self.stdout.write("")
+            self.stdout.write("Bloqueadas:")
+        for key, remaining, strikes in locked:
+            self.stdout.write(f"  {key:<40} {int(remaining):>6}s  (bloqueio nº {strikes})")
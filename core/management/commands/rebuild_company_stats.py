@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.stats import rebuild
+
+
+class Command(BaseCommand):
+    help = "Recalcula as estatísticas do painel (CompanyStats) a partir das tabelas."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            action="append",
+            dest="companies",
+            help="ID da empresa a recalcular (pode repetir). Padrão: todas.",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild(options["companies"])
+        self.stdout.write(self.style.SUCCESS(f"{total} empresa(s) recalculada(s)."))
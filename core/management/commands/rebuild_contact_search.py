@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Recria o índice de busca (FTS5) dos contatos."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            action="append",
+            dest="companies",
+            help="ID da empresa a reindexar (pode repetir). Padrão: todas.",
+        )
+
+    def handle(self, *args, **options):
+        total = rebuild_index(options["companies"])
+        self.stdout.write(self.style.SUCCESS(f"{total} contatos indexados."))
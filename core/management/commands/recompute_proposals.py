@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.proposals import recompute
+
+
+class Command(BaseCommand):
+    help = "Recalcula os totais gravados nas propostas a partir dos itens."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--company",
+            type=int,
+            action="append",
+            dest="companies",
+            help="ID da empresa a recalcular (pode repetir). Padrão: todas.",
+        )
+        parser.add_argument("--batch-size", type=int, default=None, help="Propostas por lote.")
+
+    def handle(self, *args, **options):
+        total = recompute(options["companies"], options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"{total} proposta(s) corrigida(s)."))
@@ -0,0 +1,224 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from core import fakedata, proposals
+from core.models import (
+    Company,
+    Contact,
+    Product,
+    Proposal,
+    ProposalItem,
+    Sector,
+    UserCompany,
+    UserPermission,
+    UserPreference,
+)
+from core.search import index_contacts
+from core.stats import rebuild as rebuild_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Cria empresas com contatos, produtos, setores, usuários e propostas fictícios "
+        "(para testes de carga e benchmarks)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--companies", type=int, default=1)
+        parser.add_argument("--contacts", type=int, default=1000)
+        parser.add_argument("--products", type=int, default=200)
+        parser.add_argument("--sectors", type=int, default=10)
+        parser.add_argument("--users", type=int, default=5)
+        parser.add_argument("--proposals", type=int, default=100)
+        parser.add_argument("--password", default="senha123")
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        password = make_password(options["password"])
+        batch_size = options["batch_size"]
+
+        for _ in range(options["companies"]):
+            with transaction.atomic():
+                company, owner = self._create_company(rng, password)
+                self._create_users(rng, company, password, options["users"])
+                self._create_sectors(rng, company, options["sectors"])
+                self._create_products(rng, company, options["products"], batch_size)
+                self._create_contacts(rng, company, options["contacts"], batch_size)
+                self._create_proposals(rng, company, options["proposals"], batch_size)
+                rebuild_stats([company.pk])
+            self.stdout.write(
+                f"Empresa {company.pk} ({company.name}): login '{owner.username}'"
+            )
+
+        self.stdout.write(self.style.SUCCESS("Dados gerados com sucesso."))
+
+    def _create_company(self, rng, password):
+        User = get_user_model()
+        name = fakedata.company_name(rng)
+        place = fakedata.address(rng)
+        ddd = place.pop("ddd")
+        company = Company.objects.create(
+            name=name,
+            cnpj=fakedata.cnpj(rng),
+            email=f"contato{rng.randint(0, 10**9)}@{fakedata.slug(name)}.example.com",
+            phone=fakedata.phone(rng, ddd),
+            **place,
+        )
+        owner = User.objects.create(
+            username=f"empresa{company.pk}_dono",
+            first_name=fakedata.person_name(rng),
+            email=f"dono@empresa{company.pk}.example.com",
+            password=password,
+            is_staff=True,
+        )
+        link = UserCompany.objects.create(user=owner, company=company, is_owner=True)
+        UserPermission.objects.create(
+            user_company=link,
+            can_manage_contacts=True,
+            can_manage_users=True,
+            can_manage_products=True,
+            can_manage_sectors=True,
+            can_manage_proposals=True,
+        )
+        UserPreference.objects.create(user=owner, theme="dark")
+        return company, owner
+
+    def _create_users(self, rng, company, password, count):
+        User = get_user_model()
+        users = User.objects.bulk_create(
+            [
+                User(
+                    username=f"empresa{company.pk}_user{i}",
+                    first_name=fakedata.person_name(rng),
+                    email=f"user{i}@empresa{company.pk}.example.com",
+                    password=password,
+                )
+                for i in range(1, count + 1)
+            ]
+        )
+        links = UserCompany.objects.bulk_create(
+            [UserCompany(user=user, company=company) for user in users]
+        )
+        UserPermission.objects.bulk_create(
+            [
+                UserPermission(
+                    user_company=link,
+                    can_manage_contacts=True,
+                    can_manage_products=rng.random() < 0.5,
+                    can_manage_sectors=rng.random() < 0.3,
+                )
+                for link in links
+            ]
+        )
+        UserPreference.objects.bulk_create(
+            [
+                UserPreference(user=user, theme=rng.choice(("dark", "light")))
+                for user in users
+            ]
+        )
+
+    def _create_sectors(self, rng, company, count):
+        Sector.objects.bulk_create(
+            [
+                Sector(
+                    company=company,
+                    name=fakedata.sector_name(rng, i),
+                    is_active=rng.random() < 0.9,
+                )
+                for i in range(count)
+            ]
+        )
+
+    def _create_products(self, rng, company, count, batch_size):
+        Product.objects.bulk_create(
+            (
+                Product(company=company, **fakedata.product_fields(rng))
+                for _ in range(count)
+            ),
+            batch_size=batch_size,
+        )
+
+    def _create_contacts(self, rng, company, count, batch_size):
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            contacts = Contact.objects.bulk_create(
+                [
+                    Contact(company=company, **fakedata.contact_fields(rng))
+                    for _ in range(size)
+                ]
+            )
+            index_contacts(contacts)
+            created += size
+
+    def _create_proposals(self, rng, company, count, batch_size):
+        contact_ids = list(
+            Contact.objects.filter(company=company).order_by().values_list("pk", flat=True)
+        )
+        seller_ids = list(
+            Contact.objects.filter(company=company, is_seller=True)
+            .order_by()
+            .values_list("pk", "commission")
+        )
+        products = list(
+            Product.objects.filter(company=company).order_by().only("pk", "name", "unit", "price")
+        )
+        if not contact_ids or not products:
+            return
+        today = timezone.localdate()
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            batch = []
+            items = []
+            for number in range(created + 1, created + size + 1):
+                seller = rng.choice(seller_ids) if seller_ids and rng.random() < 0.7 else None
+                proposal = Proposal(
+                    company=company,
+                    number=number,
+                    contact_id=rng.choice(contact_ids),
+                    seller_id=seller[0] if seller else None,
+                    commission_percent=seller[1] if seller else None,
+                    status=rng.choice(Proposal.STATUS_CHOICES)[0],
+                    issued_on=today - timedelta(days=rng.randint(0, 3 * 365)),
+                    discount_percent=Decimal(rng.choice((0, 0, 0, 3, 5))),
+                )
+                lines = []
+                for position in range(rng.randint(1, 8)):
+                    product = rng.choice(products)
+                    item = ProposalItem(
+                        product=product,
+                        description=product.name,
+                        unit=product.unit,
+                        unit_price=product.price,
+                        position=position,
+                        **fakedata.proposal_item_fields(rng, product.unit),
+                    )
+                    proposals.price_item(item)
+                    lines.append(item)
+                values = proposals.totals(
+                    (item.total for item in lines),
+                    proposal.discount_percent,
+                    proposal.commission_percent,
+                )
+                for name, value in values.items():
+                    setattr(proposal, name, value)
+                batch.append(proposal)
+                items.append(lines)
+            Proposal.objects.bulk_create(batch)
+            for proposal, lines in zip(batch, items):
+                for item in lines:
+                    item.proposal = proposal
+            ProposalItem.objects.bulk_create(
+                [item for lines in items for item in lines], batch_size=batch_size
+            )
+            created += size
@@ -0,0 +1,84 @@
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from . import instrumentation
+from .tenancy import get_tenant
+
+
+class TimingMiddleware:
+    """
+    Mede consultas, templates e tempo total de cada requisição.
+
+    Fica no topo da lista de middlewares para incluir sessão e autenticação
+    na conta. Desligado com ``TIMING_ENABLED = False``. As consultas são
+    somadas pelo ``instrumentation.query_timer`` instalado em cada conexão,
+    o que também cobre o ORM assíncrono (que roda em outra thread).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.enabled = settings.TIMING_ENABLED
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        if not self.enabled:
+            return self.get_response(request)
+
+        timing, token = instrumentation.start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        return self._finish(request, response, timing)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+
+        timing, token = instrumentation.start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.finish_request(token)
+        return self._finish(request, response, timing)
+
+    def _finish(self, request, response, timing):
+        total_ms = (perf_counter() - timing.start) * 1000
+        match = getattr(request, "resolver_match", None)
+        timing.url_name = match.url_name if match else None
+        response["Server-Timing"] = instrumentation.server_timing_header(timing, total_ms)
+        instrumentation.log_if_slow(request, response, timing, total_ms)
+        return response
+
+
+class TenantMiddleware:
+    """
+    Disponibiliza ``request.tenant`` (ver ``core.tenancy.Tenant``).
+
+    Precisa vir depois do ``AuthenticationMiddleware``. O carregamento é
+    preguiçoso: páginas que não usam o tenant não fazem consulta nem leem o
+    cache. Views assíncronas trocam pelo tenant já carregado (ver
+    ``core.async_views.login_required``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        request.tenant = SimpleLazyObject(lambda: get_tenant(request.user))
+        return self.get_response(request)
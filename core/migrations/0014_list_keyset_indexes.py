@@ -0,0 +1,25 @@
+# Generated by Django 5.0.6 on 2026-10-17 03:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_company_address_company_cep_company_city_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['company', 'display_name', 'id'], name='contact_company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['company', 'name', 'id'], name='product_company_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sector',
+            index=models.Index(fields=['company', 'name', 'id'], name='sector_company_name_idx'),
+        ),
+    ]
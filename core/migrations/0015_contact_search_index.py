@@ -0,0 +1,65 @@
+import re
+
+from django.db import migrations
+
+FTS_TABLE = "core_contact_fts"
+COLUMNS = ("display_name", "legal_name", "document", "email", "phone", "city")
+
+
+def _with_digits(value):
+    if not value:
+        return value
+    digits = re.sub(r"\D", "", value)
+    if digits and digits != value:
+        return f"{value} {digits}"
+    return value
+
+
+def create_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        f"company, {', '.join(COLUMNS)}, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+    )
+
+    Contact = apps.get_model("core", "Contact")
+    rows = [
+        (
+            c.pk,
+            f"c{c.company_id}",
+            c.display_name,
+            c.legal_name,
+            _with_digits(c.document),
+            c.email,
+            _with_digits(c.phone),
+            c.city,
+        )
+        for c in Contact.objects.only("company_id", *COLUMNS).iterator()
+    ]
+    if rows:
+        placeholders = ", ".join(["%s"] * (len(COLUMNS) + 2))
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, company, {', '.join(COLUMNS)}) "
+                f"VALUES ({placeholders})",
+                rows,
+            )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_list_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_contact_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('contacts_total', models.IntegerField(default=0)),
+                ('contacts_active', models.IntegerField(default=0)),
+                ('contacts_client', models.IntegerField(default=0)),
+                ('contacts_supplier', models.IntegerField(default=0)),
+                ('contacts_partner', models.IntegerField(default=0)),
+                ('contacts_employee', models.IntegerField(default=0)),
+                ('contacts_seller', models.IntegerField(default=0)),
+                ('contacts_other', models.IntegerField(default=0)),
+                ('products_total', models.IntegerField(default=0)),
+                ('products_active', models.IntegerField(default=0)),
+                ('products_with_margin', models.IntegerField(default=0)),
+                ('margin_sum', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('sectors_total', models.IntegerField(default=0)),
+                ('users_total', models.IntegerField(default=0)),
+                ('company', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='stats', to='core.company', verbose_name='Empresa')),
+            ],
+            options={
+                'verbose_name': 'Estatísticas da empresa',
+                'verbose_name_plural': 'Estatísticas das empresas',
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_company_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='logo_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
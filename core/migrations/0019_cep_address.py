@@ -0,0 +1,27 @@
+# Generated by Django 5.0.14 on 2026-10-17 04:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CepAddress',
+            fields=[
+                ('cep', models.IntegerField(primary_key=True, serialize=False, verbose_name='CEP')),
+                ('address', models.CharField(blank=True, max_length=255, verbose_name='Logradouro')),
+                ('district', models.CharField(blank=True, max_length=100, verbose_name='Bairro')),
+                ('city', models.CharField(max_length=100, verbose_name='Cidade')),
+                ('uf', models.CharField(max_length=2, verbose_name='UF')),
+            ],
+            options={
+                'verbose_name': 'CEP',
+                'verbose_name_plural': 'CEPs',
+            },
+        ),
+    ]
@@ -0,0 +1,51 @@
+import re
+
+from django.db import migrations, models
+
+
+def _digits(value):
+    return re.sub(r"\D", "", value or "") or None
+
+
+def fill_normalized(apps, schema_editor):
+    Company = apps.get_model("core", "Company")
+    Contact = apps.get_model("core", "Contact")
+    for model, source, target in (
+        (Company, "cnpj", "normalized_cnpj"),
+        (Contact, "document", "normalized_document"),
+    ):
+        rows = [
+            (_digits(value), pk)
+            for pk, value in model.objects.exclude(**{f"{source}__isnull": True})
+            .values_list("pk", source)
+            .iterator()
+        ]
+        with schema_editor.connection.cursor() as cursor:
+            cursor.executemany(
+                f"UPDATE {model._meta.db_table} SET {target} = %s WHERE id = %s", rows
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_cep_address'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='normalized_cnpj',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='contact',
+            name='normalized_document',
+            field=models.CharField(blank=True, editable=False, max_length=14, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='contact',
+            index=models.Index(fields=['company', 'normalized_document'], name='contact_company_document_idx'),
+        ),
+        migrations.RunPython(fill_normalized, migrations.RunPython.noop),
+    ]
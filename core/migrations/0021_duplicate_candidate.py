@@ -0,0 +1,36 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_normalized_documents'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCandidate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(verbose_name='Semelhança')),
+                ('reasons', models.CharField(blank=True, max_length=100, verbose_name='Motivos')),
+                ('dismissed', models.BooleanField(default=False, verbose_name='Não é duplicado')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='core.company', verbose_name='Empresa')),
+                ('contact_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.contact')),
+                ('contact_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.contact')),
+            ],
+            options={
+                'verbose_name': 'Possível duplicado',
+                'verbose_name_plural': 'Possíveis duplicados',
+                'indexes': [models.Index(condition=models.Q(('dismissed', False)), fields=['company', '-score', 'id'], name='duplicate_pending_score_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='duplicatecandidate',
+            constraint=models.UniqueConstraint(fields=('contact_a', 'contact_b'), name='duplicate_pair_unique'),
+        ),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def grant_owners(apps, schema_editor):
+    # Donos têm todas as permissões (como no cadastro da empresa).
+    UserPermission = apps.get_model("core", "UserPermission")
+    UserPermission.objects.filter(user_company__is_owner=True).update(can_manage_proposals=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_duplicate_candidate'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='companystats',
+            name='proposals_total',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='userpermission',
+            name='can_manage_proposals',
+            field=models.BooleanField(default=False, verbose_name='Pode gerenciar propostas'),
+        ),
+        migrations.CreateModel(
+            name='Proposal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(editable=False, verbose_name='Número')),
+                ('status', models.CharField(choices=[('draft', 'Rascunho'), ('sent', 'Enviada'), ('approved', 'Aprovada'), ('rejected', 'Recusada')], default='draft', max_length=10, verbose_name='Status')),
+                ('issued_on', models.DateField(default=django.utils.timezone.localdate, verbose_name='Data')),
+                ('valid_until', models.DateField(blank=True, null=True, verbose_name='Válida até')),
+                ('discount_percent', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='Desconto geral (%)')),
+                ('commission_percent', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Comissão (%)')),
+                ('notes', models.TextField(blank=True, null=True, verbose_name='Observações')),
+                ('items_count', models.IntegerField(default=0, editable=False, verbose_name='Itens')),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Subtotal')),
+                ('discount_total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Desconto')),
+                ('total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Total')),
+                ('commission_total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Comissão')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proposals', to='core.company', verbose_name='Empresa')),
+                ('contact', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='proposals', to='core.contact', verbose_name='Cliente')),
+                ('seller', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='sold_proposals', to='core.contact', verbose_name='Vendedor')),
+            ],
+            options={
+                'verbose_name': 'Proposta',
+                'verbose_name_plural': 'Propostas',
+                'ordering': ['-number'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProposalItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255, verbose_name='Descrição')),
+                ('unit', models.CharField(choices=[('M2', 'm²'), ('UN', 'Unidade')], max_length=3, verbose_name='Unidade')),
+                ('quantity', models.DecimalField(decimal_places=3, default=1, max_digits=12, verbose_name='Quantidade')),
+                ('width', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Largura (m)')),
+                ('height', models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Altura (m)')),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=12, verbose_name='Valor unitário')),
+                ('discount_percent', models.DecimalField(decimal_places=2, default=0, max_digits=5, verbose_name='Desconto (%)')),
+                ('area', models.DecimalField(blank=True, decimal_places=4, editable=False, max_digits=14, null=True, verbose_name='Área (m²)')),
+                ('total', models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=14, verbose_name='Total')),
+                ('position', models.PositiveIntegerField(default=0, editable=False)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='proposal_items', to='core.product', verbose_name='Produto')),
+                ('proposal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='core.proposal', verbose_name='Proposta')),
+            ],
+            options={
+                'verbose_name': 'Item da proposta',
+                'verbose_name_plural': 'Itens da proposta',
+                'ordering': ['position', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['company', 'issued_on', 'id'], name='proposal_company_issued_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['company', 'total', 'id'], name='proposal_company_total_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['company', 'status', 'id'], name='proposal_company_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='proposal',
+            index=models.Index(fields=['company', 'updated_at'], name='proposal_company_updated_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='proposal',
+            constraint=models.UniqueConstraint(fields=('company', 'number'), name='proposal_company_number_unique'),
+        ),
+        migrations.RunPython(grant_owners, migrations.RunPython.noop),
+    ]
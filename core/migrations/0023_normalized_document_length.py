@@ -0,0 +1,23 @@
+# Generated by Django 5.0.14 on 2026-10-17 05:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_proposals'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='company',
+            name='normalized_cnpj',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=18, null=True),
+        ),
+        migrations.AlterField(
+            model_name='contact',
+            name='normalized_document',
+            field=models.CharField(blank=True, editable=False, max_length=20, null=True),
+        ),
+    ]
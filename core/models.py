@@ -1,5 +1,19 @@
+from decimal import Decimal
+
 from django.conf import settings
 from django.db import models
+from django.db.models import DecimalField, ExpressionWrapper, F, Value
+from django.db.models.functions import NullIf, Round
+from django.utils import timezone
+
+from . import documents
+
+
+def _with_shadow(update_fields, field_name):
+    """``update_fields`` com a coluna normalizada junto do campo de origem."""
+    if update_fields is None or field_name not in update_fields:
+        return update_fields
+    return {*update_fields, f"normalized_{field_name}"}
 
 
 def company_logo_upload_path(instance, filename):
@@ -10,9 +24,16 @@ def company_logo_upload_path(instance, filename):
 class Company(models.Model):
     name = models.CharField("Nome da empresa", max_length=255)
     cnpj = models.CharField("CNPJ", max_length=18, blank=True, null=True)
+    # Só os dígitos do CNPJ, atualizado no save() (ver core.documents).
+    normalized_cnpj = models.CharField(
+        max_length=18, blank=True, null=True, editable=False, db_index=True
+    )
     email = models.EmailField("E-mail", unique=True)
     phone = models.CharField("Telefone", max_length=20, blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Também é tocado quando um contato, produto, setor ou usuário da empresa
+    # é excluído (ver core.conditional).
+    updated_at = models.DateTimeField(auto_now=True)
 
     # Endereço da empresa
     cep = models.CharField("CEP", max_length=9, blank=True, null=True)
@@ -29,6 +50,9 @@ class Company(models.Model):
         blank=True,
         null=True,
     )
+    # Variantes redimensionadas do logo (ver core.images), geradas em
+    # segundo plano após o upload.
+    logo_variants = models.JSONField(default=dict, blank=True, editable=False)
     whatsapp_default_message = models.TextField(
         "Mensagem padrão do WhatsApp",
         blank=True,
@@ -43,6 +67,11 @@ class Company(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.normalized_cnpj = documents.normalize(self.cnpj)
+        kwargs["update_fields"] = _with_shadow(kwargs.get("update_fields"), "cnpj")
+        super().save(*args, **kwargs)
+
 
 class UserCompany(models.Model):
     user = models.OneToOneField(
@@ -79,6 +108,12 @@ class Contact(models.Model):
     )
 
     document = models.CharField("CPF/CNPJ", max_length=20, blank=True, null=True)
+    # Só os dígitos do documento, atualizado no save(); caminhos que usam
+    # bulk_create preenchem à mão (ver core.documents). Mesmo tamanho do
+    # campo digitado: documentos antigos fora do padrão também cabem.
+    normalized_document = models.CharField(
+        max_length=20, blank=True, null=True, editable=False
+    )
 
     display_name = models.CharField(
         "Nome do cliente / Nome fantasia",
@@ -121,15 +156,88 @@ class Contact(models.Model):
     notes = models.TextField("Observações", blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Contato"
         verbose_name_plural = "Contatos"
         ordering = ["display_name"]
+        indexes = [
+            models.Index(
+                fields=["company", "display_name", "id"],
+                name="contact_company_name_idx",
+            ),
+            models.Index(
+                fields=["company", "updated_at"],
+                name="contact_company_updated_idx",
+            ),
+            models.Index(
+                fields=["company", "normalized_document"],
+                name="contact_company_document_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.display_name
 
+    def save(self, *args, **kwargs):
+        self.normalized_document = documents.normalize(self.document)
+        kwargs["update_fields"] = _with_shadow(kwargs.get("update_fields"), "document")
+        super().save(*args, **kwargs)
+
+
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _cents(value):
+    # ROUND() devolve REAL no SQLite: as divisões abaixo nunca são inteiras.
+    return Round(value * Value(Decimal(100)))
+
+
+def margin_expression(profit, price):
+    """
+    Margem em % (lucro / venda * 100) com duas casas, arredondada como em
+    ``stats.product_margin`` (metade para longe do zero). A conta usa
+    centavos inteiros: o ponto flutuante do SQLite não decide o lado de um
+    empate como 1,005%. Com venda zero fica nula.
+    """
+    hundredths = Round(
+        _cents(profit) * Value(Decimal(10000)) / NullIf(_cents(price), Value(0))
+    )
+    return ExpressionWrapper(hundredths / Value(Decimal(100)), output_field=MONEY)
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_profit(self):
+        """
+        Anota ``profit`` (venda - custo) e ``margin`` (lucro / venda * 100) no
+        banco, para ordenar, filtrar e somar sem carregar o catálogo.
+
+        Sem custo os dois ficam nulos; com venda zero a margem fica nula.
+        """
+        return self.annotate(
+            # ROUND() tira a sobra da subtração em ponto flutuante do SQLite.
+            profit=Round(F("price") - F("cost_price"), 2, output_field=MONEY),
+        ).annotate(
+            margin=margin_expression(F("profit"), F("price")),
+        )
+
+    def _totals(self):
+        return {
+            "count": models.Count("id"),
+            "price_total": models.Sum("price"),
+            "cost_total": models.Sum("cost_price"),
+            "profit_total": models.Sum("profit"),
+            "margin_avg": models.Avg("margin"),
+        }
+
+    def totals(self):
+        """Totais e margem média em uma única consulta (requer ``with_profit``)."""
+        return self.aggregate(**self._totals())
+
+    async def atotals(self):
+        return await self.aaggregate(**self._totals())
+
 
 class Product(models.Model):
     UNIT_CHOICES = [
@@ -166,11 +274,24 @@ class Product(models.Model):
     is_active = models.BooleanField("Ativo", default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = ProductQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
         ordering = ["name"]
+        indexes = [
+            models.Index(
+                fields=["company", "name", "id"],
+                name="product_company_name_idx",
+            ),
+            models.Index(
+                fields=["company", "updated_at"],
+                name="product_company_updated_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -199,11 +320,22 @@ class Sector(models.Model):
     name = models.CharField("Nome do setor", max_length=150)
     is_active = models.BooleanField("Ativo", default=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Setor"
         verbose_name_plural = "Setores"
         ordering = ["name"]
+        indexes = [
+            models.Index(
+                fields=["company", "name", "id"],
+                name="sector_company_name_idx",
+            ),
+            models.Index(
+                fields=["company", "updated_at"],
+                name="sector_company_updated_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -223,6 +355,7 @@ class UserPermission(models.Model):
     can_manage_users = models.BooleanField("Pode gerenciar usuários", default=False)
     can_manage_products = models.BooleanField("Pode gerenciar produtos", default=False)
     can_manage_sectors = models.BooleanField("Pode gerenciar setores", default=False)
+    can_manage_proposals = models.BooleanField("Pode gerenciar propostas", default=False)
 
     class Meta:
         verbose_name = "Permissão do usuário"
@@ -255,4 +388,279 @@ class UserPreference(models.Model):
         verbose_name_plural = "Preferências dos usuários"
 
     def __str__(self):
-        return f"Preferências de {self.user.username}"
\ No newline at end of file
+        return f"Preferências de {self.user.username}"
+
+
+class CompanyStats(models.Model):
+    """
+    Contadores do painel, um registro por empresa.
+
+    Mantido por incrementos (ver ``core.stats``) a cada gravação ou exclusão
+    de contatos, produtos, setores e usuários; ``manage.py
+    rebuild_company_stats`` recalcula tudo a partir das tabelas.
+    """
+    company = models.OneToOneField(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="stats",
+        verbose_name="Empresa",
+    )
+
+    contacts_total = models.IntegerField(default=0)
+    contacts_active = models.IntegerField(default=0)
+    contacts_client = models.IntegerField(default=0)
+    contacts_supplier = models.IntegerField(default=0)
+    contacts_partner = models.IntegerField(default=0)
+    contacts_employee = models.IntegerField(default=0)
+    contacts_seller = models.IntegerField(default=0)
+    contacts_other = models.IntegerField(default=0)
+
+    products_total = models.IntegerField(default=0)
+    products_active = models.IntegerField(default=0)
+    # Soma e quantidade das margens conhecidas (produtos com custo e venda),
+    # para manter a média sem reler o catálogo.
+    products_with_margin = models.IntegerField(default=0)
+    margin_sum = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    sectors_total = models.IntegerField(default=0)
+    users_total = models.IntegerField(default=0)
+    proposals_total = models.IntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Estatísticas da empresa"
+        verbose_name_plural = "Estatísticas das empresas"
+
+    def __str__(self):
+        return f"Estatísticas de {self.company_id}"
+
+    @property
+    def contacts_inactive(self):
+        return self.contacts_total - self.contacts_active
+
+    @property
+    def margin_avg(self):
+        if not self.products_with_margin:
+            return None
+        return self.margin_sum / self.products_with_margin
+
+
+class CepAddress(models.Model):
+    """
+    Base nacional de CEPs para preencher endereços sem serviço externo
+    (carregada por ``manage.py load_ceps``; consultada por ``core.ceps``).
+
+    O CEP é guardado como número e é a chave primária: no SQLite vira o
+    próprio rowid, sem índice à parte.
+    """
+
+    cep = models.IntegerField("CEP", primary_key=True)
+    address = models.CharField("Logradouro", max_length=255, blank=True)
+    district = models.CharField("Bairro", max_length=100, blank=True)
+    city = models.CharField("Cidade", max_length=100)
+    uf = models.CharField("UF", max_length=2)
+
+    class Meta:
+        verbose_name = "CEP"
+        verbose_name_plural = "CEPs"
+
+    def __str__(self):
+        return f"{self.cep:08d}"
+
+
+class DuplicateCandidate(models.Model):
+    """
+    Par de contatos que podem ser o mesmo cadastro, encontrado pela busca de
+    duplicados (``core.dedup``) e revisado em Contatos > Duplicados.
+    ``contact_a`` é sempre o de menor id.
+    """
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="duplicate_candidates",
+        verbose_name="Empresa",
+    )
+    contact_a = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name="+")
+    contact_b = models.ForeignKey(Contact, on_delete=models.CASCADE, related_name="+")
+    score = models.FloatField("Semelhança")
+    reasons = models.CharField("Motivos", max_length=100, blank=True)
+    dismissed = models.BooleanField("Não é duplicado", default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Possível duplicado"
+        verbose_name_plural = "Possíveis duplicados"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["contact_a", "contact_b"], name="duplicate_pair_unique"
+            ),
+        ]
+        indexes = [
+            # Só os pares pendentes, já na ordem da tela de revisão.
+            models.Index(
+                fields=["company", "-score", "id"],
+                condition=models.Q(dismissed=False),
+                name="duplicate_pending_score_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.contact_a_id} x {self.contact_b_id} ({self.score:.2f})"
+
+
+class Proposal(models.Model):
+    """
+    Proposta comercial para um contato.
+
+    Os totais (itens, desconto, comissão) são calculados por
+    ``core.proposals`` sempre que os itens são gravados e ficam guardados
+    aqui: a listagem ordena e pagina pelas colunas da proposta, sem somar os
+    itens de cada linha.
+    """
+    STATUS_CHOICES = [
+        ("draft", "Rascunho"),
+        ("sent", "Enviada"),
+        ("approved", "Aprovada"),
+        ("rejected", "Recusada"),
+    ]
+
+    company = models.ForeignKey(
+        Company,
+        on_delete=models.CASCADE,
+        related_name="proposals",
+        verbose_name="Empresa",
+    )
+    # Sequencial por empresa, preenchido no save().
+    number = models.PositiveIntegerField("Número", editable=False)
+    contact = models.ForeignKey(
+        Contact,
+        on_delete=models.PROTECT,
+        related_name="proposals",
+        verbose_name="Cliente",
+    )
+    seller = models.ForeignKey(
+        Contact,
+        on_delete=models.SET_NULL,
+        related_name="sold_proposals",
+        verbose_name="Vendedor",
+        blank=True,
+        null=True,
+    )
+    status = models.CharField("Status", max_length=10, choices=STATUS_CHOICES, default="draft")
+    issued_on = models.DateField("Data", default=timezone.localdate)
+    valid_until = models.DateField("Válida até", blank=True, null=True)
+    discount_percent = models.DecimalField(
+        "Desconto geral (%)", max_digits=5, decimal_places=2, default=0
+    )
+    # Copiada da comissão do vendedor quando não informada.
+    commission_percent = models.DecimalField(
+        "Comissão (%)", max_digits=5, decimal_places=2, blank=True, null=True
+    )
+    notes = models.TextField("Observações", blank=True, null=True)
+
+    items_count = models.IntegerField("Itens", default=0, editable=False)
+    subtotal = models.DecimalField(
+        "Subtotal", max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    discount_total = models.DecimalField(
+        "Desconto", max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    total = models.DecimalField(
+        "Total", max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    commission_total = models.DecimalField(
+        "Comissão", max_digits=14, decimal_places=2, default=0, editable=False
+    )
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Proposta"
+        verbose_name_plural = "Propostas"
+        ordering = ["-number"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["company", "number"], name="proposal_company_number_unique"
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["company", "issued_on", "id"],
+                name="proposal_company_issued_idx",
+            ),
+            models.Index(
+                fields=["company", "total", "id"],
+                name="proposal_company_total_idx",
+            ),
+            models.Index(
+                fields=["company", "status", "id"],
+                name="proposal_company_status_idx",
+            ),
+            models.Index(
+                fields=["company", "updated_at"],
+                name="proposal_company_updated_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"Proposta {self.number}"
+
+    def save(self, *args, **kwargs):
+        if not self.number:
+            # As gravações são serializadas (BEGIN IMMEDIATE): o próximo
+            # número não corre o risco de repetir.
+            last = Proposal.objects.filter(company_id=self.company_id).aggregate(
+                models.Max("number")
+            )["number__max"]
+            self.number = (last or 0) + 1
+        super().save(*args, **kwargs)
+
+
+class ProposalItem(models.Model):
+    """
+    Item da proposta. Produtos em m² usam largura × altura (× quantidade de
+    peças); os demais, a quantidade. Nome, unidade e preço são copiados do
+    produto, então mudanças no catálogo não alteram propostas já feitas.
+    """
+    proposal = models.ForeignKey(
+        Proposal,
+        on_delete=models.CASCADE,
+        related_name="items",
+        verbose_name="Proposta",
+    )
+    product = models.ForeignKey(
+        Product,
+        on_delete=models.PROTECT,
+        related_name="proposal_items",
+        verbose_name="Produto",
+    )
+    description = models.CharField("Descrição", max_length=255)
+    unit = models.CharField("Unidade", max_length=3, choices=Product.UNIT_CHOICES)
+    quantity = models.DecimalField("Quantidade", max_digits=12, decimal_places=3, default=1)
+    width = models.DecimalField(
+        "Largura (m)", max_digits=10, decimal_places=3, blank=True, null=True
+    )
+    height = models.DecimalField(
+        "Altura (m)", max_digits=10, decimal_places=3, blank=True, null=True
+    )
+    unit_price = models.DecimalField("Valor unitário", max_digits=12, decimal_places=2)
+    discount_percent = models.DecimalField(
+        "Desconto (%)", max_digits=5, decimal_places=2, default=0
+    )
+    # Calculados por core.proposals.
+    area = models.DecimalField(
+        "Área (m²)", max_digits=14, decimal_places=4, blank=True, null=True, editable=False
+    )
+    total = models.DecimalField(
+        "Total", max_digits=14, decimal_places=2, default=0, editable=False
+    )
+    position = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        verbose_name = "Item da proposta"
+        verbose_name_plural = "Itens da proposta"
+        ordering = ["position", "id"]
+
+    def __str__(self):
+        return self.description
@@ -0,0 +1,282 @@
+"""
+Paginação por cursor (keyset) usada nas listagens.
+
+Em vez de OFFSET, cada página guarda os valores da ordenação do último (ou
+primeiro) registro exibido e a próxima consulta continua a partir deles,
+aproveitando o índice composto da tabela. O custo de cada página não cresce
+com o tamanho do cadastro.
+"""
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import DecimalField, F, Q
+
+PAGE_SIZE_CHOICES = (25, 50, 100)
+DEFAULT_PAGE_SIZE = 50
+
+AFTER_PARAM = "after"
+BEFORE_PARAM = "before"
+PAGE_SIZE_PARAM = "per_page"
+SORT_PARAM = "sort"
+
+
+def encode_cursor(values) -> str:
+    raw = json.dumps(list(values), cls=DjangoJSONEncoder, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str, fields):
+    """
+    Valores do cursor convertidos pelos campos da ordenação (``fields``).
+    Cursor adulterado ou de outra ordenação vira ``None`` (primeira página).
+    """
+    padded = token + "=" * (-len(token) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        return None
+    if not isinstance(values, list) or len(values) != len(fields):
+        return None
+    try:
+        converted = []
+        for field, value in zip(fields, values):
+            value = field.to_python(value)
+            # Os validadores de inteiro barram números fora do alcance do
+            # banco (OverflowError na consulta). Decimais ficam de fora: o
+            # ROUND() do SQLite devolve mais casas que o max_digits do campo.
+            if not isinstance(field, DecimalField):
+                field.run_validators(value)
+            converted.append(value)
+    except (ValidationError, ValueError, TypeError, OverflowError):
+        return None
+    return converted
+
+
+def _resolve(obj, path: str):
+    for attr in path.split("__"):
+        obj = getattr(obj, attr)
+    return obj
+
+
+class KeysetPage:
+    def __init__(self, items, *, next_values, prev_values, page_size, params):
+        self.items = items
+        self.page_size = page_size
+        self._next_values = next_values
+        self._prev_values = prev_values
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+    @property
+    def has_next(self) -> bool:
+        return self._next_values is not None
+
+    @property
+    def has_previous(self) -> bool:
+        return self._prev_values is not None
+
+    @property
+    def has_other_pages(self) -> bool:
+        return self.has_next or self.has_previous
+
+    def _query(self, **changes) -> str:
+        params = self._params.copy()
+        for key in (AFTER_PARAM, BEFORE_PARAM):
+            params.pop(key, None)
+        for key, value in changes.items():
+            params[key] = value
+        return params.urlencode()
+
+    @property
+    def next_query(self) -> str:
+        if not self.has_next:
+            return ""
+        return self._query(**{AFTER_PARAM: encode_cursor(self._next_values)})
+
+    @property
+    def previous_query(self) -> str:
+        if not self.has_previous:
+            return ""
+        return self._query(**{BEFORE_PARAM: encode_cursor(self._prev_values)})
+
+    @property
+    def size_links(self):
+        return [
+            (size, self._query(**{PAGE_SIZE_PARAM: size}), size == self.page_size)
+            for size in PAGE_SIZE_CHOICES
+        ]
+
+
+def sort_links(params, columns, current):
+    """
+    Cabeçalhos ordenáveis da tabela. ``columns`` é uma lista de ``(campo,
+    rótulo)``; cada item devolvido traz a querystring do link e a direção
+    atual ("asc", "desc" ou ``None``). Clicar na coluna ativa inverte a
+    direção; trocar a ordem volta para a primeira página.
+    """
+    links = []
+    for name, label in columns:
+        direction = None
+        target = name
+        if current == name:
+            direction, target = "asc", f"-{name}"
+        elif current == f"-{name}":
+            direction = "desc"
+        query = params.copy()
+        for key in (AFTER_PARAM, BEFORE_PARAM):
+            query.pop(key, None)
+        query[SORT_PARAM] = target
+        links.append(
+            {"label": label, "query": query.urlencode(), "direction": direction}
+        )
+    return links
+
+
+class KeysetPaginator:
+    """
+    Pagina um queryset pela tupla de campos em ``ordering``.
+
+    O último campo precisa ser único (normalmente ``id``) para desempatar.
+    Campos com "-" na frente são ordenados de forma decrescente. Valores nulos
+    ficam sempre antes na ordem crescente e depois na decrescente.
+    """
+
+    def __init__(self, queryset, ordering, default_page_size=DEFAULT_PAGE_SIZE):
+        self.queryset = queryset
+        self.fields = [
+            (name.lstrip("-"), name.startswith("-")) for name in ordering
+        ]
+        self.default_page_size = default_page_size
+
+    def _field(self, name):
+        """Campo do modelo (ou ``output_field`` da anotação) de ``name``."""
+        query = self.queryset.query
+        if name in query.annotations:
+            return query.annotations[name].output_field
+        model = self.queryset.model
+        *path, last = name.split("__")
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.pk if last == "pk" else model._meta.get_field(last)
+
+    def get_page_size(self, params) -> int:
+        try:
+            size = int(params.get(PAGE_SIZE_PARAM, self.default_page_size))
+        except (TypeError, ValueError):
+            return self.default_page_size
+        return size if size in PAGE_SIZE_CHOICES else self.default_page_size
+
+    def _order_by(self, reverse: bool):
+        order = []
+        for name, desc in self.fields:
+            if desc != reverse:
+                order.append(F(name).desc(nulls_last=True))
+            else:
+                order.append(F(name).asc(nulls_first=True))
+        return order
+
+    def _after(self, name, desc, value):
+        if desc:
+            if value is None:
+                return Q(pk__in=[])
+            return Q(**{f"{name}__lt": value}) | Q(**{f"{name}__isnull": True})
+        if value is None:
+            return Q(**{f"{name}__isnull": False})
+        return Q(**{f"{name}__gt": value})
+
+    def _equal(self, name, value):
+        if value is None:
+            return Q(**{f"{name}__isnull": True})
+        return Q(**{name: value})
+
+    def _bound(self, name, desc, value, nullable):
+        """``a >= x`` (ou ``a <= x``) redundante com a árvore de ``_seek``."""
+        if value is None:
+            return None
+        if desc:
+            bound = Q(**{f"{name}__lte": value})
+            if nullable:
+                bound |= Q(**{f"{name}__isnull": True})
+            return bound
+        return Q(**{f"{name}__gte": value})
+
+    def _seek(self, values, reverse: bool, nullable) -> Q:
+        # (a, b, c) > (x, y, z)  ==>  a > x OR (a = x AND (b > y OR (b = y AND c > z)))
+        condition = None
+        for (name, desc), value in reversed(list(zip(self.fields, values))):
+            step = self._after(name, desc != reverse, value)
+            if condition is not None:
+                step |= self._equal(name, value) & condition
+            condition = step
+        # Só com o OR o SQLite não limita a faixa do índice e percorre todas
+        # as linhas anteriores ao cursor; o limite no primeiro campo resolve.
+        name, desc = self.fields[0]
+        bound = self._bound(name, desc != reverse, values[0], nullable[0])
+        if bound is not None:
+            condition = bound & condition
+        return condition
+
+    def _values(self, obj):
+        return [_resolve(obj, name) for name, _ in self.fields]
+
+    def _prepare(self, params):
+        page_size = self.get_page_size(params)
+        fields = [self._field(name) for name, _ in self.fields]
+        # Anotações (margem, lucro) podem dar NULL mesmo com null=False.
+        annotations = self.queryset.query.annotations
+        nullable = [
+            field.null or name in annotations
+            for field, (name, _) in zip(fields, self.fields)
+        ]
+
+        after = decode_cursor(params.get(AFTER_PARAM, ""), fields)
+        before = None if after else decode_cursor(params.get(BEFORE_PARAM, ""), fields)
+
+        reverse = before is not None
+        queryset = self.queryset.order_by(*self._order_by(reverse))
+        cursor = after or before
+        if cursor is not None:
+            queryset = queryset.filter(self._seek(cursor, reverse, nullable))
+        return queryset[: page_size + 1], page_size, after, reverse
+
+    def _page(self, rows, page_size, after, reverse, params) -> KeysetPage:
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        next_values = prev_values = None
+        if rows:
+            if has_more or reverse:
+                next_values = self._values(rows[-1])
+            if (has_more and reverse) or after is not None:
+                prev_values = self._values(rows[0])
+
+        return KeysetPage(
+            rows,
+            next_values=next_values,
+            prev_values=prev_values,
+            page_size=page_size,
+            params=params,
+        )
+
+    def paginate(self, request) -> KeysetPage:
+        queryset, page_size, after, reverse = self._prepare(request.GET)
+        return self._page(list(queryset), page_size, after, reverse, request.GET)
+
+    async def apaginate(self, request) -> KeysetPage:
+        """``paginate`` para views assíncronas (ORM assíncrono)."""
+        queryset, page_size, after, reverse = self._prepare(request.GET)
+        rows = [row async for row in queryset]
+        return self._page(rows, page_size, after, reverse, request.GET)
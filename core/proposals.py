@@ -0,0 +1,196 @@
+"""
+Cálculo dos valores das propostas.
+
+Tudo em ``Decimal``, arredondando só no fim de cada valor (centavos, meio
+para cima), para a tela e o banco baterem:
+
+- item em m²: área = largura × altura × quantidade (4 casas); valor =
+  área × valor unitário;
+- item por unidade: valor = quantidade × valor unitário;
+- o desconto do item sai do valor dele; o desconto geral, do subtotal;
+- a comissão é um percentual do total (por padrão, o ``commission`` do
+  vendedor).
+
+Os totais ficam gravados na proposta (``items_count``, ``subtotal``,
+``discount_total``, ``total``, ``commission_total``). ``save_items`` grava
+itens e totais em lote ao salvar a proposta; ``recompute`` refaz os valores
+guardados de muitas propostas a partir dos itens (``manage.py
+recompute_proposals``).
+"""
+from collections import defaultdict
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import listcache
+from .database import run_with_retry
+from .models import Proposal, ProposalItem
+
+CENTS = Decimal("0.01")
+AREA = Decimal("0.0001")
+HUNDRED = Decimal(100)
+
+ITEM_FIELDS = (
+    "product",
+    "description",
+    "unit",
+    "quantity",
+    "width",
+    "height",
+    "unit_price",
+    "discount_percent",
+    "area",
+    "total",
+    "position",
+)
+TOTAL_FIELDS = ("items_count", "subtotal", "discount_total", "total", "commission_total")
+
+
+def _money(value) -> Decimal:
+    return value.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def _percent_of(value, percent) -> Decimal:
+    return _money(value * (percent or 0) / HUNDRED)
+
+
+def item_values(unit, quantity, width, height, unit_price, discount_percent):
+    """``(área, total)`` de um item; área é None fora do m²."""
+    area = None
+    amount = quantity
+    if unit == "M2":
+        area = (width * height * quantity).quantize(AREA, rounding=ROUND_HALF_UP)
+        amount = area
+    gross = amount * unit_price
+    return area, _money(gross - gross * (discount_percent or 0) / HUNDRED)
+
+
+def price_item(item):
+    item.area, item.total = item_values(
+        item.unit,
+        item.quantity,
+        item.width,
+        item.height,
+        item.unit_price,
+        item.discount_percent,
+    )
+
+
+def totals(item_totals, discount_percent, commission_percent) -> dict:
+    """Valores gravados na proposta a partir dos totais dos itens."""
+    item_totals = list(item_totals)
+    subtotal = sum(item_totals, Decimal(0))
+    discount = _percent_of(subtotal, discount_percent)
+    total = subtotal - discount
+    return {
+        "items_count": len(item_totals),
+        "subtotal": subtotal,
+        "discount_total": discount,
+        "total": total,
+        "commission_total": _percent_of(total, commission_percent),
+    }
+
+
+def save_items(proposal, items, deleted_ids=()):
+    """
+    Grava todos os ``items`` da proposta (novos e alterados, na ordem da
+    lista), exclui ``deleted_ids`` e atualiza os totais: alguns comandos por
+    proposta, não um por item. Chamar dentro de uma transação.
+    """
+    for position, item in enumerate(items):
+        item.proposal = proposal
+        item.position = position
+        price_item(item)
+    if deleted_ids:
+        ProposalItem.objects.filter(proposal=proposal, pk__in=deleted_ids).delete()
+    # Separados antes: no SQLite o bulk_create preenche o pk dos novos.
+    existing = [item for item in items if item.pk is not None]
+    ProposalItem.objects.bulk_create([item for item in items if item.pk is None])
+    ProposalItem.objects.bulk_update(existing, ITEM_FIELDS)
+
+    values = totals(
+        (item.total for item in items), proposal.discount_percent, proposal.commission_percent
+    )
+    for name, value in values.items():
+        setattr(proposal, name, value)
+    proposal.save(update_fields=[*TOTAL_FIELDS, "updated_at"])
+
+
+def _update_rows(model, field_names, objs):
+    """
+    Grava ``field_names`` de cada objeto com um único ``UPDATE ... WHERE
+    id = %s`` repetido (``executemany``). O ``bulk_update`` do Django monta
+    um ``CASE`` com uma condição por linha em cada coluna, que o SQLite
+    avalia linha a linha: em lotes grandes o custo cresce com o quadrado.
+    """
+    if not objs:
+        return
+    fields = [model._meta.get_field(name) for name in field_names]
+    quote = connection.ops.quote_name
+    assignments = ", ".join(f"{quote(field.column)} = %s" for field in fields)
+    sql = (
+        f"UPDATE {quote(model._meta.db_table)} SET {assignments} "
+        f"WHERE {quote(model._meta.pk.column)} = %s"
+    )
+    rows = [
+        [field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields]
+        + [obj.pk]
+        for obj in objs
+    ]
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+
+
+def _recompute_batch(proposal_ids):
+    # Tuplas em vez de instâncias: só as linhas que mudam viram objetos.
+    items = ProposalItem.objects.filter(proposal_id__in=proposal_ids).order_by().values_list(
+        "pk", "proposal_id", "unit", "quantity", "width", "height", "unit_price",
+        "discount_percent", "area", "total",
+    )
+    item_totals = defaultdict(list)
+    changed_items = []
+    for pk, proposal_id, unit, quantity, width, height, price, discount, area, total in items:
+        values = item_values(unit, quantity, width, height, price, discount)
+        if values != (area, total):
+            changed_items.append(ProposalItem(pk=pk, area=values[0], total=values[1]))
+        item_totals[proposal_id].append(values[1])
+
+    proposals = Proposal.objects.filter(pk__in=proposal_ids).order_by().values_list(
+        "pk", "company_id", "discount_percent", "commission_percent", *TOTAL_FIELDS
+    )
+    changed = []
+    companies = set()
+    now = timezone.now()
+    for pk, company_id, discount, commission, *stored in proposals:
+        values = totals(item_totals[pk], discount, commission)
+        if list(values.values()) != stored:
+            changed.append(Proposal(pk=pk, updated_at=now, **values))
+            companies.add(company_id)
+    _update_rows(ProposalItem, ["area", "total"], changed_items)
+    _update_rows(Proposal, [*TOTAL_FIELDS, "updated_at"], changed)
+    for company_id in companies:
+        listcache.bump(company_id, Proposal)
+    return len(changed)
+
+
+def recompute(company_ids=None, batch_size=None) -> int:
+    """
+    Recalcula os valores guardados das propostas (todas as empresas se
+    ``None``), ``batch_size`` propostas por vez: uma consulta de itens e das
+    propostas e só as linhas que mudaram regravadas, por lote. Retorna
+    quantas propostas mudaram.
+    """
+    batch_size = batch_size or settings.PROPOSAL_BATCH_SIZE
+    proposals = Proposal.objects.order_by("pk")
+    if company_ids is not None:
+        proposals = proposals.filter(company_id__in=company_ids)
+    changed = 0
+    last = 0
+    while True:
+        ids = list(proposals.filter(pk__gt=last).values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            return changed
+        changed += run_with_retry(_recompute_batch, ids)
+        last = ids[-1]
@@ -0,0 +1,125 @@
+"""
+Reajuste de preços do catálogo: percentual ou valor fixo sobre o preço de
+venda, o de custo ou os dois, com arredondamento para um múltiplo (ex.:
+R$ 0,10).
+
+A prévia são agregações no banco (totais e margens antes e depois) e uma
+amostra de produtos; aplicar é um único ``UPDATE ... SET price = ROUND(...)``
+com expressões ``F()`` sobre os produtos filtrados, sem carregar nenhum
+deles no Python. Como ``update()`` não dispara sinais, ``apply`` acerta os
+contadores do painel e a versão do cache da listagem.
+"""
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+
+from django.db.models import (
+    Avg,
+    Count,
+    DecimalField,
+    ExpressionWrapper,
+    F,
+    Max,
+    Min,
+    Q,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Greatest, Round
+from django.utils import timezone
+
+from . import listcache, stats
+from .models import Product, margin_expression
+
+TARGET_FIELDS = {
+    "price": ("price",),
+    "cost_price": ("cost_price",),
+    "both": ("price", "cost_price"),
+}
+
+# Produtos mostrados na prévia.
+SAMPLE_SIZE = 10
+
+_MONEY = DecimalField(max_digits=12, decimal_places=2)
+_RATIO = DecimalField(max_digits=14, decimal_places=4)
+
+
+@dataclass(frozen=True)
+class Adjustment:
+    target: str  # chave de TARGET_FIELDS
+    mode: str  # "percent" ou "amount"
+    value: Decimal
+    step: Decimal = Decimal("0.01")
+
+    @property
+    def fields(self):
+        return TARGET_FIELDS[self.target]
+
+    def expression(self, field):
+        """Novo valor de ``field``: reajustado, arredondado ao passo e nunca negativo."""
+        if self.mode == "percent":
+            factor = Value(Decimal(1) + self.value / 100)
+            changed = ExpressionWrapper(F(field) * factor, output_field=_RATIO)
+        else:
+            changed = ExpressionWrapper(F(field) + Value(self.value), output_field=_RATIO)
+        step = Value(self.step)
+        rounded = ExpressionWrapper(Round(changed / step) * step, output_field=_RATIO)
+        return Round(Greatest(rounded, Value(Decimal(0))), 2, output_field=_MONEY)
+
+    def new_value(self, field):
+        return self.expression(field) if field in self.fields else F(field)
+
+
+def _with_new_values(queryset, adjustment):
+    return queryset.annotate(
+        new_price=adjustment.new_value("price"),
+        new_cost_price=adjustment.new_value("cost_price"),
+    ).annotate(
+        # Mesma conta de ``ProductQuerySet.with_profit``.
+        new_margin=margin_expression(F("new_price") - F("new_cost_price"), F("new_price")),
+    )
+
+
+def preview(queryset, adjustment) -> dict:
+    """
+    Totais e margens antes e depois do reajuste (uma consulta) e uma amostra
+    de ``SAMPLE_SIZE`` produtos. ``queryset`` vem de ``with_profit()``.
+    """
+    products = _with_new_values(queryset, adjustment).order_by()
+    totals = products.aggregate(
+        count=Count("id"),
+        price_total=Sum("price"),
+        new_price_total=Sum("new_price"),
+        cost_total=Sum("cost_price"),
+        new_cost_total=Sum("new_cost_price"),
+        margin_avg=Avg("margin"),
+        new_margin_avg=Avg("new_margin"),
+        new_margin_min=Min("new_margin"),
+        new_margin_max=Max("new_margin"),
+        negative_margin=Count("id", filter=Q(new_margin__lt=0)),
+    )
+    sample = products.order_by("name", "id").values(
+        "pk", "name", "price", "new_price", "cost_price", "new_cost_price", "margin", "new_margin"
+    )[:SAMPLE_SIZE]
+    return {"totals": totals, "sample": list(sample)}
+
+
+def apply(company_id, queryset, adjustment) -> int:
+    """
+    Reajusta os produtos de ``queryset`` em um ``UPDATE`` e devolve quantos
+    foram alterados. Chamar dentro de uma transação.
+    """
+    # Os filtros de margem podem deixar de casar depois do UPDATE: a
+    # diferença dos contadores sai do catálogo da empresa inteiro.
+    catalog = Product.objects.filter(company_id=company_id)
+    before = stats.contribution_of(catalog)
+    updated = queryset.filter(company_id=company_id).update(
+        **{field: adjustment.expression(field) for field in adjustment.fields},
+        updated_at=timezone.now(),
+    )
+    if updated:
+        delta = Counter(stats.contribution_of(catalog))
+        delta.subtract(before)
+        stats.apply(company_id, delta)
+        listcache.bump(company_id, Product)
+    return updated
@@ -0,0 +1,135 @@
+"""
+Busca de contatos em um índice FTS5 do SQLite.
+
+O índice ``core_contact_fts`` guarda, para cada contato, o token da empresa e
+os campos pesquisáveis. O tokenizer ``unicode61`` com ``remove_diacritics``
+deixa a busca insensível a acentos e maiúsculas ("jose" encontra "José") e
+cada termo digitado é buscado como prefixo. Documento e telefone também são
+indexados só com dígitos, então "12345678900" encontra "123.456.789-00".
+"""
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = "core_contact_fts"
+
+SEARCH_COLUMNS = ("display_name", "legal_name", "document", "email", "phone", "city")
+
+_TERM_RE = re.compile(r"\w+", re.UNICODE)
+_NON_DIGIT_RE = re.compile(r"\D")
+
+# Limite de termos para não montar expressões MATCH gigantes.
+MAX_TERMS = 8
+
+
+def company_token(company_id) -> str:
+    return f"c{company_id}"
+
+
+def _with_digits(value):
+    if not value:
+        return value
+    digits = _NON_DIGIT_RE.sub("", value)
+    if digits and digits != value:
+        return f"{value} {digits}"
+    return value
+
+
+def index_row(contact):
+    return (
+        contact.pk,
+        company_token(contact.company_id),
+        contact.display_name,
+        contact.legal_name,
+        _with_digits(contact.document),
+        contact.email,
+        _with_digits(contact.phone),
+        contact.city,
+    )
+
+
+def index_contacts(contacts, new=False):
+    """
+    Insere ou atualiza os contatos no índice (uma instrução por lote).
+
+    ``new=True`` indica contatos recém-criados (ex.: ``bulk_create``), que
+    dispensam o REPLACE.
+    """
+    rows = [index_row(contact) for contact in contacts]
+    if not rows:
+        return
+    verb = "INSERT" if new else "INSERT OR REPLACE"
+    columns = ", ".join(("rowid", "company") + SEARCH_COLUMNS)
+    placeholders = ", ".join(["%s"] * (len(SEARCH_COLUMNS) + 2))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"{verb} INTO {FTS_TABLE} ({columns}) VALUES ({placeholders})",
+            rows,
+        )
+
+
+def unindex_contacts(contact_ids):
+    ids = list(contact_ids)
+    if not ids:
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid = %s",
+            [(pk,) for pk in ids],
+        )
+
+
+def rebuild_index(company_ids=None, batch_size=2000):
+    """Recria o índice a partir da tabela de contatos. Retorna o total indexado."""
+    from .models import Contact
+
+    contacts = Contact.objects.only("company_id", *SEARCH_COLUMNS).order_by()
+    with connection.cursor() as cursor:
+        if company_ids is None:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+        else:
+            contacts = contacts.filter(company_id__in=company_ids)
+            for company_id in company_ids:
+                cursor.execute(
+                    f"DELETE FROM {FTS_TABLE} WHERE company MATCH %s",
+                    [company_token(company_id)],
+                )
+
+    total = 0
+    batch = []
+    for contact in contacts.iterator(chunk_size=batch_size):
+        batch.append(contact)
+        if len(batch) >= batch_size:
+            index_contacts(batch)
+            total += len(batch)
+            batch = []
+    index_contacts(batch)
+    return total + len(batch)
+
+
+def build_match_query(company_id, text: str) -> str | None:
+    terms = _TERM_RE.findall(text)[:MAX_TERMS]
+    if not terms:
+        return None
+    expr = " AND ".join(f'"{term}"*' for term in terms)
+    columns = " ".join(SEARCH_COLUMNS)
+    return f"company : {company_token(company_id)} AND {{{columns}}} : ({expr})"
+
+
+def search_contacts(queryset, company_id, text: str):
+    """
+    Filtra ``queryset`` pelos contatos da empresa que casam com ``text``.
+
+    A filtragem é feita pelo índice FTS; o queryset continua livre para
+    ordenar e paginar normalmente.
+    """
+    match = build_match_query(company_id, text)
+    if match is None:
+        return queryset
+    return queryset.filter(
+        pk__in=RawSQL(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+            [match],
+        )
+    )
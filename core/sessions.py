@@ -0,0 +1,133 @@
+"""
+Engine de sessão (``SESSION_ENGINE = "core.sessions"``) que lê e grava no
+cache compartilhado pelos workers (``SESSION_CACHE_ALIAS``, em disco) e leva
+a sessão ao banco depois, em segundo plano.
+
+Uma requisição autenticada não consulta mais ``django_session``: o banco só
+é lido quando a sessão sumiu do cache (expulsa por falta de espaço ou cache
+apagado). Gravações (login, troca de dados da sessão) vão para o cache na
+hora e para o banco por ``core.tasks``, fora da requisição; várias gravações
+da mesma sessão enquanto a anterior espera viram uma só.
+
+Apagar uma sessão (logout, ``cycle_key``) continua síncrono nos dois
+lugares: uma sessão encerrada não pode voltar ao ser relida do banco.
+
+As sessões vencidas são apagadas do banco em lotes (``clear_expired``), em
+segundo plano a cada ``SESSION_PURGE_INTERVAL`` e pelo ``clearsessions``.
+A mesma limpeza apaga os arquivos vencidos do cache (``SessionFileCache``).
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import CreateError
+from django.contrib.sessions.backends.cached_db import SessionStore as CachedDBStore
+from django.core.cache import caches
+from django.core.cache.backends.filebased import FileBasedCache
+from django.db import transaction
+from django.utils import timezone
+
+from . import tasks
+from .database import run_with_retry
+
+KEY_PREFIX = "sispeed.session."
+
+_pending = set()
+_pending_lock = threading.Lock()
+_next_purge = 0.0
+
+
+class SessionFileCache(FileBasedCache):
+    """
+    ``FileBasedCache`` sem o descarte por ``MAX_ENTRIES``: o do Django lista
+    o diretório inteiro a cada gravação, o que com uma sessão por arquivo
+    custa caro justo no login. Os arquivos vencidos saem em
+    ``clear_expired``, na limpeza periódica das sessões.
+    """
+
+    def _cull(self):
+        pass
+
+    def clear_expired(self):
+        """Apaga os arquivos vencidos; devolve quantos."""
+        removed = 0
+        for fname in self._list_cache_files():
+            try:
+                with open(fname, "rb") as f:
+                    if self._is_expired(f):
+                        removed += 1
+            except FileNotFoundError:
+                pass
+        return removed
+
+
+class SessionStore(CachedDBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        data = self._get_session(no_load=must_create)
+        timeout = self.get_expiry_age()
+        if must_create:
+            if not self._cache.add(self.cache_key, data, timeout):
+                raise CreateError
+        else:
+            self._cache.set(self.cache_key, data, timeout)
+        session_key = self.session_key
+        transaction.on_commit(lambda: _schedule_persist(session_key))
+        _schedule_purge()
+
+    @classmethod
+    def clear_expired(cls, batch_size=None):
+        """Apaga as sessões vencidas em lotes curtos; devolve quantas (do banco)."""
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        if isinstance(cache, SessionFileCache):
+            cache.clear_expired()
+        batch_size = batch_size or settings.SESSION_PURGE_BATCH_SIZE
+        model = cls.get_model_class()
+        total = 0
+        while True:
+            keys = list(
+                model.objects.filter(expire_date__lt=timezone.now()).values_list(
+                    "pk", flat=True
+                )[:batch_size]
+            )
+            if not keys:
+                return total
+            model.objects.filter(pk__in=keys).delete()
+            total += len(keys)
+
+
+def persist(session_key):
+    """Copia para o banco o estado atual da sessão no cache."""
+    with _pending_lock:
+        _pending.discard(session_key)
+    store = SessionStore(session_key)
+    data = store._cache.get(store.cache_key)
+    if data is None:
+        return  # Apagada ou vencida antes de chegar a vez dela.
+    store._session_cache = data
+    run_with_retry(store.create_model_instance(data).save)
+    if store.cache_key not in store._cache:
+        # Apagada enquanto era gravada: não pode ficar no banco.
+        store.get_model_class().objects.filter(session_key=session_key).delete()
+
+
+def _schedule_persist(session_key):
+    # Roda já fora de transação: uma sessão gravada em um bloco que sofreu
+    # rollback não fica marcada como pendente para sempre.
+    with _pending_lock:
+        if session_key in _pending:
+            return
+        _pending.add(session_key)
+    tasks.enqueue(persist, session_key)
+
+
+def _schedule_purge():
+    global _next_purge
+    now = time.monotonic()
+    if now < _next_purge:
+        return
+    _next_purge = now + settings.SESSION_PURGE_INTERVAL
+    tasks.enqueue(SessionStore.clear_expired)
@@ -0,0 +1,157 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+
+from . import bulk, conditional, database, instrumentation, listcache, search, stats, tenancy
+from .models import (
+    Company,
+    Contact,
+    Product,
+    Proposal,
+    Sector,
+    UserCompany,
+    UserPermission,
+    UserPreference,
+)
+
+User = get_user_model()
+
+
+# -------- BANCO --------
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    if connection.vendor == "sqlite":
+        database.apply_pragmas(connection)
+
+
+@receiver(post_migrate)
+def enable_wal(sender, using, **kwargs):
+    if sender.name == "core" and connections[using].vendor == "sqlite":
+        database.set_journal_mode(connections[using])
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Só mede dentro de uma requisição com o TimingMiddleware ativo.
+    if instrumentation.query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrumentation.query_timer)
+
+
+# Os receptores com ``bulk.unless_bulk`` não rodam nas ações em massa, que
+# fazem o mesmo trabalho uma vez por lote (ver core.bulk).
+
+# -------- BUSCA DE CONTATOS --------
+
+@receiver(post_save, sender=Contact)
+@bulk.unless_bulk
+def index_contact(sender, instance, **kwargs):
+    search.index_contacts([instance])
+
+
+@receiver(post_delete, sender=Contact)
+@bulk.unless_bulk
+def unindex_contact(sender, instance, **kwargs):
+    search.unindex_contacts([instance.pk])
+
+
+# -------- ESTATÍSTICAS DO PAINEL --------
+
+@receiver(pre_save, sender=Contact)
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=Sector)
+@receiver(pre_save, sender=UserCompany)
+@receiver(pre_save, sender=Proposal)
+@bulk.unless_bulk
+def remember_stats(sender, instance, update_fields=None, raw=False, **kwargs):
+    if not raw:
+        instance._stats_previous = stats.load_previous(instance, update_fields)
+
+
+@receiver(post_save, sender=Contact)
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=Sector)
+@receiver(post_save, sender=UserCompany)
+@receiver(post_save, sender=Proposal)
+@bulk.unless_bulk
+def update_stats(sender, instance, raw=False, **kwargs):
+    if not raw:
+        stats.record_save(instance, instance.__dict__.pop("_stats_previous", None))
+
+
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Sector)
+@receiver(post_delete, sender=UserCompany)
+@receiver(post_delete, sender=Proposal)
+@bulk.unless_bulk
+def remove_stats(sender, instance, **kwargs):
+    stats.record_delete(instance)
+
+
+# -------- CONTEXTO DO TENANT --------
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_tenant_user(sender, instance, **kwargs):
+    tenancy.invalidate_users([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=UserCompany)
+@receiver([post_save, post_delete], sender=UserPreference)
+def invalidate_tenant_link(sender, instance, **kwargs):
+    tenancy.invalidate_users([instance.user_id])
+
+
+@receiver([post_save, post_delete], sender=UserPermission)
+def invalidate_tenant_permissions(sender, instance, **kwargs):
+    user_ids = (
+        UserCompany.objects.filter(pk=instance.user_company_id)
+        .order_by()
+        .values_list("user_id", flat=True)
+    )
+    tenancy.invalidate_users(list(user_ids))
+
+
+@receiver(post_save, sender=Company)
+def invalidate_tenant_company(sender, instance, **kwargs):
+    tenancy.invalidate_company(instance.pk)
+
+
+# -------- CACHE DAS LISTAGENS --------
+
+@receiver([post_save, post_delete], sender=Contact)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=Sector)
+@receiver([post_save, post_delete], sender=UserCompany)
+@receiver([post_save, post_delete], sender=Proposal)
+@bulk.unless_bulk
+def bump_list_version(sender, instance, **kwargs):
+    listcache.bump(instance.company_id, sender)
+
+
+@receiver(post_delete, sender=Contact)
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=Sector)
+@receiver(post_delete, sender=UserCompany)
+@receiver(post_delete, sender=Proposal)
+@bulk.unless_bulk
+def touch_company_on_delete(sender, instance, **kwargs):
+    conditional.touch_company(instance.company_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def bump_user_list_version(sender, instance, created=False, update_fields=None, **kwargs):
+    # Recém-criado ainda não tem vínculo; o login só grava last_login, que a
+    # listagem não mostra.
+    if created or update_fields == frozenset({"last_login"}):
+        return
+    listcache.bump_users([instance.pk])
+
+
+@receiver(post_save, sender=Company)
+def reset_list_versions(sender, instance, created, **kwargs):
+    # Um id reaproveitado (empresa excluída e outra criada) não herda tabelas.
+    if created:
+        listcache.bump(instance.pk)
@@ -0,0 +1,12 @@
+"""
+Backend SQLite do sispeed: igual ao do Django, mas as transações começam
+com ``BEGIN IMMEDIATE`` (ver ``core.database``).
+"""
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    begin_sql = "BEGIN IMMEDIATE"
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute(self.begin_sql)
@@ -0,0 +1,243 @@
+"""
+Arquivos estáticos: nomes com hash, versões pré-comprimidas e um handler
+WSGI que os serve sem passar pelo Django.
+
+``collectstatic`` grava ``style.<hash>.css`` e, ao lado, ``.gz`` e ``.br``
+(o brotli é opcional: sem o pacote ``Brotli`` só sai o gzip). O
+``StaticFilesApp`` envolve a aplicação WSGI, escolhe a versão pelo
+``Accept-Encoding``, responde ``ETag``/``304`` e manda os arquivos com hash
+com cache "immutable" de um ano, usando ``wsgi.file_wrapper`` (sendfile no
+gunicorn) para não copiar o conteúdo em Python.
+"""
+import gzip
+import mimetypes
+import os
+import posixpath
+from email.utils import formatdate
+from urllib.parse import unquote
+from wsgiref.util import FileWrapper
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils._os import safe_join
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depende do ambiente
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {
+    ".css", ".js", ".mjs", ".map", ".json", ".svg", ".ico", ".txt", ".xml", ".html",
+}
+# Só grava a versão comprimida se ela economizar pelo menos isto.
+MIN_SAVING = 0.05
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "public, max-age=300"
+MEDIA_CACHE = "public, max-age=86400"
+CHUNK_SIZE = 64 * 1024
+
+# Extensão -> Content-Encoding, na ordem de preferência.
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def compress(path):
+    """Grava ``path``.gz e ``path``.br quando compensa. Devolve as extensões."""
+    with open(path, "rb") as fp:
+        data = fp.read()
+    written = []
+    outputs = [(".gz", lambda raw: gzip.compress(raw, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        outputs.insert(0, (".br", lambda raw: brotli.compress(raw, quality=11)))
+    for suffix, encode in outputs:
+        compressed = encode(data)
+        if len(compressed) <= len(data) * (1 - MIN_SAVING):
+            with open(path + suffix, "wb") as fp:
+                fp.write(compressed)
+            written.append(suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ``ManifestStaticFilesStorage`` que também pré-comprime os arquivos.
+
+    Sem manifesto (ambiente sem ``collectstatic``, ex.: testes) os templates
+    usam o nome original em vez de quebrar com "Missing staticfiles manifest
+    entry".
+    """
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        names = set(self.hashed_files.values()) | set(paths)
+        for name in sorted(names):
+            if os.path.splitext(name)[1].lower() in COMPRESSIBLE_EXTENSIONS:
+                if self.exists(name):
+                    compress(self.path(name))
+
+
+def _content_type(path):
+    content_type, _ = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+    if content_type.startswith("text/") or content_type in (
+        "application/javascript",
+        "application/json",
+        "image/svg+xml",
+    ):
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def _accepted(header):
+    """``{"gzip": 1.0, "br": 0.5, ...}`` a partir do ``Accept-Encoding``."""
+    accepted = {}
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class StaticFile:
+    """Um arquivo e as versões comprimidas dele, com cabeçalhos prontos."""
+
+    def __init__(self, path, cache_control):
+        self.cache_control = cache_control
+        self.content_type = _content_type(path)
+        self.variants = {}
+        for encoding, suffix in (("identity", ""),) + ENCODINGS:
+            candidate = path + suffix
+            if suffix and not os.path.isfile(candidate):
+                continue
+            stat = os.stat(candidate)
+            self.variants[encoding] = (
+                candidate,
+                stat.st_size,
+                f'"{stat.st_size:x}-{stat.st_mtime_ns:x}-{encoding}"',
+                formatdate(stat.st_mtime, usegmt=True),
+            )
+
+    def choose(self, accept_encoding):
+        if len(self.variants) > 1 and accept_encoding:
+            accepted = _accepted(accept_encoding)
+            for encoding, _ in ENCODINGS:
+                quality = accepted.get(encoding, accepted.get("*", 0.0))
+                if encoding in self.variants and quality > 0:
+                    return encoding
+        return "identity"
+
+
+def _etag_matches(header, etag):
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return etag in candidates or f"W/{etag}" in candidates
+
+
+class StaticFilesApp:
+    """
+    Middleware WSGI para ``STATIC_URL`` (índice montado uma vez, na
+    inicialização, a partir do ``STATIC_ROOT``) e ``MEDIA_URL`` (procurado
+    no disco a cada requisição, já que uploads chegam com o processo no ar).
+    Reinicie o servidor depois do ``collectstatic``.
+    """
+
+    def __init__(self, application, static_url, static_root, media_url=None, media_root=None):
+        self.application = application
+        self.static_prefix = static_url
+        self.media_prefix = media_url
+        self.media_root = str(media_root) if media_root else None
+        self.files = self._index(str(static_root)) if static_root else {}
+
+    def _index(self, root):
+        files = {}
+        if not os.path.isdir(root):
+            return files
+        storage = CompressedManifestStaticFilesStorage(location=root)
+        hashed = set(storage.hashed_files.values())
+        for directory, _, filenames in os.walk(root):
+            for filename in filenames:
+                if filename.endswith((".gz", ".br")):
+                    continue
+                path = os.path.join(directory, filename)
+                name = os.path.relpath(path, root).replace(os.sep, "/")
+                cache_control = IMMUTABLE if name in hashed else REVALIDATE
+                files[name] = StaticFile(path, cache_control)
+        return files
+
+    def _is_media(self, path):
+        return bool(self.media_root and self.media_prefix and path.startswith(self.media_prefix))
+
+    def handles(self, path):
+        return path.startswith(self.static_prefix) or self._is_media(path)
+
+    def __call__(self, environ, start_response):
+        path = environ.get("PATH_INFO", "")
+        if path.startswith(self.static_prefix):
+            static_file = self.files.get(path[len(self.static_prefix):])
+            return self.serve(environ, start_response, static_file)
+        if self._is_media(path):
+            return self.serve(environ, start_response, self._media_file(path))
+        return self.application(environ, start_response)
+
+    def _media_file(self, path):
+        name = unquote(path[len(self.media_prefix):])
+        if not name or posixpath.basename(name).startswith("."):
+            return None
+        try:
+            full_path = safe_join(self.media_root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(full_path):
+            return None
+        return StaticFile(full_path, MEDIA_CACHE)
+
+    def serve(self, environ, start_response, static_file):
+        method = environ.get("REQUEST_METHOD", "GET")
+        if static_file is None:
+            start_response("404 Not Found", [("Content-Type", "text/plain"), ("Content-Length", "9")])
+            return [b"Not Found"]
+        if method not in ("GET", "HEAD"):
+            start_response("405 Method Not Allowed", [("Allow", "GET, HEAD"), ("Content-Length", "0")])
+            return []
+
+        encoding = static_file.choose(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        path, size, etag, last_modified = static_file.variants[encoding]
+        headers = [
+            ("Cache-Control", static_file.cache_control),
+            ("ETag", etag),
+            ("Last-Modified", last_modified),
+        ]
+        if len(static_file.variants) > 1:
+            headers.append(("Vary", "Accept-Encoding"))
+
+        if_none_match = environ.get("HTTP_IF_NONE_MATCH")
+        if if_none_match and _etag_matches(if_none_match, etag):
+            start_response("304 Not Modified", headers)
+            return []
+
+        headers += [("Content-Type", static_file.content_type), ("Content-Length", str(size))]
+        if encoding != "identity":
+            headers.append(("Content-Encoding", encoding))
+        start_response("200 OK", headers)
+        if method == "HEAD":
+            return []
+        fp = open(path, "rb")
+        file_wrapper = environ.get("wsgi.file_wrapper", FileWrapper)
+        return file_wrapper(fp, CHUNK_SIZE)
@@ -0,0 +1,235 @@
+"""
+Estatísticas do painel por empresa (``CompanyStats``).
+
+Cada registro de contato, produto, setor, usuário ou proposta "contribui"
+com alguns contadores (ex.: um contato ativo e cliente soma 1 em
+``contacts_total``, ``contacts_active`` e ``contacts_client``). Ao gravar ou excluir, os sinais
+aplicam só a diferença entre a contribuição nova e a antiga com um
+``UPDATE ... SET campo = campo + delta``; o painel lê uma linha.
+
+Caminhos que não disparam sinais (``bulk_create``, ``update()``) precisam
+chamar ``apply`` com a soma das contribuições ou ``rebuild``.
+"""
+from collections import Counter
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db.models import Count, F, Q, Sum
+
+from .models import Company, CompanyStats, Contact, Product, Proposal, Sector, UserCompany
+
+# Flag do contato -> contador.
+CONTACT_FLAGS = {
+    "is_client": "contacts_client",
+    "is_supplier": "contacts_supplier",
+    "is_partner": "contacts_partner",
+    "is_employee": "contacts_employee",
+    "is_seller": "contacts_seller",
+    "is_other": "contacts_other",
+}
+
+# Campos lidos antes de uma alteração, por modelo. Setores e vínculos de
+# usuário só mudam os contadores ao serem criados ou excluídos.
+TRACKED_FIELDS = {
+    Contact: ("company", "is_active", *CONTACT_FLAGS),
+    Product: ("company", "is_active", "price", "cost_price"),
+}
+
+# Campo booleano -> contador que ele move (ações em massa com ``update()``).
+FIELD_COUNTERS = {
+    Contact: {"is_active": "contacts_active", **CONTACT_FLAGS},
+    Product: {"is_active": "products_active"},
+}
+
+CENTS = Decimal("0.01")
+
+
+def product_margin(price, cost_price):
+    """Margem em %, arredondada como em ``models.margin_expression`` (o rebuild)."""
+    if cost_price is None or not price:
+        return None
+    margin = (Decimal(price) - Decimal(cost_price)) * 100 / Decimal(price)
+    return margin.quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def contribution(instance) -> Counter:
+    counts = Counter()
+    if isinstance(instance, Contact):
+        counts["contacts_total"] = 1
+        counts["contacts_active"] = int(instance.is_active)
+        for flag, name in CONTACT_FLAGS.items():
+            counts[name] = int(getattr(instance, flag))
+    elif isinstance(instance, Product):
+        counts["products_total"] = 1
+        counts["products_active"] = int(instance.is_active)
+        margin = product_margin(instance.price, instance.cost_price)
+        if margin is not None:
+            counts["products_with_margin"] = 1
+            counts["margin_sum"] = margin
+    elif isinstance(instance, Sector):
+        counts["sectors_total"] = 1
+    elif isinstance(instance, UserCompany):
+        counts["users_total"] = 1
+    elif isinstance(instance, Proposal):
+        counts["proposals_total"] = 1
+    return counts
+
+
+def total_contribution(instances) -> Counter:
+    total = Counter()
+    for instance in instances:
+        total.update(contribution(instance))
+    return total
+
+
+def load_previous(instance, update_fields=None):
+    """
+    Versão gravada de ``instance`` (só os campos que contam). None em
+    inclusões; ``instance`` mesmo quando a alteração não mexe em nenhum
+    campo que conta.
+    """
+    model = type(instance)
+    if instance._state.adding or instance.pk is None:
+        return None
+    fields = TRACKED_FIELDS.get(model)
+    if not fields or (update_fields is not None and not set(fields) & set(update_fields)):
+        return instance
+    return model.objects.only(*fields).filter(pk=instance.pk).first()
+
+
+def apply(company_id, deltas) -> bool:
+    """
+    Soma ``deltas`` aos contadores da empresa em um único UPDATE. Devolve
+    False se a empresa ainda não tem registro (ele será montado do zero na
+    primeira leitura).
+    """
+    changes = {name: F(name) + value for name, value in deltas.items() if value}
+    if not changes:
+        return True
+    return bool(CompanyStats.objects.filter(company_id=company_id).update(**changes))
+
+
+def record_save(instance, previous):
+    if previous is instance:
+        return
+    new = contribution(instance)
+    if previous is None or previous.company_id != instance.company_id:
+        if previous is not None:
+            apply(previous.company_id, negate(contribution(previous)))
+        apply(instance.company_id, new)
+        return
+    delta = Counter(new)
+    delta.subtract(contribution(previous))
+    apply(instance.company_id, delta)
+
+
+def record_delete(instance):
+    apply(instance.company_id, negate(contribution(instance)))
+
+
+def negate(counts):
+    return {name: -value for name, value in counts.items()}
+
+
+def _aggregates(model) -> dict:
+    """Agregações que somam as contribuições das linhas de ``model``."""
+    if model is Contact:
+        return {
+            "contacts_total": Count("id"),
+            "contacts_active": Count("id", filter=Q(is_active=True)),
+            **{
+                name: Count("id", filter=Q(**{flag: True}))
+                for flag, name in CONTACT_FLAGS.items()
+            },
+        }
+    if model is Product:
+        return {
+            "products_total": Count("id"),
+            "products_active": Count("id", filter=Q(is_active=True)),
+            "products_with_margin": Count("margin"),
+            "margin_sum": Sum("margin"),
+        }
+    if model is Sector:
+        return {"sectors_total": Count("id")}
+    if model is Proposal:
+        return {"proposals_total": Count("id")}
+    return {"users_total": Count("id")}
+
+
+def _annotated(queryset):
+    return queryset.with_profit() if queryset.model is Product else queryset
+
+
+def _grouped(queryset):
+    rows = (
+        _annotated(queryset)
+        .order_by()
+        .values("company_id")
+        .annotate(**_aggregates(queryset.model))
+    )
+    return {row.pop("company_id"): row for row in rows}
+
+
+def contribution_of(queryset) -> Counter:
+    """
+    Soma das contribuições das linhas de ``queryset`` (sem anotações) em uma
+    consulta, para as ações em massa, que não disparam sinais.
+    """
+    values = _annotated(queryset).order_by().aggregate(**_aggregates(queryset.model))
+    if values.get("margin_sum") is not None:
+        values["margin_sum"] = Decimal(values["margin_sum"]).quantize(CENTS)
+    return Counter({name: value for name, value in values.items() if value})
+
+
+def compute(company_ids=None) -> dict:
+    """Contadores calculados das tabelas: ``{company_id: {campo: valor}}``."""
+    def scoped(model):
+        queryset = model.objects.all()
+        if company_ids is not None:
+            queryset = queryset.filter(company_id__in=company_ids)
+        return queryset
+
+    sources = [
+        _grouped(scoped(model)) for model in (Contact, Product, Sector, UserCompany, Proposal)
+    ]
+
+    if company_ids is None:
+        company_ids = Company.objects.values_list("pk", flat=True)
+    result = {}
+    for company_id in company_ids:
+        values = {}
+        for source in sources:
+            values.update(source.get(company_id, {}))
+        if values.get("margin_sum") is not None:
+            values["margin_sum"] = Decimal(values["margin_sum"]).quantize(CENTS)
+        else:
+            values.pop("margin_sum", None)
+        result[company_id] = values
+    return result
+
+
+def rebuild(company_ids=None) -> int:
+    """Recalcula e grava os contadores (todas as empresas se ``None``)."""
+    fields = [
+        field.name
+        for field in CompanyStats._meta.concrete_fields
+        if field.name not in ("id", "company")
+    ]
+    rows = [
+        CompanyStats(company_id=company_id, **values)
+        for company_id, values in compute(company_ids).items()
+    ]
+    CompanyStats.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["company"],
+        update_fields=fields,
+    )
+    return len(rows)
+
+
+def get_stats(company) -> CompanyStats:
+    stats = CompanyStats.objects.filter(company=company).first()
+    if stats is None:
+        rebuild([company.pk])
+        stats = CompanyStats.objects.get(company=company)
+    return stats
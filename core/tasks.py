@@ -0,0 +1,48 @@
+"""
+Trabalho em segundo plano, fora do caminho da requisição.
+
+As tarefas vão para um pool de threads do próprio processo e só são
+enfileiradas depois do commit da transação atual, para não lerem dados que
+ainda não foram gravados (ou que sofreram rollback). Cada tarefa fecha a
+conexão com o banco ao terminar.
+
+Com ``TASKS_EAGER = True`` (testes) a tarefa roda na hora, ainda no
+``on_commit``.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+
+logger = logging.getLogger("sispeed.tasks")
+
+_executor = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.TASKS_WORKERS,
+            thread_name_prefix="sispeed-task",
+        )
+    return _executor
+
+
+def _run(func, args, kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception("Falha na tarefa %s", func.__qualname__)
+    finally:
+        connection.close()
+
+
+def enqueue(func, *args, **kwargs):
+    """Executa ``func(*args, **kwargs)`` em segundo plano após o commit."""
+    if settings.TASKS_EAGER:
+        transaction.on_commit(lambda: func(*args, **kwargs))
+        return
+    transaction.on_commit(lambda: _get_executor().submit(_run, func, args, kwargs))
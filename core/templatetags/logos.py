@@ -0,0 +1,33 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from core.images import pick_variant
+
+register = template.Library()
+
+
+@register.inclusion_tag("includes/company_logo.html")
+def company_logo(company, width, height=None, css_class="", alt=""):
+    """
+    ``<picture>`` com a menor variante do logo que cobre ``width`` x
+    ``height`` (WebP com PNG de reserva). Enquanto as variantes do logo
+    atual não ficam prontas (ou se a tarefa falhou), usa o arquivo original.
+    """
+    context = {"css_class": css_class, "alt": alt or getattr(company, "name", "")}
+    if not company or not company.logo:
+        return context
+    variants = company.logo_variants or {}
+    if variants.get("source") != company.logo.name:
+        variants = None  # Ainda são as do logo anterior.
+    png = pick_variant(variants, width, height, "png")
+    if png is None:
+        context["src"] = company.logo.url
+        return context
+    webp = pick_variant(variants, width, height, "webp")
+    context.update(
+        src=default_storage.url(png["path"]),
+        webp=default_storage.url(webp["path"]) if webp else None,
+        width=png["width"],
+        height=png["height"],
+    )
+    return context
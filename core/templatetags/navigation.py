@@ -0,0 +1,11 @@
+from django import template
+
+register = template.Library()
+
+
+@register.filter
+def nav_section(url_name):
+    """Seção da barra lateral a partir do nome da rota ("contacts_edit" -> "contacts")."""
+    if not url_name:
+        return ""
+    return url_name.split("_", 1)[0]
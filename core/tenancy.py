@@ -0,0 +1,146 @@
+"""
+Contexto do tenant (empresa) do usuário logado.
+
+Usuário, vínculo com a empresa, empresa, permissões e preferências são
+carregados em uma única consulta e guardados no cache compartilhado, por
+usuário. Os sinais em ``core.signals`` apagam a entrada quando qualquer uma
+dessas linhas muda.
+"""
+import hashlib
+from dataclasses import dataclass, field, replace
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from .models import Company, UserCompany
+
+PERMISSION_FIELDS = (
+    "can_manage_contacts",
+    "can_manage_users",
+    "can_manage_products",
+    "can_manage_sectors",
+    "can_manage_proposals",
+)
+
+CACHE_KEY = "tenant:v3:{user_id}"
+
+
+@dataclass(frozen=True)
+class Tenant:
+    user_id: int
+    company: Company | None = None
+    company_link_id: int | None = None
+    is_owner: bool = False
+    permissions: dict = field(default_factory=dict)
+    theme: str = "dark"
+    display_name: str = ""
+    # Resumo de tudo o que aparece na barra lateral; muda sempre que o
+    # tenant é recarregado com outro conteúdo (chave do cache do fragmento).
+    fingerprint: str = ""
+
+    def has_permission(self, field_name: str) -> bool:
+        return self.is_owner or self.permissions.get(field_name, False)
+
+
+def _cache_key(user_id) -> str:
+    return CACHE_KEY.format(user_id=user_id)
+
+
+def _users():
+    return get_user_model().objects.select_related(
+        "company_link__company",
+        "company_link__permissions",
+        "preferences",
+    )
+
+
+def load_tenant(user_id) -> Tenant:
+    return _build_tenant(_users().get(pk=user_id))
+
+
+async def aload_tenant(user_id) -> Tenant:
+    return _build_tenant(await _users().aget(pk=user_id))
+
+
+def _build_tenant(user) -> Tenant:
+    theme = "dark"
+    if hasattr(user, "preferences"):
+        theme = user.preferences.theme
+    display_name = user.first_name or user.username
+
+    try:
+        link = user.company_link
+    except UserCompany.DoesNotExist:
+        return _with_fingerprint(
+            Tenant(user_id=user.pk, theme=theme, display_name=display_name)
+        )
+
+    permissions = {}
+    if hasattr(link, "permissions"):
+        permissions = {
+            name: getattr(link.permissions, name) for name in PERMISSION_FIELDS
+        }
+
+    return _with_fingerprint(
+        Tenant(
+            user_id=user.pk,
+            company=link.company,
+            company_link_id=link.pk,
+            is_owner=link.is_owner,
+            permissions=permissions,
+            theme=theme,
+            display_name=display_name,
+        )
+    )
+
+
+def _with_fingerprint(tenant: Tenant) -> Tenant:
+    company = tenant.company
+    parts = [
+        tenant.user_id,
+        tenant.display_name,
+        tenant.is_owner,
+        sorted(tenant.permissions.items()),
+        tenant.theme,
+    ]
+    if company is not None:
+        parts += [company.pk, company.name, company.logo.name, company.logo_variants]
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return replace(tenant, fingerprint=digest)
+
+
+def get_tenant(user) -> Tenant | None:
+    if not user.is_authenticated:
+        return None
+    key = _cache_key(user.pk)
+    tenant = cache.get(key)
+    if tenant is None:
+        tenant = load_tenant(user.pk)
+        cache.set(key, tenant, settings.TENANT_CACHE_TIMEOUT)
+    return tenant
+
+
+async def aget_tenant(user) -> Tenant | None:
+    """``get_tenant`` para views assíncronas."""
+    if not user.is_authenticated:
+        return None
+    key = _cache_key(user.pk)
+    tenant = await cache.aget(key)
+    if tenant is None:
+        tenant = await aload_tenant(user.pk)
+        await cache.aset(key, tenant, settings.TENANT_CACHE_TIMEOUT)
+    return tenant
+
+
+def invalidate_users(user_ids):
+    cache.delete_many([_cache_key(user_id) for user_id in user_ids])
+
+
+def invalidate_company(company_id):
+    user_ids = (
+        UserCompany.objects.filter(company_id=company_id)
+        .order_by()
+        .values_list("user_id", flat=True)
+    )
+    invalidate_users(list(user_ids))
@@ -1,3 +1,2433 @@
-from django.test import TestCase
+import base64
+import csv
+import gzip
+import io
+import json
+import random
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
+from functools import partial
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.cache.utils import make_template_fragment_key
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection
+from django.http import QueryDict
+from django.test import Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from PIL import Image
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import urlencode
+
+from . import (
+    ceps,
+    database,
+    dedup,
+    documents,
+    fakedata,
+    images,
+    instrumentation,
+    listcache,
+    proposals,
+    repricing,
+    sessions,
+    stats,
+    tenancy,
+    throttling,
+)
+from .staticfiles import StaticFilesApp
+from .forms import CompanySettingsForm, ContactForm
+from .importers import import_contacts
+from .models import (
+    CepAddress,
+    Company,
+    CompanyStats,
+    Contact,
+    DuplicateCandidate,
+    Product,
+    Proposal,
+    ProposalItem,
+    Sector,
+    UserCompany,
+    UserPermission,
+    UserPreference,
+)
+from .pagination import KeysetPaginator, encode_cursor
+from .search import index_contacts, search_contacts
+
+User = get_user_model()
+
+# Teto de tempo (s) por requisição, folgado para máquinas de CI lentas.
+MAX_SECONDS = 1.0
+
+TEST_SETTINGS = {
+    "CACHES": {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+        "template_fragments": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-fragments",
+        },
+        "sessions": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "test-sessions",
+        },
+    },
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "TIMING_ENABLED": False,
+    "TASKS_EAGER": True,
+    "LOGIN_THROTTLE_DB": ":memory:",
+}
+
+# Número exato de consultas por requisição. Não pode depender da quantidade
+# de linhas: se um destes números mudar, algo passou a consultar por linha
+# (N+1) ou a view ganhou consultas novas de propósito (atualize aqui).
+# POSTs com ``write_transaction`` contam o SAVEPOINT/RELEASE da transação.
+# A sessão vem do cache (core.sessions): nenhuma rota lê ``django_session``.
+# Listagens e exportações contam a impressão digital de core.conditional;
+# exclusões, o toque em ``Company.updated_at``.
+QUERY_BUDGETS = {
+    "login_get": 0,
+    "login_post": 3,
+    "signup_get": 0,
+    "signup_post": 12,
+    "dashboard": 2,
+    "settings_get": 3,
+    "settings_post": 9,
+    "contacts_list": 3,
+    "contacts_search": 3,
+    "contacts_create_get": 1,
+    "contacts_create_post": 6,
+    "contacts_edit_get": 2,
+    "contacts_edit_post": 7,
+    "contacts_delete_get": 2,
+    "contacts_delete_post": 11,
+    "contacts_export": 3,
+    "contacts_import_get": 1,
+    "contacts_import_post": 6,
+    "products_list": 4,
+    "products_filtered": 4,
+    "products_export": 3,
+    "products_create_get": 1,
+    "products_create_post": 5,
+    "products_edit_get": 2,
+    "products_edit_post": 7,
+    "products_delete_get": 2,
+    "products_delete_post": 8,
+    "sectors_list": 3,
+    "sectors_export": 3,
+    "sectors_create_get": 1,
+    "sectors_create_post": 5,
+    "sectors_edit_get": 2,
+    "sectors_edit_post": 5,
+    "sectors_delete_get": 2,
+    "sectors_delete_post": 7,
+    "users_list": 3,
+    "users_create_get": 1,
+    "users_create_post": 11,
+    "users_edit_get": 3,
+    "users_edit_post": 10,
+    "users_delete_get": 2,
+    "users_delete_post": 17,
+    "contacts_bulk_confirm": 2,
+    "contacts_bulk_post": 14,
+    "products_bulk_post": 7,
+    "products_reprice_get": 1,
+    "products_reprice_preview": 3,
+    "products_reprice_post": 7,
+    "proposals_list": 3,
+    "proposals_sorted": 3,
+    "proposals_create_get": 2,
+    "proposals_create_post": 11,
+    "proposals_edit_get": 4,
+    "proposals_edit_post": 12,
+    "proposals_delete_get": 2,
+    "proposals_delete_post": 8,
+    "proposals_product_lookup": 2,
+}
+
+
+def create_tenant(rows: int, seed: int = 0):
+    """Empresa com dono e ``rows`` contatos, produtos, setores e usuários."""
+    rng = random.Random(seed)
+    company = Company.objects.create(
+        name=fakedata.company_name(rng),
+        email=f"empresa{seed}@example.com",
+    )
+    owner = User.objects.create_user(
+        username=f"dono{seed}",
+        password="senha123",
+        first_name="Dono",
+    )
+    link = UserCompany.objects.create(user=owner, company=company, is_owner=True)
+    UserPermission.objects.create(
+        user_company=link,
+        can_manage_contacts=True,
+        can_manage_users=True,
+        can_manage_products=True,
+        can_manage_sectors=True,
+        can_manage_proposals=True,
+    )
+    UserPreference.objects.create(user=owner, theme="dark")
+
+    contacts = Contact.objects.bulk_create(
+        [Contact(company=company, **fakedata.contact_fields(rng)) for _ in range(rows)]
+    )
+    index_contacts(contacts)
+    Product.objects.bulk_create(
+        [Product(company=company, **fakedata.product_fields(rng)) for _ in range(rows)]
+    )
+    Sector.objects.bulk_create(
+        [Sector(company=company, name=fakedata.sector_name(rng, i)) for i in range(rows)]
+    )
+    password = make_password("senha123")
+    users = User.objects.bulk_create(
+        [
+            User(username=f"t{seed}_u{i}", email=f"t{seed}_u{i}@example.com", password=password)
+            for i in range(rows)
+        ]
+    )
+    links = UserCompany.objects.bulk_create(
+        [UserCompany(user=user, company=company) for user in users]
+    )
+    UserPermission.objects.bulk_create(
+        [UserPermission(user_company=member) for member in links]
+    )
+    return company, owner
+
+
+def create_proposals(company, count: int, seed: int = 0):
+    """
+    ``count`` propostas de um item para o último contato e o último produto
+    da empresa (os primeiros continuam livres para os testes de exclusão).
+    """
+    rng = random.Random(seed)
+    contact = Contact.objects.filter(company=company).order_by("pk").last()
+    product = Product.objects.filter(company=company).order_by("pk").last()
+    batch = []
+    items = []
+    for number in range(1, count + 1):
+        item = ProposalItem(
+            product=product,
+            description=product.name,
+            unit=product.unit,
+            unit_price=product.price,
+            **fakedata.proposal_item_fields(rng, product.unit),
+        )
+        proposals.price_item(item)
+        proposal = Proposal(
+            company=company,
+            number=number,
+            contact=contact,
+            status=rng.choice(Proposal.STATUS_CHOICES)[0],
+            issued_on=timezone.localdate() - timedelta(days=rng.randint(0, 365)),
+            **proposals.totals([item.total], 0, None),
+        )
+        batch.append(proposal)
+        items.append(item)
+    Proposal.objects.bulk_create(batch)
+    for proposal, item in zip(batch, items):
+        item.proposal = proposal
+    ProposalItem.objects.bulk_create(items)
+
+
+class ViewBudgetMixin:
+    rows = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(cls.rows)
+        create_proposals(cls.company, cls.rows)
+        # Outra empresa com dados, para garantir que nada vaza entre tenants.
+        create_tenant(5, seed=99)
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.client.force_login(self.owner)
+        # Esquenta o contexto do tenant: o orçamento mede o estado estável.
+        self.client.get(reverse("dashboard"))
+
+    def assertBudget(self, key, method, url, data=None, anonymous=False, status=200):
+        client = self.client_class() if anonymous else self.client
+        budget = QUERY_BUDGETS[key]
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data or {})
+            if response.streaming:
+                # Exportações consultam o banco enquanto o corpo é gerado.
+                response.body = b"".join(response.streaming_content)
+            elapsed = time.perf_counter() - start
+
+        if len(ctx.captured_queries) != budget:
+            listing = "\n".join(
+                f"  {i}. {query['sql']}" for i, query in enumerate(ctx.captured_queries, 1)
+            )
+            self.fail(
+                f"{key}: {len(ctx.captured_queries)} consultas, orçamento {budget} "
+                f"({self.rows} linhas):\n{listing}"
+            )
+        self.assertLess(elapsed, MAX_SECONDS, f"{key} levou {elapsed:.3f}s")
+        self.assertEqual(response.status_code, status, key)
+        return response
+
+    def assertExport(self, key, model, data=None):
+        response = self.assertBudget(key, "get", reverse(key), data)
+        lines = response.body.decode("utf-8-sig").splitlines()
+        # Cabeçalho + uma linha por registro da empresa (e só dela).
+        self.assertEqual(len(lines) - 1, model.objects.filter(company=self.company).count())
+        return lines
+
+    def first(self, model):
+        return model.objects.filter(company=self.company).order_by("pk").first()
+
+    # -------- autenticação --------
+
+    def test_login(self):
+        self.assertBudget("login_get", "get", reverse("login"), anonymous=True)
+        self.assertBudget(
+            "login_post",
+            "post",
+            reverse("login"),
+            {"username": self.owner.username, "password": "senha123"},
+            anonymous=True,
+            status=302,
+        )
+
+    def test_company_signup(self):
+        self.assertBudget("signup_get", "get", reverse("company_signup"), anonymous=True)
+        self.assertBudget(
+            "signup_post",
+            "post",
+            reverse("company_signup"),
+            {
+                "company_name": "Nova Empresa",
+                "company_email": "nova@example.com",
+                "admin_name": "Fulano",
+                "admin_email": "fulano@example.com",
+                "username": "fulano",
+                "password": "senha123",
+                "password_confirm": "senha123",
+            },
+            anonymous=True,
+            status=302,
+        )
+
+    def test_dashboard(self):
+        self.assertBudget("dashboard", "get", reverse("dashboard"))
+
+    def test_settings(self):
+        self.assertBudget("settings_get", "get", reverse("settings"))
+        self.assertBudget(
+            "settings_post",
+            "post",
+            reverse("settings"),
+            {"name": "Empresa Renomeada", "email": self.company.email, "theme": "light"},
+            status=302,
+        )
+
+    # -------- contatos --------
+
+    def test_contacts(self):
+        self.assertBudget("contacts_list", "get", reverse("contacts_list"))
+        self.assertBudget("contacts_search", "get", reverse("contacts_list"), {"q": "silva"})
+        self.assertExport("contacts_export", Contact)
+        self.assertBudget("contacts_create_get", "get", reverse("contacts_create"))
+        self.assertBudget(
+            "contacts_create_post",
+            "post",
+            reverse("contacts_create"),
+            {"display_name": "Contato Novo", "is_active": "on", "is_client": "on"},
+            status=302,
+        )
+        contact = self.first(Contact)
+        self.assertBudget("contacts_edit_get", "get", reverse("contacts_edit", args=[contact.pk]))
+        self.assertBudget(
+            "contacts_edit_post",
+            "post",
+            reverse("contacts_edit", args=[contact.pk]),
+            {"display_name": "Contato Editado", "is_active": "on"},
+            status=302,
+        )
+        self.assertBudget(
+            "contacts_delete_get", "get", reverse("contacts_delete", args=[contact.pk])
+        )
+        self.assertBudget(
+            "contacts_delete_post",
+            "post",
+            reverse("contacts_delete", args=[contact.pk]),
+            status=302,
+        )
+
+    def test_contacts_import(self):
+        self.assertBudget("contacts_import_get", "get", reverse("contacts_import"))
+        upload = SimpleUploadedFile(
+            "contatos.csv",
+            "display_name;email;Cidade\nMaria;maria@example.com;Curitiba\n;sem@nome.com;\n"
+            "João;joao@example.com;Londrina\n".encode(),
+        )
+        before = Contact.objects.filter(company=self.company).count()
+        with tempfile.TemporaryDirectory() as tmp, self.settings(IMPORT_REPORTS_DIR=tmp):
+            response = self.assertBudget(
+                "contacts_import_post",
+                "post",
+                reverse("contacts_import"),
+                {"file": upload, "encoding": "utf-8-sig"},
+            )
+            self.assertEqual(response.context["result"].created, 2)
+            self.assertEqual(response.context["result"].rejected, 1)
+            report = self.client.get(
+                reverse("contacts_import_report", args=[response.context["report_token"]])
+            )
+            self.assertIn(b"linha", b"".join(report.streaming_content))
+        self.assertEqual(Contact.objects.filter(company=self.company).count(), before + 2)
+
+    # -------- produtos --------
+
+    def test_products(self):
+        self.assertBudget("products_list", "get", reverse("products_list"))
+        self.assertExport("products_export", Product)
+        self.assertBudget("products_create_get", "get", reverse("products_create"))
+        self.assertBudget(
+            "products_create_post",
+            "post",
+            reverse("products_create"),
+            {"name": "Produto Novo", "unit": "UN", "price": "10.00", "is_active": "on"},
+            status=302,
+        )
+        product = self.first(Product)
+        self.assertBudget("products_edit_get", "get", reverse("products_edit", args=[product.pk]))
+        self.assertBudget(
+            "products_edit_post",
+            "post",
+            reverse("products_edit", args=[product.pk]),
+            {"name": "Produto Editado", "unit": "M2", "price": "20.00", "cost_price": "5.00"},
+            status=302,
+        )
+        self.assertBudget(
+            "products_delete_get", "get", reverse("products_delete", args=[product.pk])
+        )
+        self.assertBudget(
+            "products_delete_post",
+            "post",
+            reverse("products_delete", args=[product.pk]),
+            status=302,
+        )
+
+    def test_products_sort_and_filter(self):
+        filters = {"sort": "-margin", "margin_min": "10", "unit": "M2", "status": "ativo"}
+        response = self.assertBudget("products_filtered", "get", reverse("products_list"), filters)
+        page = response.context["page"]
+        margins = [product.margin for product in page]
+        self.assertTrue(margins)
+        self.assertEqual(margins, sorted(margins, reverse=True))
+        self.assertTrue(all(margin >= 10 for margin in margins))
+
+        expected = [
+            product
+            for product in Product.objects.filter(company=self.company, unit="M2", is_active=True)
+            if product.profit_percent is not None and round(product.profit_percent, 2) >= 10
+        ]
+        totals = response.context["totals"]
+        self.assertEqual(totals["count"], len(expected))
+        self.assertAlmostEqual(
+            float(totals["profit_total"]),
+            float(sum(product.profit_value for product in expected)),
+            places=2,
+        )
+
+        if page.has_next:
+            response = self.client.get(f"{reverse('products_list')}?{page.next_query}")
+            following = [product.margin for product in response.context["page"]]
+            self.assertLessEqual(following[0], margins[-1])
+            self.assertTrue(all(margin >= 10 for margin in following))
+
+    def test_bulk_actions(self):
+        # Registros marcados: o número de consultas é o de um lote.
+        contacts = list(
+            Contact.objects.filter(company=self.company).order_by("pk").values_list("pk", flat=True)[:3]
+        )
+        data = {"action": "delete", "ids": contacts}
+        response = self.assertBudget("contacts_bulk_confirm", "post", reverse("contacts_bulk"), data)
+        self.assertEqual(response.context["count"], 3)
+        self.assertBudget(
+            "contacts_bulk_post",
+            "post",
+            reverse("contacts_bulk"),
+            {**data, "confirm": "1"},
+            status=302,
+        )
+        products = list(
+            Product.objects.filter(company=self.company).order_by("pk").values_list("pk", flat=True)[:3]
+        )
+        self.assertBudget(
+            "products_bulk_post",
+            "post",
+            reverse("products_bulk"),
+            {"action": "deactivate", "ids": products, "confirm": "1"},
+            status=302,
+        )
+
+    def test_products_reprice(self):
+        url = reverse("products_reprice")
+        self.assertBudget("products_reprice_get", "get", url)
+        params = {"status": "ativo", "target": "both", "mode": "percent", "value": "7.5", "step": "0.10"}
+        response = self.assertBudget("products_reprice_preview", "get", url, params)
+        count = response.context["preview"]["totals"]["count"]
+        self.assertEqual(count, Product.objects.filter(company=self.company, is_active=True).count())
+        self.assertBudget("products_reprice_post", "post", url, params, status=302)
+
+    # -------- propostas --------
+
+    def test_proposals(self):
+        url = reverse("proposals_list")
+        response = self.assertBudget("proposals_list", "get", url)
+        self.assertEqual(len(response.context["page"]), min(self.rows, 50))
+        response = self.assertBudget("proposals_sorted", "get", url, {"sort": "-total"})
+        totals = [proposal.total for proposal in response.context["page"]]
+        self.assertEqual(totals, sorted(totals, reverse=True))
+
+        contact = self.first(Contact)
+        product = self.first(Product)
+        self.assertBudget("proposals_create_get", "get", reverse("proposals_create"))
+        self.assertBudget(
+            "proposals_product_lookup",
+            "get",
+            reverse("proposals_product_lookup"),
+            {"q": product.name.split()[0]},
+        )
+        item = {
+            "items-0-product_id": product.pk,
+            "items-0-quantity": "2",
+            "items-0-width": "1.5",
+            "items-0-height": "0.8",
+            "items-0-discount_percent": "0",
+        }
+        data = {
+            "contact": contact.pk,
+            "status": "draft",
+            "issued_on": "2026-01-10",
+            "discount_percent": "0",
+            "items-TOTAL_FORMS": "1",
+            "items-INITIAL_FORMS": "0",
+            **item,
+        }
+        self.assertBudget(
+            "proposals_create_post", "post", reverse("proposals_create"), data, status=302
+        )
+        proposal = Proposal.objects.filter(company=self.company).order_by("-number").first()
+        self.assertEqual(proposal.number, self.rows + 1)
+        line = proposal.items.get()
+
+        edit_url = reverse("proposals_edit", args=[proposal.pk])
+        self.assertBudget("proposals_edit_get", "get", edit_url)
+        data.update(
+            {
+                "items-INITIAL_FORMS": "1",
+                "items-0-id": line.pk,
+                "items-0-quantity": "3",
+            }
+        )
+        self.assertBudget("proposals_edit_post", "post", edit_url, data, status=302)
+        delete_url = reverse("proposals_delete", args=[proposal.pk])
+        self.assertBudget("proposals_delete_get", "get", delete_url)
+        self.assertBudget("proposals_delete_post", "post", delete_url, status=302)
+
+    # -------- setores --------
+
+    def test_sectors(self):
+        self.assertBudget("sectors_list", "get", reverse("sectors_list"))
+        self.assertExport("sectors_export", Sector)
+        self.assertBudget("sectors_create_get", "get", reverse("sectors_create"))
+        self.assertBudget(
+            "sectors_create_post",
+            "post",
+            reverse("sectors_create"),
+            {"name": "Setor Novo", "is_active": "on"},
+            status=302,
+        )
+        sector = self.first(Sector)
+        self.assertBudget("sectors_edit_get", "get", reverse("sectors_edit", args=[sector.pk]))
+        self.assertBudget(
+            "sectors_edit_post",
+            "post",
+            reverse("sectors_edit", args=[sector.pk]),
+            {"name": "Setor Editado"},
+            status=302,
+        )
+        self.assertBudget(
+            "sectors_delete_get", "get", reverse("sectors_delete", args=[sector.pk])
+        )
+        self.assertBudget(
+            "sectors_delete_post",
+            "post",
+            reverse("sectors_delete", args=[sector.pk]),
+            status=302,
+        )
+
+    # -------- usuários --------
+
+    def test_users(self):
+        self.assertBudget("users_list", "get", reverse("users_list"))
+        self.assertBudget("users_create_get", "get", reverse("users_create"))
+        self.assertBudget(
+            "users_create_post",
+            "post",
+            reverse("users_create"),
+            {
+                "full_name": "Usuário Novo",
+                "email": "novo@example.com",
+                "username": "usuario_novo",
+                "is_active": "on",
+                "password": "senha123",
+                "password_confirm": "senha123",
+            },
+            status=302,
+        )
+        member = (
+            UserCompany.objects.filter(company=self.company, is_owner=False)
+            .order_by("pk")
+            .first()
+        )
+        self.assertBudget("users_edit_get", "get", reverse("users_edit", args=[member.pk]))
+        self.assertBudget(
+            "users_edit_post",
+            "post",
+            reverse("users_edit", args=[member.pk]),
+            {"full_name": "Editado", "email": "editado@example.com", "is_active": "on"},
+            status=302,
+        )
+        self.assertBudget("users_delete_get", "get", reverse("users_delete", args=[member.pk]))
+        self.assertBudget(
+            "users_delete_post",
+            "post",
+            reverse("users_delete", args=[member.pk]),
+            status=302,
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class SmallTenantViewBudgetTests(ViewBudgetMixin, TestCase):
+    rows = 10
+
+
+@override_settings(**TEST_SETTINGS)
+class LargeTenantViewBudgetTests(ViewBudgetMixin, TestCase):
+    rows = 10_000
+
+
+@override_settings(**TEST_SETTINGS)
+class ContactSearchTests(TestCase):
+    """Busca da listagem de contatos pelo índice FTS5 (``core.search``)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(0)
+        cls.other_company, _other_owner = create_tenant(0, seed=99)
+        create = partial(Contact.objects.create, company=cls.company)
+        cls.jose = create(display_name="José Conceição", city="São Paulo")
+        cls.shop = create(
+            display_name="Vidraçaria Horizonte",
+            document="11.222.333/0001-81",
+            phone="(11) 98765-4321",
+        )
+        cls.maria = create(display_name="Maria José Andrade", email="maria@example.com")
+        cls.foreign = Contact.objects.create(company=cls.other_company, display_name="José Conceição")
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.client.force_login(self.owner)
+
+    def found(self, text):
+        listcache.tables.clear()
+        response = self.client.get(reverse("contacts_list"), {"q": text})
+        return {contact.pk for contact in response.context["page"]}
+
+    def test_ignores_accents_and_case(self):
+        for text in ("jose", "JOSE", "José", "conceicao", "sao paulo"):
+            with self.subTest(text):
+                self.assertIn(self.jose.pk, self.found(text))
+        self.assertEqual(self.found("vidracaria"), {self.shop.pk})
+
+    def test_terms_are_prefixes_and_all_must_match(self):
+        self.assertEqual(self.found("vidr"), {self.shop.pk})
+        self.assertEqual(self.found("jos"), {self.jose.pk, self.maria.pk})
+        self.assertEqual(self.found("jos andr"), {self.maria.pk})
+        self.assertEqual(self.found("mari@exam"), {self.maria.pk})
+        self.assertEqual(self.found("xyz"), set())
+
+    def test_document_and_phone_match_by_digits(self):
+        self.assertEqual(self.found("11222333000181"), {self.shop.pk})
+        self.assertEqual(self.found("11.222.333"), {self.shop.pk})
+        self.assertEqual(self.found("1198765"), {self.shop.pk})
+
+    def test_results_stay_inside_the_company(self):
+        self.assertNotIn(self.foreign.pk, self.found("jose conceicao"))
+        other = Client()
+        other.force_login(User.objects.get(username="dono99"))
+        response = other.get(reverse("contacts_list"), {"q": "jose"})
+        self.assertEqual([c.pk for c in response.context["page"]], [self.foreign.pk])
+
+    def test_index_follows_edits_and_deletes(self):
+        self.client.post(
+            reverse("contacts_edit", args=[self.jose.pk]),
+            {"display_name": "Joaquim Conceição", "is_active": "on"},
+        )
+        self.assertEqual(self.found("jose"), {self.maria.pk})
+        self.assertIn(self.jose.pk, self.found("joaquim"))
+        self.client.post(reverse("contacts_delete", args=[self.maria.pk]))
+        self.assertEqual(self.found("jose"), set())
+
+
+@override_settings(**TEST_SETTINGS)
+class KeysetCursorTests(TestCase):
+    """Cursores adulterados na querystring voltam para a primeira página."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(30)
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.client.force_login(self.owner)
+
+    def raw_cursor(self, text):
+        return base64.urlsafe_b64encode(text.encode()).decode().rstrip("=")
+
+    def pks(self, name, **params):
+        response = self.client.get(reverse(name), {"per_page": 25, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row.pk for row in response.context["page"]]
+
+    def test_bad_types_serve_the_first_page(self):
+        cases = [
+            ("products_list", {"sort": "price"}, '["x","y"]'),
+            ("products_list", {"sort": "name"}, '["a","zz"]'),
+            ("products_list", {"sort": "-margin"}, '[{"a":1},1]'),
+            ("products_list", {"sort": "is_active"}, '["talvez",1]'),
+            ("products_list", {"sort": "price"}, '["NaN",1]'),
+            ("products_list", {"sort": "price"}, '["Infinity",1]'),
+            ("contacts_list", {}, '["a",1e400]'),
+            ("contacts_list", {}, '["a",[1]]'),
+            ("contacts_list", {}, '["a",99999999999999999999999]'),
+        ]
+        for name, params, raw in cases:
+            with self.subTest(name=name, cursor=raw):
+                first = self.pks(name, **params)
+                listcache.tables.clear()
+                self.assertEqual(self.pks(name, after=self.raw_cursor(raw), **params), first)
+                listcache.tables.clear()
+                self.assertEqual(self.pks(name, before=self.raw_cursor(raw), **params), first)
+
+    def test_bad_encoding_serves_the_first_page(self):
+        first = self.pks("contacts_list")
+        for token in ("%%%", "bm9wZQ", self.raw_cursor("[1,2,3]"), "\xff"):
+            with self.subTest(token=token):
+                listcache.tables.clear()
+                self.assertEqual(self.pks("contacts_list", after=token), first)
+
+    def test_valid_cursor_still_pages(self):
+        response = self.client.get(reverse("products_list"), {"sort": "-margin", "per_page": 25})
+        following = self.client.get(f"{reverse('products_list')}?{response.context['page'].next_query}")
+        self.assertEqual(len(following.context["page"]), 5)
+
+    def walk(self, url, direction):
+        """Segue ``next_query``/``previous_query``; devolve as páginas e a última."""
+        pages = []
+        while True:
+            listcache.tables.clear()
+            page = self.client.get(url).context["page"]
+            pages.append([row.pk for row in page])
+            query = getattr(page, direction)
+            if not query:
+                return pages, page
+            url = f"{reverse('products_list')}?{query}"
+
+    def test_pages_cover_every_row_once_in_both_directions(self):
+        # Margem nula (sem custo ou venda zero) entra na ordenação também.
+        Product.objects.bulk_create(
+            [
+                Product(company=self.company, name="Sem custo", price=Decimal("10")),
+                Product(company=self.company, name="Venda zero", price=0, cost_price=1),
+            ]
+        )
+        products = set(Product.objects.filter(company=self.company).values_list("pk", flat=True))
+        for sort in ("name", "-price", "margin", "-margin", "-profit", "is_active"):
+            with self.subTest(sort=sort):
+                url = f"{reverse('products_list')}?{urlencode({'per_page': 25, 'sort': sort})}"
+                pages, last = self.walk(url, "next_query")
+                rows = [pk for page in pages for pk in page]
+                self.assertEqual(len(rows), len(products))
+                self.assertEqual(set(rows), products)
+                back, _ = self.walk(f"{reverse('products_list')}?{last.previous_query}", "previous_query")
+                self.assertEqual(back, pages[-2::-1])
+
+    def test_cursor_bounds_the_index_range(self):
+        # Sem o limite no primeiro campo, o SQLite percorre todas as linhas da
+        # empresa antes do cursor (custo proporcional à posição da página).
+        contact = Contact.objects.filter(company=self.company).order_by("display_name", "id")[10]
+        paginator = KeysetPaginator(Contact.objects.filter(company=self.company), ("display_name", "id"))
+        params = QueryDict(mutable=True)
+        params["after"] = encode_cursor([contact.display_name, contact.pk])
+        queryset, *_ = paginator._prepare(params)
+        self.assertIn("display_name>", queryset.explain().replace(" ", ""))
+
+
+@override_settings(**TEST_SETTINGS)
+class CompanyStatsTests(TestCase):
+    def assertStatsMatchTables(self, company):
+        current = CompanyStats.objects.get(company=company)
+        for name, value in stats.compute([company.pk])[company.pk].items():
+            self.assertEqual(getattr(current, name), value, name)
+
+    def test_incremental_stats_match_rebuild(self):
+        company, owner = create_tenant(20)
+        stats.get_stats(company)
+
+        contact = Contact.objects.create(
+            company=company, display_name="Novo", is_supplier=True, is_client=False
+        )
+        contact.is_active = False
+        contact.is_seller = True
+        contact.save()
+        Contact.objects.filter(company=company).exclude(pk=contact.pk).first().delete()
+
+        product = Product.objects.create(
+            company=company, name="Vidro", price=Decimal("7"), cost_price=Decimal("4")
+        )
+        product.price = Decimal("9.99")
+        product.save()
+        Product.objects.create(company=company, name="Sem custo", price=Decimal("5"))
+        Product.objects.filter(company=company).exclude(pk=product.pk).first().delete()
+        # Margens exatamente na metade do centavo (1,005% e 0,125%): os dois
+        # caminhos precisam arredondar para o mesmo lado.
+        for price, cost_price, margin in (
+            ("200.00", "197.99", "1.01"),
+            ("8.00", "7.99", "0.13"),
+            ("1000.00", "1200.05", "-20.01"),
+        ):
+            created = Product.objects.create(
+                company=company, name="Limite", price=Decimal(price), cost_price=Decimal(cost_price)
+            )
+            self.assertEqual(stats.product_margin(created.price, created.cost_price), Decimal(margin))
+            self.assertEqual(Product.objects.with_profit().get(pk=created.pk).margin, Decimal(margin))
+
+        Sector.objects.create(company=company, name="Novo setor")
+        Sector.objects.filter(company=company).first().delete()
+        UserCompany.objects.filter(company=company, is_owner=False).first().user.delete()
+
+        csv_file = io.BytesIO(
+            "display_name;is_client;is_partner;is_active\nA;sim;sim;sim\nB;não;sim;não\n".encode()
+        )
+        import_contacts(company, csv_file)
+
+        self.assertStatsMatchTables(company)
+
+    def test_dashboard_reads_stats(self):
+        company, owner = create_tenant(5)
+        self.client.force_login(owner)
+        response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.context["stats"].contacts_total, 5)
+        self.assertStatsMatchTables(company)
+
+
+@override_settings(**TEST_SETTINGS)
+class SidebarCacheTests(TestCase):
+    def setUp(self):
+        caches["template_fragments"].clear()
+        self.company, self.owner = create_tenant(1)
+        self.member = UserCompany.objects.get(company=self.company, is_owner=False)
+        self.client.force_login(self.member.user)
+
+    def sidebar(self, url_name="dashboard"):
+        html = self.client.get(reverse(url_name)).content.decode()
+        return html[html.index('<aside class="sidebar">'):html.index("</aside>")]
+
+    def test_fragment_is_cached_per_tenant_and_section(self):
+        self.assertIn('nav-link active', self.sidebar())
+        self.sidebar("contacts_list")
+        fingerprint = tenancy.get_tenant(self.member.user).fingerprint
+        for section in ("dashboard", "contacts"):
+            key = make_template_fragment_key("sidebar", [fingerprint, section])
+            self.assertIsNotNone(caches["template_fragments"].get(key), section)
+
+    def test_changes_show_up_without_clearing_the_cache(self):
+        self.assertEqual(self.sidebar().count("sem acesso"), 4)
+
+        permission = UserPermission.objects.get(user_company=self.member)
+        permission.can_manage_products = True
+        permission.save()
+        self.assertEqual(self.sidebar().count("sem acesso"), 3)
+
+        self.company.name = "Empresa Renomeada"
+        self.company.save()
+        self.assertIn("Empresa Renomeada", self.sidebar())
+
+        user = self.member.user
+        user.first_name = "Joana"
+        user.save()
+        self.assertIn("Joana", self.sidebar())
+
+
+@override_settings(**TEST_SETTINGS)
+class ListCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(10)
+        cls.other_company, cls.other_owner = create_tenant(5, seed=99)
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.client.force_login(self.owner)
+        self.client.get(reverse("dashboard"))
+
+    def test_second_hit_only_loads_the_user(self):
+        for name in ("contacts_list", "products_list", "sectors_list", "users_list"):
+            with self.subTest(name):
+                first = self.client.get(reverse(name))
+                with CaptureQueriesContext(connection) as ctx:
+                    second = self.client.get(reverse(name))
+                # auth_user e a impressão digital do core.conditional.
+                self.assertEqual(len(ctx.captured_queries), 2)
+                # A página muda só no token CSRF do formulário; a tabela é a mesma.
+                self.assertEqual(first.context["table"], second.context["table"])
+        stats = listcache.tables.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (4, 4))
+
+    @override_settings(TIMING_ENABLED=True)
+    def test_server_timing_reports_hits(self):
+        client = Client()  # o middleware lê TIMING_ENABLED ao ser criado
+        client.force_login(self.owner)
+        url = reverse("sectors_list")
+        self.assertIn('lista;desc="miss"', client.get(url)["Server-Timing"])
+        self.assertIn('lista;desc="hit"', client.get(url)["Server-Timing"])
+
+    def test_changes_invalidate_only_the_company(self):
+        url = reverse("contacts_list")
+        self.client.get(url)
+        other = Client()
+        other.force_login(self.other_owner)
+        other.get(url)
+
+        contact = Contact.objects.filter(company=self.company).order_by("display_name").first()
+        contact.display_name = "Aaron Renomeado"
+        contact.save()
+        self.assertContains(self.client.get(url), "Aaron Renomeado")
+        other.get(url)
+        self.assertEqual(listcache.tables.stats()["hits"], 1)
+
+        import_contacts(self.company, io.BytesIO(b"display_name\nAaa Importado\n"))
+        self.assertContains(self.client.get(url), "Aaa Importado")
+
+        url = reverse("users_list")
+        self.client.get(url)
+        self.owner.first_name = "Dona Renomeada"
+        self.owner.save()
+        self.assertContains(self.client.get(url), "Dona Renomeada")
+
+    def test_lru_evicts_the_least_recently_used(self):
+        lru = listcache.LRUCache(2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        lru.get("a")
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual((lru.get("a"), lru.get("c")), (1, 3))
+        self.assertEqual(
+            lru.stats(),
+            {
+                "entries": 2,
+                "max_entries": 2,
+                "hits": 3,
+                "misses": 1,
+                "evictions": 1,
+                "hit_ratio": 0.75,
+            },
+        )
+
+
+@override_settings(**TEST_SETTINGS)
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(10)
+
+    def setUp(self):
+        # Como no navegador: o cookie CSRF vem da tela de login e faz parte
+        # da ETag das listagens.
+        self.client.get(reverse("login"))
+        self.client.force_login(self.owner)
+        self.client.get(reverse("dashboard"))
+
+    def revalidate(self, url, response, **params):
+        return self.client.get(url, params, HTTP_IF_NONE_MATCH=response["ETag"])
+
+    def test_unchanged_pages_answer_304_without_the_main_query(self):
+        names = (
+            "contacts_list",
+            "contacts_export",
+            "products_list",
+            "products_export",
+            "sectors_list",
+            "sectors_export",
+            "users_list",
+        )
+        for name in names:
+            with self.subTest(name):
+                url = reverse(name)
+                response = self.client.get(url, {"per_page": 25})
+                self.assertEqual(response["Cache-Control"], "private, no-cache")
+                with CaptureQueriesContext(connection) as ctx:
+                    again = self.revalidate(url, response, per_page=25)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again["ETag"], response["ETag"])
+                self.assertEqual(len(ctx.captured_queries), 2)  # auth_user e impressão digital
+                # Outra querystring é outra página.
+                self.assertEqual(self.revalidate(url, response, per_page=50).status_code, 200)
+
+    def test_changes_produce_a_new_etag(self):
+        url = reverse("contacts_list")
+        response = self.client.get(url)
+        contact = Contact.objects.filter(company=self.company).first()
+        contact.phone = "(11) 90000-0000"
+        contact.save()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+
+        Contact.objects.filter(company=self.company).first().delete()
+        response = self.revalidate(url, response)
+        self.assertEqual(response.status_code, 200)
+
+        # Barra lateral: o nome do usuário faz parte da página.
+        self.owner.first_name = "Outro Nome"
+        self.owner.save()
+        self.assertEqual(self.revalidate(url, response).status_code, 200)
+
+    def test_if_modified_since_sees_deletes(self):
+        url = reverse("sectors_list")
+        long_ago = timezone.now() - timedelta(days=1)
+        Sector.objects.filter(company=self.company).update(updated_at=long_ago)
+        Company.objects.filter(pk=self.company.pk).update(updated_at=long_ago)
+        response = self.client.get(url)
+        since = {"HTTP_IF_MODIFIED_SINCE": response["Last-Modified"]}
+        self.assertEqual(self.client.get(url, **since).status_code, 304)
+
+        Sector.objects.filter(company=self.company).first().delete()
+        self.assertEqual(self.client.get(url, **since).status_code, 200)
+
+    def test_pages_with_messages_are_not_conditional(self):
+        url = reverse("sectors_list")
+        etag = self.client.get(url)["ETag"]
+        sector = Sector.objects.filter(company=self.company).first()
+        self.client.post(
+            reverse("sectors_edit", args=[sector.pk]), {"name": sector.name, "is_active": "on"}
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("ETag", response)
+        self.assertContains(response, "Setor atualizado")
+
+    @override_settings(ROOT_URLCONF="sispeed.urls_async")
+    async def test_async_lists(self):
+        await self.async_client.get(reverse("login"))
+        await self.async_client.aforce_login(self.owner)
+        url = reverse("products_list")
+        response = await self.async_client.get(url)
+        again = await self.async_client.get(url, headers={"if-none-match": response["ETag"]})
+        self.assertEqual(again.status_code, 304)
+
+
+@override_settings(**{**TEST_SETTINGS, "TIMING_ENABLED": True}, SLOW_QUERY_MS=10_000)
+class InstrumentationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(5)
+
+    def setUp(self):
+        self.client = Client()  # o middleware lê TIMING_ENABLED ao ser criado
+        self.client.force_login(self.owner)
+        self.client.get(reverse("dashboard"))  # carrega o tenant no cache
+
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        self.log_path = f"{log_dir.name}/slow.jsonl"
+        handler = instrumentation.JsonLinesFileHandler(self.log_path)
+        handler.setFormatter(instrumentation.JsonLinesFormatter())
+        self.addCleanup(handler.close)
+        self.enterContext(mock.patch.object(instrumentation.slow_logger, "handlers", [handler]))
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("dashboard"))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx.captured_queries)
+
+    def log_lines(self):
+        with open(self.log_path, encoding="utf-8") as fp:
+            return fp.read().splitlines()
+
+    def test_server_timing_lists_db_time_and_query_count(self):
+        response, queries = self.get_dashboard()
+        entries = dict(
+            entry.split(";", 1) for entry in response["Server-Timing"].split(", ")
+        )
+        self.assertRegex(entries["db"], rf'^dur=\d+\.\d;desc="{queries} queries"$')
+        self.assertRegex(entries["tpl"], r"^dur=\d+\.\d$")
+        self.assertRegex(entries["view"], r"^dur=\d+\.\d$")
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_request_writes_one_json_line(self):
+        _, queries = self.get_dashboard()
+        lines = self.log_lines()
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record["url_name"], "dashboard")
+        self.assertEqual((record["method"], record["path"]), ("GET", reverse("dashboard")))
+        self.assertEqual(record["status"], 200)
+        self.assertEqual(record["queries"], queries)
+        self.assertEqual(len(record["top_queries"]), queries)
+        self.assertEqual(record["slow_queries"], [])
+        for key in ("ts", "view_ms", "sql_ms", "template_ms"):
+            self.assertIn(key, record)
+
+    @override_settings(SLOW_REQUEST_MS=10_000)
+    def test_fast_request_is_not_logged(self):
+        self.get_dashboard()
+        self.assertEqual(self.log_lines(), [])
+
+
+@override_settings(**TEST_SETTINGS, SQLITE_RETRY_BACKOFF=0)
+class SQLiteProfileTests(TransactionTestCase):
+    def test_pragmas_are_applied(self):
+        with connection.cursor() as cursor:
+            expected_values = {"synchronous": 1, "busy_timeout": 5000, "temp_store": 2}
+            for name, expected in expected_values.items():
+                cursor.execute(f"PRAGMA {name}")
+                self.assertEqual(cursor.fetchone()[0], expected, name)
+
+    def test_only_migrate_switches_the_file_to_wal(self):
+        # Uma conexão comum (check, makemigrations) não pode reescrever o banco.
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        other = connection.copy()
+        other.settings_dict = {**connection.settings_dict, "NAME": f"{directory.name}/db.sqlite3"}
+        self.addCleanup(other.close)
+        with other.cursor() as cursor:
+            cursor.execute("PRAGMA journal_mode")
+            self.assertEqual(cursor.fetchone()[0], "delete")
+        self.assertEqual(database.set_journal_mode(other), "wal")
+
+    def test_locked_write_is_retried_in_a_new_transaction(self):
+        calls = []
+
+        def write():
+            calls.append(connection.in_atomic_block)
+            company = Company.objects.create(name="X")
+            Sector.objects.create(company=company, name=str(len(calls)))
+            if len(calls) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        self.assertEqual(database.run_with_retry(write), "ok")
+        self.assertEqual(calls, [True, True, True])
+        # Só a última tentativa foi gravada.
+        self.assertEqual(list(Sector.objects.values_list("name", flat=True)), ["3"])
+
+    def test_gives_up_after_the_configured_retries(self):
+        def write():
+            raise OperationalError("database is locked")
+
+        with self.settings(SQLITE_WRITE_RETRIES=2), self.assertLogs("sispeed.db") as logs:
+            with self.assertRaises(OperationalError):
+                database.run_with_retry(write)
+        self.assertEqual(len(logs.records), 2)
+
+
+@override_settings(**TEST_SETTINGS)
+class CsvExportTests(TestCase):
+    FORMULAS = {
+        "display_name": '=HYPERLINK("http://example.com","abrir")',
+        "notes": "@SUM(A1:A9)",
+        "phone": "+55 11 98765-4321",
+        "legal_name": "-2+3",
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(0)
+        cls.other_company, _ = create_tenant(0, seed=1)
+        Contact.objects.create(company=cls.company, **cls.FORMULAS)
+        Product.objects.create(
+            company=cls.company, name="=1+1", price=Decimal("5"), cost_price=Decimal("8")
+        )
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def rows(self, content):
+        return list(csv.reader(io.StringIO(content.decode("utf-8-sig")), delimiter=";"))
+
+    def assertEscaped(self, rows, *texts):
+        cells = [cell for row in rows[1:] for cell in row]
+        for text in texts:
+            self.assertIn("'" + text, cells)
+            self.assertNotIn(text, cells)
+
+    def test_formulas_are_written_as_text(self):
+        rows = self.rows(self.client.get(reverse("contacts_export")).getvalue())
+        self.assertEscaped(rows, *self.FORMULAS.values())
+        rows = self.rows(self.client.get(reverse("products_export")).getvalue())
+        self.assertEscaped(rows, "=1+1")
+        # Números negativos continuam números.
+        self.assertIn("-3,00", rows[1])
+
+    @override_settings(ROOT_URLCONF="sispeed.urls_async")
+    def test_async_exports_escape_too(self):
+        async def download(name):
+            response = await self.async_client.get(reverse(name))
+            return b"".join([chunk async for chunk in response.streaming_content])
+
+        async_to_sync(self.async_client.aforce_login)(self.owner)
+        self.assertEscaped(self.rows(async_to_sync(download)("contacts_export")), *self.FORMULAS.values())
+        self.assertEscaped(self.rows(async_to_sync(download)("products_export")), "=1+1")
+
+    def test_exported_file_imports_back_unchanged(self):
+        exported = self.client.get(reverse("contacts_export")).getvalue()
+        report = io.StringIO()
+        result = import_contacts(self.other_company, io.BytesIO(exported), errors_file=report)
+        self.assertEqual((result.created, result.rejected), (1, 0))
+        imported = Contact.objects.get(company=self.other_company)
+        for name, value in self.FORMULAS.items():
+            self.assertEqual(getattr(imported, name), value)
+
+    def test_error_report_escapes_rejected_values(self):
+        report = io.StringIO()
+        import_contacts(
+            self.other_company,
+            io.BytesIO("display_name;email\n=CMD();nao-e-email\n".encode()),
+            errors_file=report,
+        )
+        rows = list(csv.reader(io.StringIO(report.getvalue()), delimiter=";"))
+        self.assertEqual(rows[1][2:], ["'=CMD()", "nao-e-email"])
+
+
+@override_settings(**TEST_SETTINGS, ROOT_URLCONF="sispeed.urls_async")
+class AsyncViewsTests(TestCase):
+    """Views de ``core.async_views`` (deploy ASGI) pelo ``AsyncClient``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(30)
+        create_proposals(cls.company, 30)
+        create_tenant(5, seed=99)
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.async_client.force_login(self.owner)
+
+    def test_lists_match_the_sync_budgets(self):
+        # Teste síncrono: o ORM assíncrono roda nesta mesma thread e conexão,
+        # então o CaptureQueriesContext enxerga as consultas.
+        get = async_to_sync(self.async_client.get)
+        for name in ("contacts_list", "products_list", "sectors_list", "users_list", "proposals_list"):
+            with self.subTest(name):
+                get(reverse(name))  # carrega o tenant no cache
+                with CaptureQueriesContext(connection) as ctx:
+                    response = get(reverse(name), {"per_page": 25})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(ctx.captured_queries), QUERY_BUDGETS[name])
+                self.assertEqual(len(response.context["page"]), 25)
+
+        first = Contact.objects.filter(company=self.company).order_by("display_name", "id")[0]
+        listcache.tables.clear()
+        response = get(reverse("contacts_list"))
+        self.assertContains(response, first.display_name)
+        self.assertEqual(response.context["page"].items[0].pk, first.pk)
+
+    async def test_edit_and_settings_post(self):
+        contact = await Contact.objects.filter(company=self.company).afirst()
+        response = await self.async_client.post(
+            reverse("contacts_edit", args=[contact.pk]),
+            {"display_name": "Editado async", "is_active": "on"},
+        )
+        self.assertRedirects(response, reverse("contacts_list"), fetch_redirect_response=False)
+        await contact.arefresh_from_db()
+        self.assertEqual(contact.display_name, "Editado async")
+
+        other = await Contact.objects.exclude(company=self.company).afirst()
+        response = await self.async_client.get(reverse("contacts_edit", args=[other.pk]))
+        self.assertEqual(response.status_code, 404)
+
+        response = await self.async_client.post(
+            reverse("settings"),
+            {"name": self.company.name, "email": self.company.email, "theme": "light"},
+        )
+        self.assertEqual(response.status_code, 302)
+        preference = await UserPreference.objects.aget(user=self.owner)
+        self.assertEqual(preference.theme, "light")
+
+    async def test_exports_stream_asynchronously(self):
+        for name, model in (
+            ("contacts_export", Contact),
+            ("products_export", Product),
+            ("sectors_export", Sector),
+        ):
+            with self.subTest(name):
+                response = await self.async_client.get(reverse(name))
+                self.assertEqual(response.status_code, 200)
+                # Um iterador síncrono seria lido inteiro com sync_to_async(list).
+                self.assertTrue(response.is_async)
+                content = b"".join([chunk async for chunk in response.streaming_content])
+                lines = content.decode("utf-8-sig").splitlines()
+                count = await model.objects.filter(company=self.company).acount()
+                self.assertEqual(len(lines) - 1, count)
+
+    async def test_settings_reloads_the_company(self):
+        await self.async_client.get(reverse("dashboard"))  # carrega o tenant no cache
+        variants = {"variants": [{"name": "sidebar", "path": "logos/x.webp"}]}
+        await Company.objects.filter(pk=self.company.pk).aupdate(logo_variants=variants)
+        response = await self.async_client.post(
+            reverse("settings"),
+            {"name": "Empresa Async", "email": self.company.email, "theme": "dark"},
+        )
+        self.assertEqual(response.status_code, 302)
+        company = await Company.objects.aget(pk=self.company.pk)
+        self.assertEqual((company.name, company.logo_variants), ("Empresa Async", variants))
+
+        user = await sync_to_async(User.objects.create_user)(username="sem_empresa")
+        await self.async_client.aforce_login(user)
+        response = await self.async_client.get(reverse("settings"))
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+    async def test_login_and_permission_required(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse("products_list"))
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(response.url.startswith(reverse("login")))
+
+        member = await UserCompany.objects.select_related("user").filter(
+            company=self.company, is_owner=False
+        ).afirst()
+        await self.async_client.aforce_login(member.user)
+        response = await self.async_client.get(reverse("products_list"))
+        self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+
+@override_settings(
+    **TEST_SETTINGS,
+    LOGIN_THROTTLE_RATES={"ip": (6, 2), "username": (3, 60)},
+    LOGIN_LOCKOUT_BASE=60,
+    LOGIN_LOCKOUT_MAX=300,
+)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.enterContext(self.settings(LOGIN_THROTTLE_DB=f"{directory.name}/throttle.sqlite3"))
+        self.company, self.owner = create_tenant(1)
+
+    def login(self, password, username=None, ip="203.0.113.7"):
+        return self.client.post(
+            reverse("login"),
+            {"username": username or self.owner.username, "password": password},
+            REMOTE_ADDR=ip,
+        )
+
+    def test_rejects_before_hashing_once_the_bucket_is_empty(self):
+        for _ in range(3):
+            self.assertEqual(self.login("errada").status_code, 200)
+        with mock.patch("core.views.authenticate") as authenticate, self.assertLogs(
+            "sispeed.security"
+        ):
+            response = self.login("senha123")
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "60")
+        self.assertContains(response, "Muitas tentativas", status_code=429)
+
+        # Outro usuário do mesmo IP ainda entra, até acabar a ficha do IP.
+        member = UserCompany.objects.filter(company=self.company, is_owner=False).first()
+        member.user.set_password("outra123")
+        member.user.save()
+        self.assertEqual(self.login("outra123", member.user.username).status_code, 302)
+        self.client.logout()
+        with self.assertLogs("sispeed.security") as logs:
+            responses = [self.login("x", f"u{i}").status_code for i in range(3)]
+        self.assertIn("ip:203.0.113.7", logs.output[0])
+        self.assertEqual(responses, [200, 429, 429])
+
+        counters = throttling.ThrottleStore().counters()
+        self.assertEqual(counters["allowed"], 5)
+        self.assertEqual(counters["rejected_username"], 1)
+        self.assertEqual(counters["rejected_ip"], 2)
+
+    def test_lockout_doubles_and_success_resets_the_user(self):
+        store = throttling.ThrottleStore()
+        keys = [("username", "user:maria", 1, 60)]
+        self.enterContext(self.assertLogs("sispeed.security"))
+        self.assertTrue(store.attempt(keys, now=0).allowed)
+        self.assertEqual(store.attempt(keys, now=1).retry_after, 60)
+        self.assertEqual(store.attempt(keys, now=30).retry_after, 32)
+        # Depois do bloqueio: uma ficha recuperada, e o próximo bloqueio dobra.
+        self.assertTrue(store.attempt(keys, now=61).allowed)
+        self.assertEqual(store.attempt(keys, now=62).retry_after, 120)
+        self.assertTrue(store.attempt(keys, now=182).allowed)
+        self.assertEqual(store.attempt(keys, now=183).retry_after, 240)
+        self.assertTrue(store.attempt(keys, now=423).allowed)
+        self.assertEqual(store.attempt(keys, now=424).retry_after, 300)
+
+        self.assertEqual(self.login("errada").status_code, 200)
+        self.assertEqual(self.login("senha123").status_code, 302)
+        self.client.logout()
+        # O login certo zerou o balde do usuário: 3 tentativas de novo.
+        self.assertEqual([self.login("errada").status_code for _ in range(3)], [200] * 3)
+
+
+@override_settings(**TEST_SETTINGS)
+class CachedSessionTests(TestCase):
+    def setUp(self):
+        caches["sessions"].clear()
+        self.company, self.owner = create_tenant(1)
+
+    def login(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.force_login(self.owner)
+        return self.client.session.session_key
+
+    def test_requests_read_the_session_from_the_cache(self):
+        key = self.login()
+        self.assertTrue(Session.objects.filter(session_key=key).exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+        self.assertFalse([q for q in queries if "django_session" in q["sql"]])
+
+        # Fora do cache, a sessão volta do banco.
+        caches["sessions"].clear()
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 200)
+        self.assertIsNotNone(caches["sessions"].get(sessions.KEY_PREFIX + key))
+
+    def test_writes_reach_the_database_after_the_commit(self):
+        key = self.login()
+        session = sessions.SessionStore(key)
+        session["tema"] = "claro"
+        with self.captureOnCommitCallbacks() as callbacks:
+            session.save()
+        self.assertNotIn("tema", Session.objects.get(pk=key).get_decoded())
+        with self.captureOnCommitCallbacks(execute=True):
+            for callback in callbacks:
+                callback()
+        self.assertEqual(Session.objects.get(pk=key).get_decoded()["tema"], "claro")
+
+    def test_logout_is_not_undone_by_a_pending_write(self):
+        key = self.login()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.logout()
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        sessions.persist(key)
+        self.assertFalse(Session.objects.filter(session_key=key).exists())
+        self.assertEqual(self.client.get(reverse("dashboard")).status_code, 302)
+
+    def test_clear_expired_deletes_in_batches(self):
+        now = timezone.now()
+        Session.objects.bulk_create(
+            Session(
+                session_key=f"s{i:03}",
+                session_data="",
+                expire_date=now + timedelta(days=i - 5, hours=1),
+            )
+            for i in range(12)
+        )
+        with CaptureQueriesContext(connection) as queries:
+            deleted = sessions.SessionStore.clear_expired(batch_size=2)
+        self.assertEqual(deleted, 5)
+        self.assertEqual(len([q for q in queries if q["sql"].startswith("DELETE")]), 3)
+        self.assertEqual(Session.objects.count(), 7)
+
+    def test_file_cache_sweeps_instead_of_culling_on_write(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache = sessions.SessionFileCache(cache_dir.name, {"TIMEOUT": None})
+        with mock.patch.object(cache, "_list_cache_files") as list_files:
+            for i in range(3):
+                cache.set(f"vencida{i}", i, timeout=-1)
+            cache.set("valida", "ok")
+        list_files.assert_not_called()
+
+        # A limpeza periódica das sessões também varre o cache.
+        backend = {"BACKEND": "core.sessions.SessionFileCache", "LOCATION": cache_dir.name}
+        with self.settings(CACHES={"sessions": backend}):
+            sessions.SessionStore.clear_expired()
+        self.assertEqual(cache.clear_expired(), 0)
+        self.assertEqual(len(cache._list_cache_files()), 1)
+        self.assertEqual(cache.get("valida"), "ok")
+
+    def test_purge_runs_in_the_background_once_per_interval(self):
+        self.enterContext(mock.patch.object(sessions, "_next_purge", 0.0))
+        with mock.patch.object(sessions.SessionStore, "clear_expired") as clear_expired:
+            with self.captureOnCommitCallbacks(execute=True):
+                for _ in range(3):
+                    sessions.SessionStore().create()
+        clear_expired.assert_called_once_with()
+
+
+@override_settings(**TEST_SETTINGS)
+class DocumentTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(1)
+        cls.contact = Contact.objects.create(
+            company=cls.company, display_name="Com CPF", document="529.982.247-25"
+        )
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def test_check_digits(self):
+        rng = random.Random(3)
+        for _ in range(50):
+            self.assertTrue(documents.is_valid(fakedata.cpf(rng)))
+            self.assertTrue(documents.is_valid_cnpj(fakedata.cnpj(rng)))
+        self.assertTrue(documents.is_valid("52998224725"))
+        self.assertFalse(documents.is_valid("529.982.247-26"))
+        self.assertFalse(documents.is_valid("111.111.111-11"))
+        self.assertFalse(documents.is_valid_cnpj("529.982.247-25"))
+        self.assertEqual(documents.format_document("11222333000181"), "11.222.333/0001-81")
+
+    def test_normalized_column_follows_the_document(self):
+        self.assertEqual(self.contact.normalized_document, "52998224725")
+        self.contact.document = "11.222.333/0001-81"
+        self.contact.save(update_fields=["document"])
+        self.contact.refresh_from_db()
+        self.assertEqual(self.contact.normalized_document, "11222333000181")
+        self.company.cnpj = "11.222.333/0001-81"
+        self.company.save(update_fields=["cnpj"])
+        self.assertEqual(Company.objects.get(normalized_cnpj="11222333000181"), self.company)
+
+        plan = str(
+            Contact.objects.filter(company=self.company, normalized_document="52998224725")
+            .order_by()
+            .explain()
+        )
+        self.assertIn("contact_company_document_idx", plan)
+
+    def test_normalized_columns_fit_any_typed_document(self):
+        # Documentos antigos (sem validação) podem ter só dígitos até o limite do campo.
+        self.contact.document = "1" * 20
+        self.contact.save()
+        self.assertEqual(self.contact.normalized_document, "1" * 20)
+        self.contact.full_clean()
+        self.company.cnpj = "2" * 18
+        self.company.save()
+        self.assertEqual(self.company.normalized_cnpj, "2" * 18)
+        self.company.full_clean()
+
+    def test_forms_validate_and_format(self):
+        form = ContactForm({"display_name": "X", "document": "52998224725"})
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["document"], "529.982.247-25")
+        form = ContactForm({"display_name": "X", "document": "529.982.247-26"})
+        self.assertEqual(form.errors["document"], ["CPF/CNPJ inválido."])
+
+        other, _owner = create_tenant(0, seed=1)
+        other.cnpj = "11.222.333/0001-81"
+        other.save()
+        form = CompanySettingsForm(
+            {"name": "X", "email": "x@example.com", "cnpj": "11222333000181"},
+            instance=self.company,
+        )
+        self.assertEqual(form.errors["cnpj"], ["Já existe uma empresa com este CNPJ."])
+
+    def test_lookup_endpoint_flags_duplicates(self):
+        url = reverse("contacts_document_lookup", args=["52998224725"])
+        data = self.client.get(url).json()
+        self.assertEqual(data["document"], "529.982.247-25")
+        self.assertEqual(
+            data["duplicates"],
+            [
+                {
+                    "id": self.contact.pk,
+                    "display_name": "Com CPF",
+                    "url": reverse("contacts_edit", args=[self.contact.pk]),
+                }
+            ],
+        )
+        data = self.client.get(url, {"exclude": self.contact.pk}).json()
+        self.assertEqual(data["duplicates"], [])
+        bad = reverse("contacts_document_lookup", args=["52998224726"])
+        self.assertEqual(self.client.get(bad).status_code, 400)
+        self.assertContains(
+            self.client.get(reverse("contacts_edit", args=[self.contact.pk])),
+            f'data-exclude="{self.contact.pk}"',
+        )
+
+    def test_import_rejects_duplicates_with_one_query_per_batch(self):
+        report = io.StringIO()
+        csv_file = io.BytesIO(
+            (
+                "display_name;document\n"
+                "Repetido;529.982.247-25\n"
+                "Novo;11.222.333/0001-81\n"
+                "Novo de novo;11222333000181\n"
+                "Sem documento;\n"
+                "Outro novo;39053344705\n"
+            ).encode()
+        )
+        with CaptureQueriesContext(connection) as queries:
+            result = import_contacts(self.company, csv_file, errors_file=report, batch_size=2)
+        lookups = [q for q in queries if "normalized_document\" IN" in q["sql"]]
+        self.assertEqual(len(lookups), 3)
+        self.assertEqual((result.created, result.rejected), (3, 2))
+        self.assertEqual([line for line, _ in result.errors_preview], [2, 4])
+        self.assertIn("CPF/CNPJ já cadastrado.", report.getvalue())
+        self.assertEqual(
+            Contact.objects.get(normalized_document="39053344705").document, "390.533.447-05"
+        )
+
+
+    def test_import_reports_file_lines_after_multiline_fields(self):
+        csv_file = io.BytesIO(
+            (
+                "display_name;notes;email\n"
+                'Com observação;"primeira linha\nsegunda linha\nterceira";\n'
+                ";sem nome;\n"
+                "E-mail ruim;;nao-e-email\n"
+            ).encode()
+        )
+        result = import_contacts(self.company, csv_file)
+        self.assertEqual((result.created, result.rejected), (1, 2))
+        self.assertEqual([line for line, _ in result.errors_preview], [5, 6])
+        self.assertEqual(
+            Contact.objects.get(display_name="Com observação").notes,
+            "primeira linha\nsegunda linha\nterceira",
+        )
+
+@override_settings(**TEST_SETTINGS)
+class DedupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(0)
+        create = partial(Contact.objects.create, company=cls.company)
+        cls.original = create(
+            display_name="Gonçalves Comunicação Visual",
+            phone="(11) 98765-4321",
+            document="11.222.333/0001-81",
+            is_client=True,
+        )
+        cls.typo = create(
+            display_name="GONCALVES COMUNICACAO VISUAL LTDA",
+            phone="011 8765-4321",
+            email="contato@goncalves.example.com",
+            is_client=False,
+            is_supplier=True,
+            notes="Cadastro antigo",
+        )
+        cls.same_email = create(
+            display_name="Goncalves Comunic. Visual", email="contato@goncalves.example.com"
+        )
+        # Homônimo: mesmo nome, telefone e documento diferentes.
+        cls.namesake = create(
+            display_name="Gonçalves Comunicação Visual",
+            phone="(21) 91111-2222",
+            document="529.982.247-25",
+        )
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+
+    def pairs(self):
+        return set(
+            DuplicateCandidate.objects.filter(company=self.company).values_list(
+                "contact_a_id", "contact_b_id"
+            )
+        )
+
+    def test_keys(self):
+        self.assertEqual(dedup.phone_e164("011 8765-4321"), "+5511987654321")
+        self.assertEqual(dedup.phone_e164("+55 (11) 98765-4321"), "+5511987654321")
+        self.assertIsNone(dedup.phone_e164("8765-4321"))
+        self.assertEqual(dedup.phonetic("tiago"), dedup.phonetic("thiago"))
+        self.assertEqual(dedup.phonetic("souza"), dedup.phonetic("sousa"))
+        self.assertEqual(
+            dedup.name_key(dedup.simplify("Gonçalves Visual Ltda")),
+            dedup.name_key(dedup.simplify("GONCALVES VIZUAL")),
+        )
+
+    def test_blocks_above_the_limit_are_skipped(self):
+        entries = [dedup._Entry(i, ("maria silva",), None, None, None) for i in range(4)]
+        self.assertEqual(len(dedup.candidate_pairs(entries, max_block_size=4)), 6)
+        self.assertEqual(dedup.candidate_pairs(entries, max_block_size=3), set())
+
+    def test_find_duplicates_scores_blocked_pairs(self):
+        result = dedup.find_duplicates(self.company.pk)
+        self.assertEqual(result.contacts, 4)
+        # original x same_email só dividem o bloco do nome, parecido mas não o
+        # bastante; o homônimo tem telefone e documento diferentes.
+        self.assertEqual(
+            self.pairs(),
+            {(self.original.pk, self.typo.pk), (self.typo.pk, self.same_email.pk)},
+        )
+        pair = DuplicateCandidate.objects.get(
+            contact_a=self.original, contact_b=self.typo
+        )
+        self.assertEqual(pair.reasons, "telefone, nome")
+
+        # Par descartado não volta na próxima busca.
+        pair.dismissed = True
+        pair.save()
+        dedup.find_duplicates(self.company.pk)
+        self.assertEqual(len(self.pairs()), 2)
+        self.assertTrue(DuplicateCandidate.objects.get(pk=pair.pk).dismissed)
+
+    def test_search_runs_in_the_background_once(self):
+        url = reverse("contacts_duplicates")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(url, {"action": "search"})
+        status = dedup.status(self.company.pk)
+        self.assertFalse(status["running"])
+        self.assertEqual(status["result"].candidates, 2)
+        self.assertContains(self.client.get(url), "2 possível(is) duplicado(s)")
+
+        caches["default"].set(dedup._lock_key(self.company.pk), True)
+        self.assertFalse(dedup.schedule(self.company.pk))
+        caches["default"].delete(dedup._lock_key(self.company.pk))
+
+    def test_merge_chosen_pairs(self):
+        dedup.find_duplicates(self.company.pk)
+        stats.get_stats(self.company)
+        candidates = {
+            (c.contact_a_id, c.contact_b_id): c.pk
+            for c in DuplicateCandidate.objects.filter(company=self.company)
+        }
+        first = candidates[(self.original.pk, self.typo.pk)]
+        second = candidates[(self.typo.pk, self.same_email.pk)]
+        response = self.client.post(
+            reverse("contacts_duplicates"),
+            {
+                "action": "merge",
+                "pair": [first, second],
+                f"keep_{first}": self.original.pk,
+                # O contato escolhido já foi absorvido pelo primeiro par.
+                f"keep_{second}": self.typo.pk,
+            },
+        )
+        self.assertRedirects(response, reverse("contacts_duplicates"))
+        kept = Contact.objects.get(pk=self.original.pk)
+        self.assertEqual(kept.email, "contato@goncalves.example.com")
+        self.assertEqual(kept.notes, "Cadastro antigo")
+        self.assertTrue(kept.is_client and kept.is_supplier)
+        self.assertFalse(
+            Contact.objects.filter(pk__in=[self.typo.pk, self.same_email.pk]).exists()
+        )
+        self.assertEqual(self.pairs(), set())
+        self.assertEqual(CompanyStats.objects.get(company=self.company).contacts_total, 2)
+
+    def test_dismiss(self):
+        dedup.find_duplicates(self.company.pk)
+        pair = DuplicateCandidate.objects.order_by("pk").first()
+        self.client.post(
+            reverse("contacts_duplicates"), {"action": "dismiss", "pair": [pair.pk]}
+        )
+        pair.refresh_from_db()
+        self.assertTrue(pair.dismissed)
+        self.assertNotContains(
+            self.client.get(reverse("contacts_duplicates")),
+            f'name="pair" value="{pair.pk}"',
+        )
+
+
+CEP_CSV = (
+    "CEP;Logradouro;Bairro;Localidade;UF\n"
+    "01001-000;Praça da Sé;Sé;São Paulo;SP\n"
+    "20040020;Avenida Rio Branco;Centro;Rio de Janeiro;rj\n"
+    "123;Rua Curta;Centro;Lugar;SP\n"
+)
+
+
+@override_settings(**TEST_SETTINGS)
+class BulkActionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(30)
+        cls.other_company, cls.other_owner = create_tenant(5, seed=99)
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        stats.get_stats(self.company)
+
+    def assertStatsMatchTables(self):
+        current = CompanyStats.objects.get(company=self.company)
+        for name, value in stats.compute([self.company.pk])[self.company.pk].items():
+            self.assertEqual(getattr(current, name), value, name)
+
+    def ids(self, model, company=None, count=5):
+        rows = model.objects.filter(company=company or self.company).order_by("pk")
+        return list(rows.values_list("pk", flat=True)[:count])
+
+    def matches(self, text):
+        contacts = Contact.objects.filter(company=self.company)
+        return set(search_contacts(contacts, self.company.pk, text).values_list("pk", flat=True))
+
+    def post(self, name, action, ids=None, confirm=True, query="", **data):
+        data = {"action": action, **data}
+        if ids is not None:
+            data["ids"] = ids
+        if confirm:
+            data["confirm"] = "1"
+        return self.client.post(f"{reverse(name)}{query}", data)
+
+    def test_confirmation_comes_first(self):
+        ids = self.ids(Product)
+        response = self.post("products_bulk", "delete", ids, confirm=False)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["count"], len(ids))
+        self.assertContains(response, "não pode ser desfeita")
+        self.assertEqual(Product.objects.filter(pk__in=ids).count(), len(ids))
+
+        response = self.post("products_bulk", "delete", ids)
+        self.assertRedirects(response, reverse("products_list"))
+        self.assertFalse(Product.objects.filter(pk__in=ids).exists())
+        self.assertStatsMatchTables()
+
+    def test_updates_keep_stats_and_updated_at(self):
+        long_ago = timezone.now() - timedelta(days=1)
+        Contact.objects.filter(company=self.company).update(updated_at=long_ago)
+        ids = self.ids(Contact, count=10)
+        self.post("contacts_bulk", "deactivate", ids)
+        self.post("contacts_bulk", "set_is_supplier", ids)
+        self.post("contacts_bulk", "unset_is_client", ids[:5])
+        changed = Contact.objects.filter(pk__in=ids)
+        self.assertFalse(changed.filter(is_active=True).exists())
+        self.assertFalse(changed.filter(is_supplier=False).exists())
+        self.assertFalse(changed.filter(pk__in=ids[:5], is_client=True).exists())
+        self.assertFalse(changed.filter(updated_at=long_ago).exists())
+        self.assertStatsMatchTables()
+
+        self.post("products_bulk", "deactivate", self.ids(Product))
+        self.post("products_bulk", "activate", self.ids(Product, count=2))
+        self.assertStatsMatchTables()
+
+    def test_delete_cleans_up(self):
+        long_ago = timezone.now() - timedelta(days=1)
+        Company.objects.filter(pk=self.company.pk).update(updated_at=long_ago)
+        first, second = self.ids(Contact, count=2)
+        DuplicateCandidate.objects.create(
+            company=self.company, contact_a_id=first, contact_b_id=second, score=0.9
+        )
+        name = Contact.objects.get(pk=first).display_name
+        self.post("contacts_bulk", "delete", [first, second])
+
+        self.assertFalse(Contact.objects.filter(pk__in=[first, second]).exists())
+        self.assertFalse(DuplicateCandidate.objects.filter(company=self.company).exists())
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM core_contact_fts WHERE rowid IN (%s, %s)", [first, second])
+            self.assertEqual(cursor.fetchone()[0], 0)
+        self.assertNotIn(first, self.matches(name.split()[0]))
+        self.assertGreater(Company.objects.get(pk=self.company.pk).updated_at, long_ago)
+        self.assertStatsMatchTables()
+
+    @override_settings(BULK_CHUNK_SIZE=2)
+    def test_all_results_follow_the_list_filters(self):
+        Sector.objects.filter(company=self.company).update(is_active=True)
+        response = self.post("sectors_bulk", "deactivate", scope="all", confirm=False)
+        total = Sector.objects.filter(company=self.company).count()
+        self.assertEqual(response.context["count"], total)
+        self.post("sectors_bulk", "deactivate", scope="all")
+        self.assertFalse(Sector.objects.filter(company=self.company, is_active=True).exists())
+
+        contact = Contact.objects.filter(company=self.company).order_by("pk").first()
+        word = contact.display_name.split()[0]
+        matches = self.matches(word)
+        self.assertIn(contact.pk, matches)
+        partners = Contact.objects.filter(company=self.company, is_partner=True)
+        before = set(partners.values_list("pk", flat=True))
+        self.post("contacts_bulk", "set_is_partner", scope="all", query=f"?q={word}")
+        self.assertEqual(set(partners.values_list("pk", flat=True)), before | matches)
+        self.assertStatsMatchTables()
+
+    def test_other_companies_are_untouched(self):
+        foreign = self.ids(Contact, company=self.other_company)
+        mine = self.ids(Contact, count=1)
+        response = self.post("contacts_bulk", "delete", foreign + mine, confirm=False)
+        self.assertEqual(response.context["count"], 1)
+        self.post("contacts_bulk", "delete", foreign + mine)
+        self.assertEqual(Contact.objects.filter(pk__in=foreign).count(), len(foreign))
+        self.assertFalse(Contact.objects.filter(pk__in=mine).exists())
+
+    def test_one_statement_per_chunk(self):
+        ids = self.ids(Contact, count=30)
+        with override_settings(BULK_CHUNK_SIZE=10), CaptureQueriesContext(connection) as ctx:
+            self.post("contacts_bulk", "deactivate", ids)
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_contact"')]
+        self.assertEqual(len(updates), 3)
+
+    def test_requires_action_and_rows(self):
+        response = self.post("contacts_bulk", "delete", [])
+        self.assertRedirects(response, reverse("contacts_list"))
+        response = self.post("contacts_bulk", "drop_table", self.ids(Contact))
+        self.assertRedirects(response, reverse("contacts_list"))
+        self.assertEqual(Contact.objects.filter(company=self.company).count(), 30)
+
+
+@override_settings(**TEST_SETTINGS)
+class RepricingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(0)
+        cls.other_company, _other_owner = create_tenant(3, seed=99)
+        create = partial(Product.objects.create, company=cls.company)
+        cls.glass = create(name="Vidro 4mm", unit="M2", price=Decimal("100.00"), cost_price=Decimal("60.00"))
+        cls.mirror = create(name="Espelho", unit="M2", price=Decimal("80.00"), cost_price=Decimal("70.00"))
+        cls.no_cost = create(name="Vidro sem custo", unit="M2", price=Decimal("10.00"))
+        cls.service = create(name="Instalação", unit="UN", price=Decimal("50.00"), cost_price=Decimal("10.00"))
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        stats.get_stats(self.company)
+
+    def params(self, **extra):
+        return {"target": "price", "mode": "percent", "value": "10", "step": "0.01", **extra}
+
+    def price(self, product):
+        product.refresh_from_db()
+        return product.price
+
+    def test_margins_are_not_integer_divisions(self):
+        # Valores inteiros ficam gravados como INTEGER no SQLite.
+        product = Product.objects.create(company=self.company, name="Terço", price=3, cost_price=2)
+        annotated = Product.objects.with_profit().get(pk=product.pk)
+        self.assertEqual((annotated.profit, annotated.margin), (Decimal("1.00"), Decimal("33.33")))
+        adjustment = repricing.Adjustment(target="cost_price", mode="amount", value=Decimal(0))
+        preview = repricing.preview(Product.objects.filter(pk=product.pk).with_profit(), adjustment)
+        self.assertEqual(preview["sample"][0]["new_margin"], Decimal("33.33"))
+
+    def test_preview_uses_aggregates_and_changes_nothing(self):
+        url = reverse("products_reprice")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, self.params(unit="M2"))
+        # auth_user, tenant, agregações e amostra.
+        self.assertEqual(len(ctx.captured_queries), 4)
+        totals = response.context["preview"]["totals"]
+        self.assertEqual(totals["count"], 3)
+        self.assertEqual(totals["new_price_total"], Decimal("209.00"))
+        self.assertEqual(totals["new_margin_min"], Decimal("20.45"))
+        sample = {row["name"]: row for row in response.context["preview"]["sample"]}
+        self.assertEqual(sample["Espelho"]["new_price"], Decimal("88.00"))
+        self.assertIsNone(sample["Vidro sem custo"]["new_margin"])
+        self.assertEqual(self.price(self.glass), Decimal("100.00"))
+
+    def test_apply_is_one_update(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(
+                reverse("products_reprice"), self.params(name="vidro", value="12.5", step="0.50")
+            )
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "core_product"')]
+        self.assertEqual(len(updates), 1)
+        self.assertRedirects(response, reverse("products_list"))
+        self.assertEqual(self.price(self.glass), Decimal("112.50"))
+        self.assertEqual(self.price(self.no_cost), Decimal("11.50"))
+        self.assertEqual(self.price(self.mirror), Decimal("80.00"))
+        self.assertEqual(
+            CompanyStats.objects.get(company=self.company).margin_sum,
+            stats.compute([self.company.pk])[self.company.pk]["margin_sum"],
+        )
+
+    def test_amounts_costs_and_margin_filters(self):
+        self.client.post(
+            reverse("products_reprice"),
+            self.params(target="both", mode="amount", value="-65", margin_max="20"),
+        )
+        self.mirror.refresh_from_db()
+        # Só o espelho tem margem até 20%; o custo não fica negativo.
+        self.assertEqual((self.mirror.price, self.mirror.cost_price), (Decimal("15.00"), Decimal("5.00")))
+        self.assertEqual(self.price(self.glass), Decimal("100.00"))
+        current = CompanyStats.objects.get(company=self.company)
+        for name, value in stats.compute([self.company.pk])[self.company.pk].items():
+            self.assertEqual(getattr(current, name), value, name)
+
+        self.client.post(reverse("products_reprice"), self.params(target="cost_price", value="-50"))
+        self.no_cost.refresh_from_db()
+        self.assertIsNone(self.no_cost.cost_price)
+        self.assertEqual(Product.objects.get(pk=self.service.pk).cost_price, Decimal("5.00"))
+
+    def test_invalid_form_and_other_companies(self):
+        before = list(Product.objects.filter(company=self.other_company).values_list("price", flat=True))
+        response = self.client.post(reverse("products_reprice"), self.params(value="-100"))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context["form"].errors)
+        self.client.post(reverse("products_reprice"), self.params())
+        self.assertEqual(
+            list(Product.objects.filter(company=self.other_company).values_list("price", flat=True)),
+            before,
+        )
+        self.assertEqual(self.price(self.service), Decimal("55.00"))
+
+
+@override_settings(**TEST_SETTINGS)
+class ProposalTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(0)
+        cls.other_company, _other_owner = create_tenant(3, seed=99)
+        contact = partial(Contact.objects.create, company=cls.company)
+        cls.client_contact = contact(display_name="Vidraçaria Horizonte", is_client=True)
+        cls.seller = contact(display_name="Marta Vendas", is_seller=True, commission=Decimal("4"))
+        product = partial(Product.objects.create, company=cls.company)
+        cls.glass = product(name="Vidro temperado 8mm", unit="M2", price=Decimal("150.00"))
+        cls.install = product(name="Instalação", unit="UN", price=Decimal("19.99"))
+
+    def setUp(self):
+        listcache.tables.clear()
+        self.client.force_login(self.owner)
+        stats.get_stats(self.company)
+
+    def data(self, *items, **extra):
+        data = {
+            "contact": self.client_contact.pk,
+            "seller": self.seller.pk,
+            "status": "draft",
+            "issued_on": "2026-03-02",
+            "discount_percent": "5",
+            "items-TOTAL_FORMS": str(len(items)),
+            "items-INITIAL_FORMS": "0",
+            **extra,
+        }
+        for index, item in enumerate(items):
+            data.update({f"items-{index}-{name}": value for name, value in item.items()})
+        return data
+
+    def glass_item(self, **extra):
+        return {
+            "product_id": self.glass.pk,
+            "quantity": "3",
+            "width": "1.25",
+            "height": "0.8",
+            "discount_percent": "10",
+            **extra,
+        }
+
+    def install_item(self, **extra):
+        return {"product_id": self.install.pk, "quantity": "2.5", "discount_percent": "0", **extra}
+
+    def test_decimal_math(self):
+        area, total = proposals.item_values(
+            "M2", Decimal("3"), Decimal("1.25"), Decimal("0.8"), Decimal("150.00"), Decimal("10")
+        )
+        self.assertEqual((area, total), (Decimal("3.0000"), Decimal("405.00")))
+        # 2,5 × 19,99 = 49,975: meio centavo arredonda para cima.
+        self.assertEqual(
+            proposals.item_values("UN", Decimal("2.5"), None, None, Decimal("19.99"), 0),
+            (None, Decimal("49.98")),
+        )
+        self.assertEqual(
+            proposals.totals([Decimal("405.00"), Decimal("49.98")], Decimal("5"), Decimal("3")),
+            {
+                "items_count": 2,
+                "subtotal": Decimal("454.98"),
+                "discount_total": Decimal("22.75"),
+                "total": Decimal("432.23"),
+                "commission_total": Decimal("12.97"),
+            },
+        )
+
+    def test_create_stores_totals_and_seller_commission(self):
+        response = self.client.post(
+            reverse("proposals_create"), self.data(self.glass_item(), self.install_item())
+        )
+        self.assertRedirects(response, reverse("proposals_list"))
+        proposal = Proposal.objects.get(company=self.company)
+        self.assertEqual(proposal.number, 1)
+        self.assertEqual(proposal.commission_percent, Decimal("4.00"))
+        self.assertEqual(
+            (proposal.items_count, proposal.subtotal, proposal.total, proposal.commission_total),
+            (2, Decimal("454.98"), Decimal("432.23"), Decimal("17.29")),
+        )
+        items = list(proposal.items.all())
+        self.assertEqual([item.description for item in items], ["Vidro temperado 8mm", "Instalação"])
+        self.assertEqual(items[0].area, Decimal("3.0000"))
+        self.assertEqual((items[1].width, items[1].unit_price), (None, Decimal("19.99")))
+        self.assertEqual(CompanyStats.objects.get(company=self.company).proposals_total, 1)
+
+    def test_edit_saves_items_in_batch(self):
+        self.client.post(
+            reverse("proposals_create"), self.data(self.glass_item(), self.install_item())
+        )
+        proposal = Proposal.objects.get(company=self.company)
+        glass, install = proposal.items.all()
+        data = self.data(
+            self.glass_item(id=glass.pk, quantity="1", unit_price="100"),
+            self.install_item(id=install.pk, DELETE="on"),
+            self.install_item(quantity="1"),
+            commission_percent="2",
+        )
+        data["items-INITIAL_FORMS"] = "2"
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse("proposals_edit", args=[proposal.pk]), data)
+        # Um comando por tipo de gravação, não um por item.
+        writes = [
+            q["sql"].split()[0]
+            for q in ctx.captured_queries
+            if q["sql"].startswith(("INSERT", "UPDATE", "DELETE")) and "core_proposalitem" in q["sql"]
+        ]
+        self.assertEqual(writes, ["DELETE", "INSERT", "UPDATE"])
+        proposal.refresh_from_db()
+        # 1,25 × 0,8 × 100 − 10% = 90,00; mais 19,99 = 109,99; − 5% (5,50) = 104,49.
+        self.assertEqual((proposal.items_count, proposal.total), (2, Decimal("104.49")))
+        self.assertEqual(proposal.commission_total, Decimal("2.09"))
+        self.assertFalse(ProposalItem.objects.filter(pk=install.pk).exists())
+
+    def test_invalid_items(self):
+        foreign = Product.objects.filter(company=self.other_company).first()
+        cases = [
+            (self.data(), "Inclua ao menos um item."),
+            (self.data(self.glass_item(width="")), "Informe largura e altura"),
+            (self.data(self.install_item(product_id=foreign.pk)), "Escolha um produto da lista."),
+            (self.data(self.install_item(), contact="999999"), "Escolha um cliente da lista."),
+        ]
+        for data, message in cases:
+            with self.subTest(message):
+                response = self.client.post(reverse("proposals_create"), data)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, message)
+        self.assertFalse(Proposal.objects.filter(company=self.company).exists())
+
+    def test_list_pages_stored_totals(self):
+        for quantity in ("1", "4", "2"):
+            self.client.post(
+                reverse("proposals_create"), self.data(self.install_item(quantity=quantity))
+            )
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse("proposals_list"), {"sort": "-total", "per_page": 25})
+        self.assertFalse([q for q in ctx.captured_queries if "core_proposalitem" in q["sql"]])
+        self.assertEqual([p.number for p in response.context["page"]], [2, 3, 1])
+        self.assertContains(response, "Vidraçaria Horizonte")
+        response = self.client.get(reverse("proposals_list"), {"status": "sent"})
+        self.assertEqual(len(response.context["page"]), 0)
+
+    def test_used_rows_are_protected(self):
+        self.client.post(reverse("proposals_create"), self.data(self.install_item()))
+        response = self.client.post(
+            reverse("contacts_delete", args=[self.client_contact.pk]), follow=True
+        )
+        self.assertContains(response, "está em propostas")
+        self.client.post(reverse("products_delete", args=[self.install.pk]))
+        self.assertTrue(Product.objects.filter(pk=self.install.pk).exists())
+
+        response = self.client.post(
+            reverse("products_bulk"),
+            {"action": "delete", "ids": [self.glass.pk, self.install.pk], "confirm": "1"},
+            follow=True,
+        )
+        self.assertContains(response, "1 registro(s) mantido(s)")
+        self.assertEqual(
+            list(Product.objects.filter(company=self.company).values_list("pk", flat=True)),
+            [self.install.pk],
+        )
+        # Vendedor não protege: a proposta fica sem vendedor.
+        self.client.post(reverse("contacts_delete", args=[self.seller.pk]))
+        self.assertIsNone(Proposal.objects.get(company=self.company).seller_id)
+        current = CompanyStats.objects.get(company=self.company)
+        for name, value in stats.compute([self.company.pk])[self.company.pk].items():
+            self.assertEqual(getattr(current, name), value, name)
+
+    def test_merge_moves_proposals(self):
+        self.client.post(reverse("proposals_create"), self.data(self.install_item()))
+        copy = Contact.objects.create(company=self.company, display_name="Vidracaria Horizonte")
+        Proposal.objects.update(contact=copy)
+        dedup.merge_contacts(self.client_contact, copy)
+        self.assertEqual(Proposal.objects.get(company=self.company).contact, self.client_contact)
+
+    def test_recompute_command(self):
+        for _ in range(3):
+            self.client.post(
+                reverse("proposals_create"), self.data(self.glass_item(), self.install_item())
+            )
+        Proposal.objects.filter(number=2).update(total=0, items_count=0)
+        # Preço alterado direto no banco: o total do item e o da proposta mudam.
+        ProposalItem.objects.filter(proposal__number=3, unit="UN").update(
+            unit_price=Decimal("20.00")
+        )
+        out = io.StringIO()
+        call_command(
+            "recompute_proposals", "--company", str(self.company.pk), "--batch-size", "2", stdout=out
+        )
+        self.assertIn("2 proposta(s)", out.getvalue())
+        self.assertEqual(
+            dict(Proposal.objects.filter(company=self.company).values_list("number", "total")),
+            {1: Decimal("432.23"), 2: Decimal("432.23"), 3: Decimal("432.25")},
+        )
+        self.assertEqual(
+            ProposalItem.objects.get(proposal__number=3, unit="UN").total, Decimal("50.00")
+        )
+
+    def test_permission_and_lookups(self):
+        response = self.client.get(reverse("proposals_contact_lookup"), {"q": "horizonte"})
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.client_contact.pk, "name": "Vidraçaria Horizonte"}],
+        )
+        response = self.client.get(reverse("proposals_product_lookup"), {"q": "vidro"})
+        self.assertEqual(
+            response.json()["results"],
+            [{"id": self.glass.pk, "name": "Vidro temperado 8mm", "unit": "M2", "price": "150.00"}],
+        )
+
+        user = User.objects.create_user(username="sem_propostas", password="senha123")
+        member = UserCompany.objects.create(user=user, company=self.company)
+        UserPermission.objects.create(user_company=member, can_manage_products=True)
+        self.client.force_login(user)
+        self.assertRedirects(
+            self.client.get(reverse("proposals_list")),
+            reverse("dashboard"),
+            fetch_redirect_response=False,
+        )
+        response = self.client.get(reverse("proposals_product_lookup"), {"q": "vidro"})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(**TEST_SETTINGS)
+class CepLookupTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company, cls.owner = create_tenant(1)
+
+    def setUp(self):
+        ceps._cached.cache_clear()
+        self.client.force_login(self.owner)
+
+    def load(self, content, suffix=".csv", *args):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = f"{directory.name}/ceps{suffix}"
+        opener = gzip.open if suffix.endswith(".gz") else open
+        with opener(path, "wt", encoding="utf-8") as fp:
+            fp.write(content)
+        out = io.StringIO()
+        call_command("load_ceps", path, *args, stdout=out)
+        return out.getvalue()
+
+    def test_load_command_accepts_common_headers_and_gzip(self):
+        self.assertIn("2 CEP(s) carregado(s), 1 ignorado(s)", self.load(CEP_CSV))
+        self.assertEqual(CepAddress.objects.get(pk=20040020).uf, "RJ")
+
+        self.load("cep,endereco,bairro,cidade,estado\n01001000,Praça da Sé,Sé,SP Capital,SP\n", ".csv.gz")
+        self.assertEqual(CepAddress.objects.get(pk=1001000).city, "SP Capital")
+        self.assertEqual(CepAddress.objects.count(), 2)
+
+        self.load("cep;cidade;uf\n30130010;Belo Horizonte;MG\n", ".csv", "--replace")
+        self.assertEqual(list(CepAddress.objects.values_list("pk", flat=True)), [30130010])
+
+        with self.assertRaisesMessage(CommandError, "uf"):
+            self.load("cep;cidade\n30130010;Belo Horizonte\n")
+
+    def test_endpoint_returns_the_address_from_the_lru(self):
+        self.load(CEP_CSV)
+        url = reverse("cep_lookup", args=["01001-000"])
+        response = self.client.get(url)
+        self.assertEqual(
+            response.json(),
+            {
+                "cep": "01001-000",
+                "address": "Praça da Sé",
+                "district": "Sé",
+                "city": "São Paulo",
+                "uf": "SP",
+            },
+        )
+        self.assertIn("max-age=86400", response["Cache-Control"])
+        with self.assertNumQueries(0):
+            self.assertEqual(ceps.lookup("01001000")["city"], "São Paulo")
+
+        self.assertEqual(self.client.get(reverse("cep_lookup", args=["0100"])).status_code, 400)
+        missing = reverse("cep_lookup", args=["30130010"])
+        self.assertEqual(self.client.get(missing).status_code, 404)
+        # CEP ausente não fica no cache: aparece depois de carregado.
+        self.load("cep;cidade;uf\n30130010;Belo Horizonte;MG\n")
+        self.assertEqual(self.client.get(missing).json()["city"], "Belo Horizonte")
+
+    def test_forms_load_the_autofill_script(self):
+        for url in (reverse("contacts_create"), reverse("settings")):
+            with self.subTest(url):
+                self.assertContains(self.client.get(url), "js/cep.js")
+
+
+def png_upload(size, name="logo.png", mode="RGBA"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, (200, 30, 30, 255) if mode == "RGBA" else 200).save(buffer, "PNG")
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type="image/png")
+
+
+@override_settings(**TEST_SETTINGS)
+class SettingsViewTests(TestCase):
+    def setUp(self):
+        self.company, self.owner = create_tenant(1)
+        self.client.force_login(self.owner)
+
+    def test_does_not_save_the_cached_tenant_company(self):
+        self.client.get(reverse("dashboard"))  # carrega o tenant no cache
+        variants = {"variants": [{"name": "sidebar", "path": "logos/x.webp"}]}
+        # update() não dispara sinais: o tenant em cache fica velho.
+        Company.objects.filter(pk=self.company.pk).update(logo="logos/x.png", logo_variants=variants)
+
+        response = self.client.post(
+            reverse("settings"),
+            {"name": "Empresa Renomeada", "email": self.company.email, "theme": "dark"},
+        )
+        self.assertRedirects(response, reverse("settings"), fetch_redirect_response=False)
+        self.company.refresh_from_db()
+        self.assertEqual(self.company.name, "Empresa Renomeada")
+        self.assertEqual(self.company.logo.name, "logos/x.png")
+        self.assertEqual(self.company.logo_variants, variants)
+
+    def test_user_without_company_is_redirected(self):
+        user = User.objects.create_user(username="sem_empresa", password="senha123")
+        self.client.force_login(user)
+        for method in ("get", "post"):
+            with self.subTest(method):
+                response = getattr(self.client, method)(reverse("settings"))
+                self.assertRedirects(response, reverse("dashboard"), fetch_redirect_response=False)
+
+
+@override_settings(**TEST_SETTINGS)
+class LogoPipelineTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(self.settings(MEDIA_ROOT=media.name))
+        self.company, self.owner = create_tenant(1)
+        self.client.force_login(self.owner)
+
+    def post_logo(self, upload):
+        return self.client.post(
+            reverse("settings"),
+            {"name": self.company.name, "email": self.company.email, "theme": "dark", "logo": upload},
+        )
+
+    def test_variants_generated_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_logo(png_upload((1000, 500)))
+        self.assertEqual(response.status_code, 302)
+
+        self.company.refresh_from_db()
+        variants = self.company.logo_variants["variants"]
+        self.assertEqual(len(variants), len(images.LOGO_VARIANTS) * 2)
+        for variant in variants:
+            self.assertLessEqual(variant["width"], variant["max_width"])
+            self.assertLessEqual(variant["height"], variant["max_height"])
+            self.assertTrue(default_storage.exists(variant["path"]))
+        self.assertEqual(images.pick_variant(self.company.logo_variants, 64)["name"], "sidebar")
+        self.assertEqual(images.pick_variant(self.company.logo_variants, 240, 120)["name"], "header")
+        self.assertEqual(images.pick_variant(self.company.logo_variants, 5000)["name"], "print")
+
+        # O tenant em cache foi invalidado: a barra lateral já usa a variante.
+        page = self.client.get(reverse("dashboard")).content.decode()
+        self.assertIn("-sidebar", page)
+        self.assertIn('type="image/webp"', page)
+
+    def test_replacing_logo_removes_old_variants(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_logo(png_upload((300, 300)))
+        self.company.refresh_from_db()
+        old_paths = [variant["path"] for variant in self.company.logo_variants["variants"]]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_logo(png_upload((400, 200), name="novo.png"))
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.logo.name.endswith("novo.png"))
+        self.assertFalse(any(default_storage.exists(path) for path in old_paths))
+
+    def test_new_logo_is_shown_before_its_variants_exist(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_logo(png_upload((300, 300)))
+        # A tarefa das variantes do novo logo não roda (falhou ou ainda na fila).
+        self.post_logo(png_upload((400, 200), name="novo.png"))
+        self.company.refresh_from_db()
+        self.assertTrue(self.company.logo.name.endswith("novo.png"))
+        self.assertTrue(self.company.logo_variants["variants"])
+
+        page = self.client.get(reverse("dashboard")).content.decode()
+        self.assertIn(self.company.logo.url, page)
+        self.assertNotIn("-sidebar", page)
+
+    def test_rejects_decompression_bomb(self):
+        with self.settings(LOGO_MAX_PIXELS=10_000):
+            response = self.post_logo(png_upload((200, 200), mode="L"))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("logo", response.context["company_form"].errors)
+        self.company.refresh_from_db()
+        self.assertFalse(self.company.logo)
+
+
+class StaticFilesAppTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.root = tempfile.TemporaryDirectory()
+        with override_settings(STATIC_ROOT=cls.root.name):
+            call_command("collectstatic", interactive=False, verbosity=0)
+        cls.app = StaticFilesApp(
+            lambda environ, start_response: ["django"], "/static/", cls.root.name
+        )
+        cls.css = next(
+            name for name in cls.app.files
+            if name.startswith("css/style.") and name != "css/style.css"
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.root.cleanup()
+        super().tearDownClass()
+
+    def request(self, path, **headers):
+        environ = {"REQUEST_METHOD": "GET", "PATH_INFO": path}
+        environ.update({f"HTTP_{key.upper()}": value for key, value in headers.items()})
+        captured = {}
+
+        def start_response(status, response_headers):
+            captured["status"] = status
+            captured["headers"] = dict(response_headers)
+
+        body = self.app(environ, start_response)
+        content = b"".join(body) if not isinstance(body, list) else body
+        if hasattr(body, "close"):
+            body.close()
+        return captured.get("status"), captured.get("headers", {}), content
+
+    def test_hashed_file_is_precompressed_and_immutable(self):
+        status, headers, body = self.request(f"/static/{self.css}", accept_encoding="gzip, deflate")
+        self.assertEqual(status, "200 OK")
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+        self.assertIn("immutable", headers["Cache-Control"])
+        self.assertEqual(int(headers["Content-Length"]), len(body))
+        self.assertIn(b".theme-dark", gzip.decompress(body))
+
+    def test_identity_when_gzip_refused(self):
+        status, headers, body = self.request(f"/static/{self.css}", accept_encoding="gzip;q=0")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertTrue(body.startswith(b"/*"))
+
+    def test_etag_revalidation(self):
+        _, headers, _ = self.request(f"/static/{self.css}", accept_encoding="gzip")
+        status, _, body = self.request(
+            f"/static/{self.css}", accept_encoding="gzip", if_none_match=headers["ETag"]
+        )
+        self.assertEqual(status, "304 Not Modified")
+        self.assertEqual(body, [])
+        # A versão sem compressão tem outro ETag.
+        status, _, _ = self.request(f"/static/{self.css}", if_none_match=headers["ETag"])
+        self.assertEqual(status, "200 OK")
+
+    def test_unhashed_name_revalidates_and_unknown_is_404(self):
+        _, headers, _ = self.request("/static/css/style.css")
+        self.assertNotIn("immutable", headers["Cache-Control"])
+        status, _, _ = self.request("/static/css/../../manage.py")
+        self.assertEqual(status, "404 Not Found")
+        self.assertEqual(self.request("/contatos/")[2], ["django"])
@@ -0,0 +1,192 @@
+"""
+Limite de tentativas de login (contra força bruta e contra enxurradas de
+POSTs que ocupam os workers calculando PBKDF2).
+
+Cada tentativa gasta uma ficha de dois "token buckets": um do IP e um do
+usuário digitado. Sem ficha, a tentativa é recusada antes do
+``authenticate()`` e a chave fica bloqueada; cada novo bloqueio dura o
+dobro do anterior (até ``LOGIN_LOCKOUT_MAX``). As reincidências são
+esquecidas depois de ``LOGIN_LOCKOUT_RESET`` sem bloqueio.
+
+O estado fica em um SQLite próprio (``LOGIN_THROTTLE_DB``), fora do banco
+da aplicação, compartilhado pelos workers: cada tentativa é uma transação
+``BEGIN IMMEDIATE`` curta, então dois processos nunca gastam a mesma ficha.
+O mesmo arquivo guarda contadores de tentativas aceitas e recusadas.
+"""
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+
+from django.conf import settings
+
+logger = logging.getLogger("sispeed.security")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated REAL NOT NULL,
+    locked_until REAL NOT NULL DEFAULT 0,
+    strikes INTEGER NOT NULL DEFAULT 0,
+    last_lockout REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# Uma chamada em ~PURGE_CHANCE também apaga chaves esquecidas.
+PURGE_CHANCE = 0.001
+
+_local = threading.local()
+
+
+@dataclass(frozen=True)
+class Decision:
+    allowed: bool
+    scope: str = ""
+    retry_after: int = 0
+
+
+def _connect(path):
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = wal")
+        conn.execute("PRAGMA synchronous = normal")
+        conn.executescript(SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+class ThrottleStore:
+    def __init__(self, path=None):
+        self.path = str(path or settings.LOGIN_THROTTLE_DB)
+
+    @property
+    def conn(self):
+        return _connect(self.path)
+
+    def attempt(self, keys, now=None) -> Decision:
+        """
+        Gasta uma ficha de cada ``(escopo, chave, capacidade, segundos por
+        ficha)`` em ``keys``, na ordem; para na primeira recusa.
+        """
+        now = time.time() if now is None else now
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            decision = Decision(True)
+            for scope, key, capacity, refill_seconds in keys:
+                retry_after = self._take(conn, key, capacity, refill_seconds, now)
+                if retry_after:
+                    decision = Decision(False, scope, retry_after)
+                    break
+            counter = "allowed" if decision.allowed else f"rejected_{decision.scope}"
+            conn.execute(
+                "INSERT INTO counters (name, value) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                (counter,),
+            )
+            if random.random() < PURGE_CHANCE:
+                self._purge(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return decision
+
+    def _take(self, conn, key, capacity, refill_seconds, now) -> int:
+        """Devolve 0 se havia ficha; senão, os segundos até poder tentar."""
+        row = conn.execute(
+            "SELECT tokens, updated, locked_until, strikes, last_lockout "
+            "FROM buckets WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            tokens, locked_until, strikes, last_lockout = capacity, 0.0, 0, 0.0
+        else:
+            tokens, updated, locked_until, strikes, last_lockout = row
+            tokens = min(capacity, tokens + (now - updated) / refill_seconds)
+        if locked_until > now:
+            return int(locked_until - now) + 1
+        if strikes and now - last_lockout > settings.LOGIN_LOCKOUT_RESET:
+            strikes = 0
+
+        if tokens >= 1:
+            tokens -= 1
+            retry_after = 0
+        else:
+            strikes += 1
+            duration = min(
+                settings.LOGIN_LOCKOUT_BASE * 2 ** (strikes - 1), settings.LOGIN_LOCKOUT_MAX
+            )
+            locked_until = last_lockout = now + duration
+            retry_after = int(duration)
+            logger.warning("Login bloqueado: %s por %ss (bloqueio nº %s)", key, duration, strikes)
+        conn.execute(
+            "INSERT OR REPLACE INTO buckets "
+            "(key, tokens, updated, locked_until, strikes, last_lockout) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (key, tokens, now, locked_until, strikes, last_lockout),
+        )
+        return retry_after
+
+    def reset(self, key):
+        self.conn.execute("DELETE FROM buckets WHERE key = ?", (key,))
+
+    def _purge(self, conn, now):
+        conn.execute(
+            "DELETE FROM buckets WHERE locked_until < ? AND updated < ?",
+            (now, now - settings.LOGIN_LOCKOUT_RESET),
+        )
+
+    def purge(self, now=None):
+        now = time.time() if now is None else now
+        self._purge(self.conn, now)
+
+    def counters(self) -> dict:
+        return dict(self.conn.execute("SELECT name, value FROM counters ORDER BY name"))
+
+    def locked(self, now=None) -> list:
+        now = time.time() if now is None else now
+        return self.conn.execute(
+            "SELECT key, locked_until - ?, strikes FROM buckets "
+            "WHERE locked_until > ? ORDER BY key",
+            (now, now),
+        ).fetchall()
+
+
+def client_ip(request) -> str:
+    header = settings.LOGIN_THROTTLE_IP_HEADER
+    if header and request.META.get(header):
+        # O proxy confiável acrescenta o IP de quem conectou nele no fim.
+        return request.META[header].split(",")[-1].strip()
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def _username_key(username) -> str:
+    return f"user:{username.strip().lower()}"
+
+
+def check_login(request, username) -> Decision:
+    rates = settings.LOGIN_THROTTLE_RATES
+    keys = [("ip", f"ip:{client_ip(request)}", *rates["ip"])]
+    if username:
+        keys.append(("username", _username_key(username), *rates["username"]))
+    return ThrottleStore().attempt(keys)
+
+
+def login_succeeded(username):
+    """Login certo: os erros anteriores do próprio usuário não contam mais."""
+    ThrottleStore().reset(_username_key(username))
@@ -1,14 +1,28 @@
+import csv
+
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
+from django.db.models import ProtectedError
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
 
 from .forms import (
     CompanySignUpForm,
     ContactForm,
+    ContactImportForm,
     LoginForm,
+    ProductFilterForm,
     ProductForm,
+    ProposalFilterForm,
+    ProposalForm,
+    ProposalItemFormSet,
+    RepricingForm,
     SectorForm,
     UserCreateForm,
     UserUpdateForm,
@@ -18,18 +32,121 @@ from .forms import (
 from .models import (
     Company,
     Contact,
+    DuplicateCandidate,
     Product,
+    Proposal,
     Sector,
     UserCompany,
     UserPermission,
     UserPreference,
 )
+from . import (
+    bulk,
+    ceps,
+    dedup,
+    documents,
+    exports,
+    images,
+    listcache,
+    proposals,
+    repricing,
+    tasks,
+    throttling,
+)
+from .conditional import conditional_list
+from .database import write_transaction
+from .importers import InvalidFileError, import_contacts, new_report, report_path
+from .pagination import KeysetPaginator, sort_links
+from .search import search_contacts
+from .stats import get_stats
+
+# Colunas exibidas nas tabelas das listagens (evita carregar observações,
+# endereço etc. em cada linha).
+CONTACT_LIST_FIELDS = (
+    "id",
+    "display_name",
+    "legal_name",
+    "document",
+    "phone",
+    "email",
+    "is_active",
+    "is_client",
+    "is_supplier",
+    "is_partner",
+    "is_employee",
+    "is_other",
+    "is_seller",
+)
+PRODUCT_LIST_FIELDS = ("id", "name", "unit", "cost_price", "price", "is_active")
+PRODUCT_SORT_COLUMNS = (
+    ("name", "Nome"),
+    ("unit", "Unidade"),
+    ("cost_price", "Valor de custo"),
+    ("price", "Valor de venda"),
+    ("profit", "Lucro (R$)"),
+    ("margin", "Lucro (%)"),
+    ("is_active", "Status"),
+)
+SECTOR_LIST_FIELDS = ("id", "name", "is_active")
+PROPOSAL_LIST_FIELDS = (
+    "id",
+    "number",
+    "status",
+    "issued_on",
+    "valid_until",
+    "items_count",
+    "total",
+    "contact__id",
+    "contact__display_name",
+)
+PROPOSAL_SORT_COLUMNS = (
+    ("number", "Número"),
+    ("issued_on", "Data"),
+    ("total", "Total"),
+    ("status", "Status"),
+)
+# Sugestões das buscas de cliente e produto no formulário de propostas.
+PROPOSAL_LOOKUP_LIMIT = 10
+DUPLICATE_REVIEW_FIELDS = (
+    "score",
+    "reasons",
+    *(
+        f"{side}__{name}"
+        for side in ("contact_a", "contact_b")
+        for name in ("display_name", "document", "phone", "email")
+    ),
+)
+# Contatos listados no aviso de CPF/CNPJ duplicado.
+DOCUMENT_DUPLICATES_LIMIT = 5
+USER_LIST_FIELDS = (
+    "id",
+    "is_owner",
+    "user__id",
+    "user__username",
+    "user__first_name",
+    "user__email",
+    "user__is_active",
+    "user__is_staff",
+)
 
 
 def login_view(request):
     if request.user.is_authenticated:
         return redirect("dashboard")
 
+    if request.method == "POST":
+        # Antes de validar e, principalmente, de calcular o hash da senha.
+        decision = throttling.check_login(request, request.POST.get("username", ""))
+        if not decision.allowed:
+            minutes = -(-decision.retry_after // 60)
+            messages.error(
+                request,
+                f"Muitas tentativas de login. Tente novamente em {minutes} minuto(s).",
+            )
+            response = render(request, "auth/login.html", {"form": LoginForm()}, status=429)
+            response["Retry-After"] = str(decision.retry_after)
+            return response
+
     form = LoginForm(request.POST or None)
     if request.method == "POST" and form.is_valid():
         username = form.cleaned_data["username"]
@@ -37,6 +154,7 @@ def login_view(request):
         user = authenticate(request, username=username, password=password)
         if user:
             login(request, user)
+            throttling.login_succeeded(username)
             return redirect("dashboard")
         messages.error(request, "Usuário ou senha inválidos.")
     return render(request, "auth/login.html", {"form": form})
@@ -47,6 +165,7 @@ def logout_view(request):
     return redirect("login")
 
 
+@write_transaction
 def company_signup_view(request):
     if request.user.is_authenticated:
         return redirect("dashboard")
@@ -79,6 +198,7 @@ def company_signup_view(request):
             can_manage_users=True,
             can_manage_products=True,
             can_manage_sectors=True,
+            can_manage_proposals=True,
         )
 
         UserPreference.objects.create(
@@ -94,52 +214,131 @@ def company_signup_view(request):
 
 @login_required
 def dashboard_view(request):
-    return render(request, "dashboard/home.html")
+    company = _get_user_company(request)
+    company_stats = get_stats(company) if company else None
+    return render(request, "dashboard/home.html", {"stats": company_stats})
 
 
 # -------- Helpers --------
 
 
 def _get_user_company(request) -> Company:
-    return request.user.company_link.company
-
-
-def _get_user_company_link(request) -> UserCompany:
-    return request.user.company_link
-
-
-def _get_user_permissions(request) -> UserPermission | None:
-    try:
-        return request.user.company_link.permissions
-    except UserPermission.DoesNotExist:
-        return None
+    return request.tenant.company
 
 
 def _require_permission(request, field_name: str, redirect_name: str = "dashboard"):
-    user_company = _get_user_company_link(request)
-    if user_company.is_owner:
-        return None
-
-    perms = _get_user_permissions(request)
-    if not perms or not getattr(perms, field_name, False):
+    if not request.tenant.has_permission(field_name):
         messages.error(request, "Você não tem permissão para acessar esta área.")
         return redirect(redirect_name)
     return None
 
 
+def _bulk_action(request, model, queryset, list_name):
+    """
+    Ação em massa de uma listagem: o POST da listagem mostra a confirmação
+    e o POST da confirmação (``confirm``) aplica a ação e volta à listagem.
+    ``queryset`` já traz os filtros da listagem (querystring), usados quando
+    a escolha é "todos os resultados".
+    """
+    actions = bulk.ACTIONS[model]
+    action_name = request.POST.get("action", "")
+    if request.method != "POST" or action_name not in actions:
+        messages.error(request, "Escolha uma ação e ao menos um registro.")
+        return redirect(list_name)
+    select_all = request.POST.get("scope") == "all"
+    ids = None
+    if not select_all:
+        ids = [int(pk) for pk in request.POST.getlist("ids") if pk.isdigit()]
+        if not ids:
+            messages.error(request, "Escolha uma ação e ao menos um registro.")
+            return redirect(list_name)
+
+    if "confirm" not in request.POST:
+        if select_all:
+            count = queryset.count()
+        else:
+            count = sum(len(chunk) for chunk in bulk.id_chunks(queryset, ids))
+        return render(
+            request,
+            "includes/bulk_confirm.html",
+            {
+                "action": actions[action_name],
+                "action_name": action_name,
+                "count": count,
+                "ids": ids or [],
+                "select_all": select_all,
+                "verbose_name_plural": model._meta.verbose_name_plural.lower(),
+                "list_name": list_name,
+            },
+        )
+
+    result = bulk.run(
+        request.tenant.company.pk, model, action_name, bulk.id_chunks(queryset, ids)
+    )
+    verb = "excluído(s)" if actions[action_name].is_delete else "atualizado(s)"
+    messages.success(request, f"{result.done} registro(s) {verb}.")
+    if result.skipped:
+        messages.warning(
+            request, f"{result.skipped} registro(s) mantido(s): estão em uso em propostas."
+        )
+    return redirect(list_name)
+
+
 # -------- CONTATOS --------
 
+def _filter_contacts(request, company):
+    """Filtros da listagem de contatos (também usados na exportação)."""
+    contacts = Contact.objects.filter(company=company)
+    query = request.GET.get("q", "").strip()
+    if query:
+        contacts = search_contacts(contacts, company.pk, query)
+    return contacts, query
+
+
 @login_required
+@conditional_list("contacts", "can_manage_contacts")
 def contacts_list(request):
     deny = _require_permission(request, "can_manage_contacts")
     if deny:
         return deny
     company = _get_user_company(request)
-    contacts = Contact.objects.filter(company=company)
-    return render(request, "contacts/list.html", {"contacts": contacts})
+    contacts, query = _filter_contacts(request, company)
+    paginator = KeysetPaginator(contacts.only(*CONTACT_LIST_FIELDS), ("display_name", "id"))
+
+    def render_table():
+        page = paginator.paginate(request)
+        context = {"contacts": page, "page": page, "query": query}
+        return render_to_string("contacts/table.html", context, request)
+
+    return render(
+        request,
+        "contacts/list.html",
+        {
+            "table": listcache.cached_table(request, "contacts", render_table),
+            "query": query,
+            "page_size": paginator.get_page_size(request.GET),
+            "bulk_actions": bulk.choices(Contact),
+        },
+    )
+
+
+@login_required
+@conditional_list("contacts", "can_manage_contacts")
+def contacts_export(request):
+    deny = _require_permission(request, "can_manage_contacts")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    contacts, _query = _filter_contacts(request, company)
+    return exports.csv_response(
+        "contatos.csv",
+        exports.contact_header(),
+        exports.contact_rows(contacts.order_by("display_name", "id")),
+    )
 
 
 @login_required
+@write_transaction
 def contacts_create(request):
     deny = _require_permission(request, "can_manage_contacts")
     if deny:
@@ -156,6 +355,7 @@ def contacts_create(request):
 
 
 @login_required
+@write_transaction
 def contacts_edit(request, pk):
     deny = _require_permission(request, "can_manage_contacts")
     if deny:
@@ -175,6 +375,7 @@ def contacts_edit(request, pk):
 
 
 @login_required
+@write_transaction
 def contacts_delete(request, pk):
     deny = _require_permission(request, "can_manage_contacts")
     if deny:
@@ -182,25 +383,196 @@ def contacts_delete(request, pk):
     company = _get_user_company(request)
     contact = get_object_or_404(Contact, pk=pk, company=company)
     if request.method == "POST":
-        contact.delete()
-        messages.success(request, "Contato excluído com sucesso.")
+        try:
+            contact.delete()
+        except ProtectedError:
+            messages.error(request, "Este contato está em propostas e não pode ser excluído.")
+        else:
+            messages.success(request, "Contato excluído com sucesso.")
         return redirect("contacts_list")
     return render(request, "contacts/confirm_delete.html", {"contact": contact})
 
 
+@login_required
+def contacts_document_lookup(request, document):
+    """
+    Contatos da empresa com o mesmo CPF/CNPJ, em JSON, para o aviso de
+    duplicado no formulário (static/js/document.js). ``?exclude=<id>`` tira o
+    próprio contato na edição.
+    """
+    if not request.tenant.has_permission("can_manage_contacts"):
+        return JsonResponse({"erro": "Sem permissão."}, status=403)
+    if not documents.is_valid(document):
+        return JsonResponse({"erro": "CPF/CNPJ inválido."}, status=400)
+    company = _get_user_company(request)
+    matches = Contact.objects.filter(
+        company=company, normalized_document=documents.digits(document)
+    )
+    exclude = request.GET.get("exclude", "")
+    if exclude.isdigit():
+        matches = matches.exclude(pk=exclude)
+    # Sem ORDER BY: ordenar por nome faria o SQLite preferir o índice de
+    # nomes e percorrer a empresa inteira em vez de ir direto ao documento.
+    rows = matches.order_by().values_list("pk", "display_name")[:DOCUMENT_DUPLICATES_LIMIT]
+    duplicates = [
+        {"id": pk, "display_name": name, "url": reverse("contacts_edit", args=[pk])}
+        for pk, name in sorted(rows, key=lambda row: (row[1], row[0]))
+    ]
+    return JsonResponse(
+        {"document": documents.format_document(document), "duplicates": duplicates}
+    )
+
+
+@login_required
+def contacts_bulk(request):
+    deny = _require_permission(request, "can_manage_contacts")
+    if deny:
+        return deny
+    contacts, _query = _filter_contacts(request, _get_user_company(request))
+    return _bulk_action(request, Contact, contacts, "contacts_list")
+
+
+@login_required
+@write_transaction
+def contacts_duplicates(request):
+    """Revisão dos possíveis duplicados: buscar, juntar ou descartar pares."""
+    deny = _require_permission(request, "can_manage_contacts")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    candidates = DuplicateCandidate.objects.filter(company=company, dismissed=False)
+
+    if request.method == "POST":
+        action = request.POST.get("action")
+        if action == "search":
+            if dedup.schedule(company.pk):
+                messages.success(
+                    request, "Busca de duplicados iniciada. Atualize a página em instantes."
+                )
+            else:
+                messages.error(request, "Já existe uma busca de duplicados em andamento.")
+            return redirect("contacts_duplicates")
+
+        ids = [int(pk) for pk in request.POST.getlist("pair") if pk.isdigit()]
+        selected = candidates.filter(pk__in=ids).order_by("-score", "pk")
+        if action == "merge":
+            choices = []
+            for candidate in selected:
+                keep = request.POST.get(f"keep_{candidate.pk}", "")
+                if keep.isdigit():
+                    choices.append((candidate, int(keep)))
+            merged = dedup.merge_pairs(company.pk, choices)
+            messages.success(request, f"{merged} contato(s) mesclado(s).")
+        elif action == "dismiss":
+            dismissed = selected.update(dismissed=True)
+            messages.success(request, f"{dismissed} par(es) marcado(s) como não duplicado(s).")
+        return redirect("contacts_duplicates")
+
+    return render(
+        request,
+        "contacts/duplicates.html",
+        {
+            "candidates": candidates.select_related("contact_a", "contact_b")
+            .only(*DUPLICATE_REVIEW_FIELDS)
+            .order_by("-score", "pk")[: settings.DEDUP_REVIEW_LIMIT],
+            "status": dedup.status(company.pk),
+        },
+    )
+
+
+@login_required
+def contacts_import(request):
+    deny = _require_permission(request, "can_manage_contacts")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    form = ContactImportForm(request.POST or None, request.FILES or None)
+    result = None
+    report_token = None
+    if request.method == "POST" and form.is_valid():
+        report_token, path = new_report(company.pk)
+        try:
+            with open(path, "w", encoding="utf-8-sig", newline="") as errors_file:
+                result = import_contacts(
+                    company,
+                    form.cleaned_data["file"],
+                    encoding=form.cleaned_data["encoding"],
+                    errors_file=errors_file,
+                )
+        except (UnicodeDecodeError, csv.Error, InvalidFileError) as exc:
+            path.unlink(missing_ok=True)
+            report_token = None
+            if isinstance(exc, InvalidFileError):
+                form.add_error("file", str(exc))
+            else:
+                form.add_error(
+                    "file", "Não foi possível ler o arquivo. Verifique a codificação."
+                )
+        else:
+            if not result.rejected:
+                path.unlink(missing_ok=True)
+                report_token = None
+            if result.created:
+                messages.success(
+                    request, f"{result.created} contato(s) importado(s) com sucesso."
+                )
+    return render(
+        request,
+        "contacts/import.html",
+        {
+            "form": form,
+            "result": result,
+            "report_token": report_token,
+            "columns": ContactForm.Meta.fields,
+        },
+    )
+
+
+@login_required
+def contacts_import_report(request, token):
+    deny = _require_permission(request, "can_manage_contacts")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    if not token.isalnum():
+        raise Http404
+    path = report_path(company.pk, token)
+    if not path.exists():
+        raise Http404
+    return FileResponse(
+        open(path, "rb"),
+        as_attachment=True,
+        filename="contatos-erros.csv",
+        content_type="text/csv",
+    )
+
+
 # -------- USUÁRIOS --------
 
 @login_required
+@conditional_list("users", "can_manage_users")
 def users_list(request):
     deny = _require_permission(request, "can_manage_users")
     if deny:
         return deny
     company = _get_user_company(request)
-    user_links = UserCompany.objects.select_related("user").filter(company=company)
-    return render(request, "users/list.html", {"user_links": user_links})
+    user_links = (
+        UserCompany.objects.select_related("user")
+        .filter(company=company)
+        .only(*USER_LIST_FIELDS)
+    )
+
+    def render_table():
+        page = KeysetPaginator(user_links, ("user__username", "id")).paginate(request)
+        context = {"user_links": page, "page": page}
+        return render_to_string("users/table.html", context, request)
+
+    table = listcache.cached_table(request, "users", render_table, vary_user=True)
+    return render(request, "users/list.html", {"table": table})
 
 
 @login_required
+@write_transaction
 def users_create(request):
     deny = _require_permission(request, "can_manage_users")
     if deny:
@@ -228,6 +600,7 @@ def users_create(request):
             can_manage_users=form.cleaned_data["can_manage_users"],
             can_manage_products=form.cleaned_data["can_manage_products"],
             can_manage_sectors=form.cleaned_data["can_manage_sectors"],
+            can_manage_proposals=form.cleaned_data["can_manage_proposals"],
         )
 
         UserPreference.objects.create(
@@ -241,12 +614,15 @@ def users_create(request):
 
 
 @login_required
+@write_transaction
 def users_edit(request, pk):
     deny = _require_permission(request, "can_manage_users")
     if deny:
         return deny
     company = _get_user_company(request)
-    user_link = get_object_or_404(UserCompany, pk=pk, company=company)
+    user_link = get_object_or_404(
+        UserCompany.objects.select_related("user"), pk=pk, company=company
+    )
     user_obj = user_link.user
 
     perms, _ = UserPermission.objects.get_or_create(
@@ -256,6 +632,7 @@ def users_edit(request, pk):
             "can_manage_users": False,
             "can_manage_products": False,
             "can_manage_sectors": False,
+            "can_manage_proposals": False,
         },
     )
 
@@ -268,6 +645,7 @@ def users_edit(request, pk):
         "can_manage_users": perms.can_manage_users,
         "can_manage_products": perms.can_manage_products,
         "can_manage_sectors": perms.can_manage_sectors,
+        "can_manage_proposals": perms.can_manage_proposals,
     }
     form = UserUpdateForm(
         request.POST or None,
@@ -293,11 +671,13 @@ def users_edit(request, pk):
             perms.can_manage_users = True
             perms.can_manage_products = True
             perms.can_manage_sectors = True
+            perms.can_manage_proposals = True
         else:
             perms.can_manage_contacts = form.cleaned_data["can_manage_contacts"]
             perms.can_manage_users = form.cleaned_data["can_manage_users"]
             perms.can_manage_products = form.cleaned_data["can_manage_products"]
             perms.can_manage_sectors = form.cleaned_data["can_manage_sectors"]
+            perms.can_manage_proposals = form.cleaned_data["can_manage_proposals"]
         perms.save()
 
         messages.success(request, "Usuário atualizado com sucesso.")
@@ -311,12 +691,15 @@ def users_edit(request, pk):
 
 
 @login_required
+@write_transaction
 def users_delete(request, pk):
     deny = _require_permission(request, "can_manage_users")
     if deny:
         return deny
     company = _get_user_company(request)
-    user_link = get_object_or_404(UserCompany, pk=pk, company=company)
+    user_link = get_object_or_404(
+        UserCompany.objects.select_related("user"), pk=pk, company=company
+    )
     user_obj = user_link.user
 
     if user_link.is_owner:
@@ -337,17 +720,99 @@ def users_delete(request, pk):
 
 # -------- PRODUTOS --------
 
+def _filter_products(request, company):
+    """Filtros da listagem de produtos (também usados na exportação)."""
+    form = ProductFilterForm(request.GET)
+    products = form.filter(Product.objects.filter(company=company).with_profit())
+    return products, form
+
+
 @login_required
+@conditional_list("products", "can_manage_products")
 def products_list(request):
     deny = _require_permission(request, "can_manage_products")
     if deny:
         return deny
     company = _get_user_company(request)
-    products = Product.objects.filter(company=company)
-    return render(request, "products/list.html", {"products": products})
+    products, form = _filter_products(request, company)
+    ordering = form.ordering()
+    paginator = KeysetPaginator(products.only(*PRODUCT_LIST_FIELDS), ordering)
+
+    def render_table():
+        page = paginator.paginate(request)
+        context = {
+            "products": page,
+            "page": page,
+            "totals": products.totals(),
+            "columns": sort_links(request.GET, PRODUCT_SORT_COLUMNS, ordering[0]),
+        }
+        return render_to_string("products/table.html", context, request)
+
+    return render(
+        request,
+        "products/list.html",
+        {
+            "table": listcache.cached_table(request, "products", render_table),
+            "form": form,
+            "page_size": paginator.get_page_size(request.GET),
+            "bulk_actions": bulk.choices(Product),
+        },
+    )
+
+
+@login_required
+def products_bulk(request):
+    deny = _require_permission(request, "can_manage_products")
+    if deny:
+        return deny
+    products, _form = _filter_products(request, _get_user_company(request))
+    return _bulk_action(request, Product, products, "products_list")
+
+
+@login_required
+@write_transaction
+def products_reprice(request):
+    """
+    Reajuste de preços: o GET com o formulário preenchido mostra a prévia
+    (agregações, nada é gravado) e o POST aplica com um único ``UPDATE``.
+    """
+    deny = _require_permission(request, "can_manage_products")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    if request.method == "POST":
+        form = RepricingForm(request.POST)
+        if form.is_valid():
+            products = form.filter(Product.objects.filter(company=company).with_profit())
+            updated = repricing.apply(company.pk, products, form.adjustment())
+            messages.success(request, f"{updated} produto(s) reajustado(s).")
+            return redirect("products_list")
+    else:
+        form = RepricingForm(request.GET if "value" in request.GET else None, initial=request.GET)
+
+    preview = None
+    if form.is_bound and form.is_valid():
+        products = form.filter(Product.objects.filter(company=company).with_profit())
+        preview = repricing.preview(products, form.adjustment())
+    return render(request, "products/reprice.html", {"form": form, "preview": preview})
 
 
 @login_required
+@conditional_list("products", "can_manage_products")
+def products_export(request):
+    deny = _require_permission(request, "can_manage_products")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    products, form = _filter_products(request, company)
+    products = products.order_by(*form.ordering())
+    return exports.csv_response(
+        "produtos.csv", exports.product_header(), exports.product_rows(products)
+    )
+
+
+@login_required
+@write_transaction
 def products_create(request):
     deny = _require_permission(request, "can_manage_products")
     if deny:
@@ -364,6 +829,7 @@ def products_create(request):
 
 
 @login_required
+@write_transaction
 def products_edit(request, pk):
     deny = _require_permission(request, "can_manage_products")
     if deny:
@@ -383,6 +849,7 @@ def products_edit(request, pk):
 
 
 @login_required
+@write_transaction
 def products_delete(request, pk):
     deny = _require_permission(request, "can_manage_products")
     if deny:
@@ -390,8 +857,12 @@ def products_delete(request, pk):
     company = _get_user_company(request)
     product = get_object_or_404(Product, pk=pk, company=company)
     if request.method == "POST":
-        product.delete()
-        messages.success(request, "Produto excluído com sucesso.")
+        try:
+            product.delete()
+        except ProtectedError:
+            messages.error(request, "Este produto está em propostas e não pode ser excluído.")
+        else:
+            messages.success(request, "Produto excluído com sucesso.")
         return redirect("products_list")
     return render(request, "products/confirm_delete.html", {"product": product})
 
@@ -399,16 +870,50 @@ def products_delete(request, pk):
 # -------- SETORES --------
 
 @login_required
+@conditional_list("sectors", "can_manage_sectors")
 def sectors_list(request):
     deny = _require_permission(request, "can_manage_sectors")
     if deny:
         return deny
     company = _get_user_company(request)
-    sectors = Sector.objects.filter(company=company)
-    return render(request, "sectors/list.html", {"sectors": sectors})
+    sectors = Sector.objects.filter(company=company).only(*SECTOR_LIST_FIELDS)
+
+    def render_table():
+        page = KeysetPaginator(sectors, ("name", "id")).paginate(request)
+        return render_to_string("sectors/table.html", {"sectors": page, "page": page}, request)
+
+    table = listcache.cached_table(request, "sectors", render_table)
+    return render(
+        request,
+        "sectors/list.html",
+        {"table": table, "bulk_actions": bulk.choices(Sector)},
+    )
+
+
+@login_required
+def sectors_bulk(request):
+    deny = _require_permission(request, "can_manage_sectors")
+    if deny:
+        return deny
+    sectors = Sector.objects.filter(company=_get_user_company(request))
+    return _bulk_action(request, Sector, sectors, "sectors_list")
+
+
+@login_required
+@conditional_list("sectors", "can_manage_sectors")
+def sectors_export(request):
+    deny = _require_permission(request, "can_manage_sectors")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    sectors = Sector.objects.filter(company=company).order_by("name", "id")
+    return exports.csv_response(
+        "setores.csv", exports.sector_header(), exports.sector_rows(sectors)
+    )
 
 
 @login_required
+@write_transaction
 def sectors_create(request):
     deny = _require_permission(request, "can_manage_sectors")
     if deny:
@@ -425,6 +930,7 @@ def sectors_create(request):
 
 
 @login_required
+@write_transaction
 def sectors_edit(request, pk):
     deny = _require_permission(request, "can_manage_sectors")
     if deny:
@@ -444,6 +950,7 @@ def sectors_edit(request, pk):
 
 
 @login_required
+@write_transaction
 def sectors_delete(request, pk):
     deny = _require_permission(request, "can_manage_sectors")
     if deny:
@@ -457,11 +964,177 @@ def sectors_delete(request, pk):
     return render(request, "sectors/confirm_delete.html", {"sector": sector})
 
 
+# -------- PROPOSTAS --------
+
+def _filter_proposals(request, company):
+    """
+    Propostas da listagem com os filtros da querystring. Total e número de
+    itens já estão gravados na proposta: nenhuma soma de itens por linha.
+    """
+    form = ProposalFilterForm(request.GET)
+    rows = form.filter(Proposal.objects.filter(company=company))
+    return rows.select_related("contact").only(*PROPOSAL_LIST_FIELDS), form
+
+
+@login_required
+@conditional_list("proposals", "can_manage_proposals")
+def proposals_list(request):
+    deny = _require_permission(request, "can_manage_proposals")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    rows, form = _filter_proposals(request, company)
+    ordering = form.ordering()
+    paginator = KeysetPaginator(rows, ordering)
+
+    def render_table():
+        page = paginator.paginate(request)
+        context = {
+            "proposals": page,
+            "page": page,
+            "columns": sort_links(request.GET, PROPOSAL_SORT_COLUMNS, ordering[0]),
+        }
+        return render_to_string("proposals/table.html", context, request)
+
+    return render(
+        request,
+        "proposals/list.html",
+        {
+            "table": listcache.cached_table(request, "proposals", render_table),
+            "form": form,
+            "page_size": paginator.get_page_size(request.GET),
+        },
+    )
+
+
+def _proposal_form(request, company, proposal):
+    """Formulário e itens da proposta; grava tudo se o POST for válido."""
+    data = request.POST if request.method == "POST" else None
+    form = ProposalForm(data, instance=proposal, company=company)
+    formset = ProposalItemFormSet(data, instance=proposal, company=company, prefix="items")
+    saved = False
+    if data is not None and form.is_valid() and formset.is_valid():
+        proposal = form.save(commit=False)
+        proposal.company = company
+        proposal.save()
+        proposals.save_items(proposal, formset.items(), formset.deleted_ids())
+        saved = True
+    return form, formset, saved
+
+
+@login_required
+@write_transaction
+def proposals_create(request):
+    deny = _require_permission(request, "can_manage_proposals")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    form, formset, saved = _proposal_form(request, company, Proposal(company=company))
+    if saved:
+        messages.success(request, "Proposta cadastrada com sucesso.")
+        return redirect("proposals_list")
+    return render(
+        request, "proposals/form.html", {"form": form, "formset": formset, "mode": "create"}
+    )
+
+
+@login_required
+@write_transaction
+def proposals_edit(request, pk):
+    deny = _require_permission(request, "can_manage_proposals")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    proposal = get_object_or_404(
+        Proposal.objects.select_related("contact"), pk=pk, company=company
+    )
+    form, formset, saved = _proposal_form(request, company, proposal)
+    if saved:
+        messages.success(request, "Proposta atualizada com sucesso.")
+        return redirect("proposals_list")
+    return render(
+        request,
+        "proposals/form.html",
+        {"form": form, "formset": formset, "mode": "edit", "proposal": proposal},
+    )
+
+
+@login_required
+@write_transaction
+def proposals_delete(request, pk):
+    deny = _require_permission(request, "can_manage_proposals")
+    if deny:
+        return deny
+    company = _get_user_company(request)
+    proposal = get_object_or_404(
+        Proposal.objects.select_related("contact"), pk=pk, company=company
+    )
+    if request.method == "POST":
+        proposal.delete()
+        messages.success(request, "Proposta excluída com sucesso.")
+        return redirect("proposals_list")
+    return render(request, "proposals/confirm_delete.html", {"proposal": proposal})
+
+
+@login_required
+def proposals_contact_lookup(request):
+    """Clientes para a busca do formulário de propostas (static/js/proposal.js)."""
+    if not request.tenant.has_permission("can_manage_proposals"):
+        return JsonResponse({"erro": "Sem permissão."}, status=403)
+    company = _get_user_company(request)
+    query = request.GET.get("q", "").strip()
+    results = []
+    if query:
+        contacts = search_contacts(Contact.objects.filter(company=company), company.pk, query)
+        results = [
+            {"id": pk, "name": name}
+            for pk, name in contacts.values_list("pk", "display_name")[:PROPOSAL_LOOKUP_LIMIT]
+        ]
+    return JsonResponse({"results": results})
+
+
+@login_required
+def proposals_product_lookup(request):
+    """Produtos ativos para os itens da proposta (static/js/proposal.js)."""
+    if not request.tenant.has_permission("can_manage_proposals"):
+        return JsonResponse({"erro": "Sem permissão."}, status=403)
+    company = _get_user_company(request)
+    query = request.GET.get("q", "").strip()
+    results = []
+    if query:
+        products = Product.objects.filter(
+            company=company, is_active=True, name__icontains=query
+        ).values("id", "name", "unit", "price")[:PROPOSAL_LOOKUP_LIMIT]
+        results = [{**product, "price": str(product["price"])} for product in products]
+    return JsonResponse({"results": results})
+
+
+# -------- CEP --------
+
+@login_required
+def cep_lookup(request, cep):
+    """Endereço do CEP em JSON, para o preenchimento automático (static/js/cep.js)."""
+    if ceps.normalize(cep) is None:
+        return JsonResponse({"erro": "CEP inválido."}, status=400)
+    address = ceps.lookup(cep)
+    if address is None:
+        return JsonResponse({"erro": "CEP não encontrado."}, status=404)
+    response = JsonResponse(address)
+    patch_cache_control(response, private=True, max_age=60 * 60 * 24)
+    return response
+
+
 # -------- AJUSTES --------
 
 @login_required
+@write_transaction
 def settings_view(request):
-    company = _get_user_company(request)
+    if _get_user_company(request) is None:
+        messages.error(request, "Você não tem permissão para acessar esta área.")
+        return redirect("dashboard")
+    # O tenant fica em cache por usuário: gravar a instância dele
+    # sobrescreveria alterações feitas depois (logo, variantes, outro usuário).
+    company = Company.objects.get(pk=_get_user_company(request).pk)
 
     if request.method == "POST":
         company_form = CompanySettingsForm(
@@ -481,8 +1154,10 @@ def settings_view(request):
         pref_form = UserPreferenceForm(request.POST, instance=prefs)
 
         if company_form.is_valid() and pref_form.is_valid():
-            company_form.save()
+            company = company_form.save()
             pref_form.save()
+            if "logo" in company_form.changed_data:
+                tasks.enqueue(images.generate_logo_variants, company.pk)
             messages.success(request, "Ajustes salvos com sucesso.")
             return redirect("settings")
     else:
@@ -13,4 +13,40 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sispeed.settings')
 
-application = get_asgi_application()
+get_asgi_application()  # django.setup()
+
+from asgiref.wsgi import WsgiToAsgi  # noqa: E402
+from django.conf import settings  # noqa: E402
+from django.core.handlers.asgi import ASGIHandler  # noqa: E402
+
+from core.staticfiles import StaticFilesApp  # noqa: E402
+
+
+class AsyncViewsHandler(ASGIHandler):
+    """Handler ASGI que usa as views assíncronas (``sispeed.urls_async``)."""
+
+    urlconf = "sispeed.urls_async"
+
+    async def get_response_async(self, request):
+        request.urlconf = self.urlconf
+        return await super().get_response_async(request)
+
+
+django_application = AsyncViewsHandler()
+
+# Estáticos e uploads pelo mesmo handler do WSGI (core.staticfiles), em uma
+# thread: o Django não entra nessas requisições.
+static_files = StaticFilesApp(
+    None,
+    static_url=settings.STATIC_URL,
+    static_root=settings.STATIC_ROOT,
+    media_url=settings.MEDIA_URL,
+    media_root=settings.MEDIA_ROOT,
+)
+static_application = WsgiToAsgi(static_files)
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and static_files.handles(scope["path"]):
+        return await static_application(scope, receive, send)
+    return await django_application(scope, receive, send)
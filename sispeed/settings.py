@@ -28,11 +28,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.TimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "core.middleware.TenantMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -41,7 +43,7 @@ ROOT_URLCONF = "sispeed.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        "BACKEND": "core.instrumentation.TimedDjangoTemplates",
         "DIRS": [BASE_DIR / "templates"],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -57,13 +59,146 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "sispeed.wsgi.application"
 
+# Perfil de produção do SQLite (ver core.database): backend com
+# BEGIN IMMEDIATE, pragmas por conexão e conexões persistentes.
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.sqlite3",
+        "ENGINE": "core.sqlite",
         "NAME": BASE_DIR / "db.sqlite3",
+        "CONN_MAX_AGE": 600,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# WAL fica gravado no arquivo: é ligado pelo migrate (core.signals), não a
+# cada conexão, para um "manage.py check" não reescrever o banco.
+SQLITE_JOURNAL_MODE = "wal"
+SQLITE_PRAGMAS = {
+    "synchronous": "normal",
+    # ms esperando o lock de escrita antes de "database is locked".
+    "busy_timeout": 5000,
+    "mmap_size": 128 * 1024 * 1024,
+    # Negativo = KiB (aqui 32 MB de cache de páginas por conexão).
+    "cache_size": -32000,
+    "temp_store": "memory",
+}
+# Novas tentativas de um POST que não conseguiu o lock, com backoff
+# exponencial a partir de SQLITE_RETRY_BACKOFF segundos.
+SQLITE_WRITE_RETRIES = 3
+SQLITE_RETRY_BACKOFF = 0.05
+
+# Cache em arquivo: compartilhado entre os workers do gunicorn, então uma
+# invalidação feita por um processo vale para todos.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / ".cache",
+        "OPTIONS": {
+            "MAX_ENTRIES": 10000,
+        },
+    },
+    # Fragmentos de template (barra lateral). Fica na memória de cada worker:
+    # a chave inclui o tenant.fingerprint, lido do cache compartilhado acima,
+    # então uma alteração em qualquer worker muda a chave em todos e a versão
+    # antiga só expira. Nada precisa ser apagado entre processos.
+    "template_fragments": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "template-fragments",
+        "OPTIONS": {
+            "MAX_ENTRIES": 2000,
+        },
+    },
+    # Sessões (core.sessions). Diretório próprio para o descarte por falta
+    # de espaço do cache "default" não levar sessões junto. Sem MAX_ENTRIES:
+    # os arquivos vencidos saem na limpeza periódica (SESSION_PURGE_INTERVAL).
+    "sessions": {
+        "BACKEND": "core.sessions.SessionFileCache",
+        "LOCATION": BASE_DIR / ".cache" / "sessions",
+        "TIMEOUT": None,
+    },
+}
+
+# Sessões no cache compartilhado, levadas ao banco em segundo plano.
+SESSION_ENGINE = "core.sessions"
+SESSION_CACHE_ALIAS = "sessions"
+# Intervalo (s) entre limpezas das sessões vencidas e linhas por DELETE.
+SESSION_PURGE_INTERVAL = 60 * 60
+SESSION_PURGE_BATCH_SIZE = 500
+
+# Tempo (s) que o contexto do tenant fica no cache (é invalidado por sinais).
+TENANT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Tabelas das listagens guardadas na memória de cada worker (core.listcache).
+LIST_CACHE_MAX_ENTRIES = 200
+
+# Instrumentação (core.middleware.TimingMiddleware): cabeçalho Server-Timing
+# e log de requisições/consultas lentas em JSON lines.
+TIMING_ENABLED = True
+SLOW_REQUEST_MS = 500
+SLOW_QUERY_MS = 100
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "jsonlines": {"()": "core.instrumentation.JsonLinesFormatter"},
+    },
+    "handlers": {
+        "slow_log": {
+            "class": "core.instrumentation.JsonLinesFileHandler",
+            "filename": BASE_DIR / "logs" / "slow.jsonl",
+            "maxBytes": 10 * 1024 * 1024,
+            "backupCount": 5,
+            "delay": True,
+            "formatter": "jsonlines",
+        },
+    },
+    "loggers": {
+        "sispeed.slow": {
+            "handlers": ["slow_log"],
+            "level": "WARNING",
+            "propagate": False,
+        },
+    },
+}
+
+# Limite de tentativas de login (core.throttling): token bucket por IP e por
+# usuário, em um SQLite próprio compartilhado pelos workers.
+LOGIN_THROTTLE_DB = BASE_DIR / ".cache" / "login_throttle.sqlite3"
+LOGIN_THROTTLE_RATES = {
+    # escopo: (tentativas seguidas, segundos para recuperar cada uma)
+    "ip": (30, 2),
+    "username": (5, 60),
+}
+# Primeiro bloqueio (s); dobra a cada reincidência, até o máximo.
+LOGIN_LOCKOUT_BASE = 60
+LOGIN_LOCKOUT_MAX = 60 * 60
+# Reincidências são esquecidas depois deste tempo (s) sem bloqueio.
+LOGIN_LOCKOUT_RESET = 60 * 60 * 24
+# Atrás de um proxy confiável (ex.: "HTTP_X_FORWARDED_FOR"); senão REMOTE_ADDR.
+LOGIN_THROTTLE_IP_HEADER = None
+
+# CEPs guardados na memória de cada worker (core.ceps).
+CEP_CACHE_SIZE = 20000
+
+# Busca de contatos duplicados (core.dedup): nota mínima de um par, maior
+# bloco comparado (blocos maiores são ignorados) e validade (s) da trava que
+# impede duas buscas ao mesmo tempo na mesma empresa.
+DEDUP_MIN_SCORE = 0.75
+DEDUP_MAX_BLOCK_SIZE = 50
+DEDUP_LOCK_TIMEOUT = 60 * 60
+# Pares exibidos na tela de revisão.
+DEDUP_REVIEW_LIMIT = 100
+
+# Linhas por UPDATE/DELETE (e por transação) nas ações em massa (core.bulk).
+BULK_CHUNK_SIZE = 500
+
+# Propostas por lote no recálculo dos totais (core.proposals.recompute).
+PROPOSAL_BATCH_SIZE = 500
+
+# Relatórios de erros das importações de CSV.
+IMPORT_REPORTS_DIR = BASE_DIR / "imports"
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -93,4 +228,22 @@ STATICFILES_DIRS = [
 
 STATIC_ROOT = BASE_DIR / "staticfiles"
 
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    # collectstatic grava nomes com hash + .gz/.br (ver core.staticfiles).
+    "staticfiles": {"BACKEND": "core.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+
+MEDIA_URL = "/media/"
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Logo da empresa: limites do upload (ver core.images).
+LOGO_MAX_UPLOAD_SIZE = 5 * 1024 * 1024
+LOGO_MAX_PIXELS = 25_000_000
+
+# Tarefas em segundo plano (core.tasks). Com um worker as tarefas de cada
+# processo rodam na ordem em que foram enfileiradas.
+TASKS_WORKERS = 1
+TASKS_EAGER = False
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
\ No newline at end of file
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import path
 
@@ -16,6 +18,20 @@ urlpatterns = [
     path("contatos/novo/", core_views.contacts_create, name="contacts_create"),
     path("contatos/<int:pk>/editar/", core_views.contacts_edit, name="contacts_edit"),
     path("contatos/<int:pk>/excluir/", core_views.contacts_delete, name="contacts_delete"),
+    path("contatos/exportar/", core_views.contacts_export, name="contacts_export"),
+    path("contatos/acoes/", core_views.contacts_bulk, name="contacts_bulk"),
+    path("contatos/importar/", core_views.contacts_import, name="contacts_import"),
+    path("contatos/duplicados/", core_views.contacts_duplicates, name="contacts_duplicates"),
+    path(
+        "contatos/documento/<str:document>/",
+        core_views.contacts_document_lookup,
+        name="contacts_document_lookup",
+    ),
+    path(
+        "contatos/importar/erros/<str:token>/",
+        core_views.contacts_import_report,
+        name="contacts_import_report",
+    ),
 
     # Usuários
     path("usuarios/", core_views.users_list, name="users_list"),
@@ -28,13 +44,32 @@ urlpatterns = [
     path("produtos/novo/", core_views.products_create, name="products_create"),
     path("produtos/<int:pk>/editar/", core_views.products_edit, name="products_edit"),
     path("produtos/<int:pk>/excluir/", core_views.products_delete, name="products_delete"),
+    path("produtos/exportar/", core_views.products_export, name="products_export"),
+    path("produtos/acoes/", core_views.products_bulk, name="products_bulk"),
+    path("produtos/reajuste/", core_views.products_reprice, name="products_reprice"),
 
     # Setores
     path("setores/", core_views.sectors_list, name="sectors_list"),
     path("setores/novo/", core_views.sectors_create, name="sectors_create"),
     path("setores/<int:pk>/editar/", core_views.sectors_edit, name="sectors_edit"),
     path("setores/<int:pk>/excluir/", core_views.sectors_delete, name="sectors_delete"),
+    path("setores/exportar/", core_views.sectors_export, name="sectors_export"),
+    path("setores/acoes/", core_views.sectors_bulk, name="sectors_bulk"),
+
+    # Propostas
+    path("propostas/", core_views.proposals_list, name="proposals_list"),
+    path("propostas/nova/", core_views.proposals_create, name="proposals_create"),
+    path("propostas/<int:pk>/editar/", core_views.proposals_edit, name="proposals_edit"),
+    path("propostas/<int:pk>/excluir/", core_views.proposals_delete, name="proposals_delete"),
+    path("propostas/clientes/", core_views.proposals_contact_lookup, name="proposals_contact_lookup"),
+    path("propostas/produtos/", core_views.proposals_product_lookup, name="proposals_product_lookup"),
 
     # Ajustes
     path("ajustes/", core_views.settings_view, name="settings"),
-]
\ No newline at end of file
+
+    # Preenchimento de endereço pelo CEP
+    path("ceps/<str:cep>/", core_views.cep_lookup, name="cep_lookup"),
+]
+
+# Uploads (logos). Em produção quem serve é o servidor web; aqui só com DEBUG.
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,27 @@
+"""
+URLs do deploy ASGI (``sispeed/asgi.py``): as mesmas de ``sispeed.urls``,
+com as listagens, exportações, edições e ajustes trocados pelas versões
+assíncronas de ``core.async_views``. O resto continua síncrono (o Django
+roda essas views em uma thread).
+"""
+from django.urls import path
+
+from core import async_views
+
+from .urls import urlpatterns as sync_urlpatterns
+
+# Vêm antes: o resolver usa a primeira rota que casar.
+urlpatterns = [
+    path("contatos/", async_views.contacts_list, name="contacts_list"),
+    path("contatos/exportar/", async_views.contacts_export, name="contacts_export"),
+    path("contatos/<int:pk>/editar/", async_views.contacts_edit, name="contacts_edit"),
+    path("usuarios/", async_views.users_list, name="users_list"),
+    path("produtos/", async_views.products_list, name="products_list"),
+    path("produtos/exportar/", async_views.products_export, name="products_export"),
+    path("produtos/<int:pk>/editar/", async_views.products_edit, name="products_edit"),
+    path("setores/", async_views.sectors_list, name="sectors_list"),
+    path("setores/exportar/", async_views.sectors_export, name="sectors_export"),
+    path("setores/<int:pk>/editar/", async_views.sectors_edit, name="sectors_edit"),
+    path("propostas/", async_views.proposals_list, name="proposals_list"),
+    path("ajustes/", async_views.settings_view, name="settings"),
+] + sync_urlpatterns
@@ -9,8 +9,21 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sispeed.settings')
 
 application = get_wsgi_application()
+
+# Estáticos (com hash e pré-comprimidos) e uploads servidos direto no WSGI,
+# antes do Django. Ver core.staticfiles.
+from core.staticfiles import StaticFilesApp  # noqa: E402
+
+application = StaticFilesApp(
+    application,
+    static_url=settings.STATIC_URL,
+    static_root=settings.STATIC_ROOT,
+    media_url=settings.MEDIA_URL,
+    media_root=settings.MEDIA_ROOT,
+)
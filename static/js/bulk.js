@@ -0,0 +1,12 @@
+// Marca ou desmarca todas as linhas da tabela para as ações em massa.
+(function () {
+    document.querySelectorAll("[data-bulk-all]").forEach(function (toggle) {
+        toggle.addEventListener("change", function () {
+            document
+                .querySelectorAll('input[name="ids"][form="bulk-form"]')
+                .forEach(function (box) {
+                    box.checked = toggle.checked;
+                });
+        });
+    });
+})();
@@ -0,0 +1,44 @@
+// Preenche endereço, bairro, cidade e UF ao digitar um CEP completo.
+// A consulta é na base local (core/ceps.py); nenhum serviço externo.
+(function () {
+    var script = document.currentScript;
+    var urlTemplate = script.dataset.url;
+    var fields = ["address", "district", "city", "uf"];
+
+    function fill(form, data) {
+        fields.forEach(function (name) {
+            var input = form.elements[name];
+            if (!input) return;
+            // Não apaga o que a pessoa digitou; troca só o que veio do CEP.
+            if (input.value && input.value !== input.dataset.cepValue) return;
+            input.value = data[name] || "";
+            input.dataset.cepValue = input.value;
+        });
+    }
+
+    function lookup(input) {
+        var digits = input.value.replace(/\D/g, "");
+        if (digits.length !== 8 || digits === input.dataset.cepLast) return;
+        input.dataset.cepLast = digits;
+        fetch(urlTemplate.replace("00000000", digits), {
+            headers: { Accept: "application/json" },
+            credentials: "same-origin",
+        })
+            .then(function (response) {
+                return response.ok ? response.json() : null;
+            })
+            .then(function (data) {
+                if (data) fill(input.form, data);
+            })
+            .catch(function () {});
+    }
+
+    document.querySelectorAll('input[name="cep"]').forEach(function (input) {
+        input.addEventListener("input", function () {
+            lookup(input);
+        });
+        input.addEventListener("blur", function () {
+            lookup(input);
+        });
+    });
+})();
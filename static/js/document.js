@@ -0,0 +1,51 @@
+// Avisa, ao digitar um CPF/CNPJ completo, se ele já está em outro contato.
+// Só avisa: o cadastro continua permitido.
+(function () {
+    var script = document.currentScript;
+    var urlTemplate = script.dataset.url;
+    var exclude = script.dataset.exclude;
+    var input = document.querySelector('input[name="document"]');
+    var box = document.getElementById("document-duplicates");
+    if (!input || !box) return;
+
+    function show(duplicates) {
+        box.textContent = "";
+        box.hidden = !duplicates.length;
+        if (!duplicates.length) return;
+        box.appendChild(document.createTextNode("CPF/CNPJ já cadastrado em: "));
+        duplicates.forEach(function (contact, index) {
+            if (index) box.appendChild(document.createTextNode(", "));
+            var link = document.createElement("a");
+            link.href = contact.url;
+            link.textContent = contact.display_name;
+            box.appendChild(link);
+        });
+    }
+
+    function check() {
+        var digits = input.value.replace(/\D/g, "");
+        if (digits === input.dataset.documentLast) return;
+        input.dataset.documentLast = digits;
+        if (digits.length !== 11 && digits.length !== 14) {
+            show([]);
+            return;
+        }
+        var url = urlTemplate.replace("00000000000", digits);
+        if (exclude) url += "?exclude=" + encodeURIComponent(exclude);
+        fetch(url, {
+            headers: { Accept: "application/json" },
+            credentials: "same-origin",
+        })
+            .then(function (response) {
+                return response.ok ? response.json() : { duplicates: [] };
+            })
+            .then(function (data) {
+                // Ignora respostas de um valor que já foi trocado.
+                if (input.value.replace(/\D/g, "") === digits) show(data.duplicates);
+            })
+            .catch(function () {});
+    }
+
+    input.addEventListener("input", check);
+    input.addEventListener("blur", check);
+})();
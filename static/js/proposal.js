@@ -0,0 +1,57 @@
+// Busca de cliente e de produtos no formulário de propostas: cada campo com
+// data-lookup sugere opções (datalist) e guarda o id escolhido no campo
+// oculto data-target. Nos produtos, o valor de venda vira a sugestão do
+// valor unitário.
+(function () {
+    var timers = new WeakMap();
+    var results = new WeakMap();
+
+    function fill(input, items) {
+        var list = document.getElementById(input.getAttribute("list"));
+        list.textContent = "";
+        items.forEach(function (item) {
+            var option = document.createElement("option");
+            option.value = item.name;
+            if (item.unit) option.label = item.unit === "M2" ? "m²" : "Unidade";
+            list.appendChild(option);
+        });
+        results.set(input, items);
+    }
+
+    function search(input) {
+        var query = input.value.trim();
+        if (!query) return;
+        fetch(input.dataset.lookup + "?q=" + encodeURIComponent(query), {
+            headers: { Accept: "application/json" },
+            credentials: "same-origin",
+        })
+            .then(function (response) {
+                return response.ok ? response.json() : { results: [] };
+            })
+            .then(function (data) {
+                // Ignora respostas de um texto que já foi trocado.
+                if (input.value.trim() === query) fill(input, data.results);
+            })
+            .catch(function () {});
+    }
+
+    function choose(input) {
+        var target = document.getElementById(input.dataset.target);
+        var chosen = (results.get(input) || []).find(function (item) {
+            return item.name === input.value;
+        });
+        if (!target) return;
+        target.value = chosen ? chosen.id : "";
+        var price = document.getElementById(input.dataset.priceTarget || "");
+        if (chosen && price && chosen.price) price.placeholder = chosen.price;
+    }
+
+    document.querySelectorAll("input[data-lookup]").forEach(function (input) {
+        input.addEventListener("input", function () {
+            clearTimeout(timers.get(input));
+            timers.set(input, setTimeout(function () { search(input); }, 250));
+            choose(input);
+        });
+        input.addEventListener("change", function () { choose(input); });
+    });
+})();